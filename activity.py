@@ -0,0 +1,111 @@
+"""
+Contains counters of toggles of nets (switching activity). 
+"""
+
+import csv
+from array import array
+
+class ToggleCounters:
+    """
+    Numbers of changes of values of nets kept in typed arrays. 
+
+    Counters are addressed by indexes. Keys (e.g. elements) can be 
+    mapped to indexes by get_index, which adds new counters when needed, 
+    and counters of keys which are gone are released for reuse. 
+    """
+
+    def __init__(self, size=0):
+        self.counts = array("Q", bytes(8 * size))
+        self._values = bytearray(size)   # last recorded values 
+        self._indexes = {}
+        self._free = []   # indexes of released counters 
+
+    def __len__(self):
+        return len(self.counts)
+
+    def get_index(self, key):
+        index = self._indexes.get(key)
+
+        if index is None:
+            if self._free:
+                index = self._indexes[key] = self._free.pop()
+            else:
+                index = self._indexes[key] = len(self.counts)
+
+                self.counts.append(0)
+                self._values.append(0)
+
+        return index
+
+    def release(self, key):
+        """
+        Frees counter of key (e.g. of removed element), so it doesn't 
+        keep key and can be reused by another key. 
+        """
+
+        index = self._indexes.pop(key, None)
+
+        if index is not None:
+            self.counts[index] = 0
+            self._values[index] = 0
+            self._free.append(index)
+
+    def set_value(self, index, value):
+        """
+        Sets value of counter's net without counting it as a toggle. 
+        """
+
+        self._values[index] = bool(value)
+
+    def record(self, index, value):
+        """
+        Counts toggle if value differs from the last recorded one. 
+        """
+
+        value = bool(value)
+
+        if value != self._values[index]:
+            self._values[index] = value
+            self.counts[index] += 1
+
+    def get_count(self, key):
+        index = self._indexes.get(key)
+
+        return 0 if index is None else self.counts[index]
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+
+    def coverage(self, indexes=None):
+        """
+        Returns fraction of counters (of all not released or of given 
+        indexes) which counted at least one toggle. 
+        """
+
+        if indexes is None:
+            free = set(self._free)
+            indexes = (
+                index for index in range(len(self.counts))
+                if index not in free
+            )
+
+        counts = [self.counts[index] for index in indexes]
+
+        if not counts:
+            return 1.0
+
+        return sum(1 for count in counts if count) / len(counts)
+
+    def export_csv(self, file_, names):
+        """
+        Writes CSV with names and toggles numbers of counters. 
+        names is a sequence of pairs of counter's index and name, 
+        counters without names (e.g. internal nets) are named by index. 
+        """
+
+        writer = csv.writer(file_)
+        writer.writerow(("name", "toggles"))
+
+        for index, name in names:
+            writer.writerow((name or f"#{index}", self.counts[index]))
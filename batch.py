@@ -0,0 +1,380 @@
+"""
+Headless batch evaluation of saved circuits over files of input vectors. 
+
+Usage: python batch.py [options] --vectors <file> <circuit> [<circuit> ...] 
+
+Vectors file is CSV (.csv) with one vector of 0 and 1 per line 
+(optionally preceded by a header with switches names) or binary file 
+with ceil(n / 8) little-endian bytes per vector of n switches. 
+Lamps values are written to <output-dir>/<circuit>.out.csv (or .bin) 
+in the same format, where <circuit> is name of circuit's file without 
+extension or, if circuits' files have the same names, their path 
+relative to common directory. PyQt5 is imported only when --render 
+is given. 
+
+With --timed vectors are applied one after another to event-driven 
+simulation with gate delays, every vector for --period time units 
+(by default, delay of the longest path). Lamps values at the end 
+of every period are written as above, numbers of toggles of all nets 
+to <circuit>.toggles.csv, and pulses of lamps inside periods (glitches) 
+are counted. 
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os.path
+import sys
+import time
+
+import netlist
+from activity import ToggleCounters
+from cache import CompiledCache
+from simulation import CompiledCircuit, pack_vectors, unpack_vectors
+from timing import TimedSimulator
+
+def _read_csv_blocks(path, names, block_size):
+    """
+    Yields lists of rows of vectors file as strings of 0 and 1 
+    with characters in order of names. Raises ValueError if a row 
+    has other number of values than header (or names if there 
+    is no header) or values other than 0 and 1. 
+    """
+
+    with open(path, newline="") as file_:
+        reader = csv.reader(file_)
+        columns = None   # of switches if file has header 
+        width = None
+        rows = []
+
+        for row in reader:
+            row = [value.strip() for value in row]
+
+            if not row:
+                continue
+
+            if width is None:
+                width = len(names)
+
+                if not set(row) <= {"0", "1"}:
+                    # Header maps columns to switches. 
+                    missing = [name for name in names if name not in row]
+                    if missing:
+                        raise ValueError(
+                            f"{path}: no columns of switches " 
+                            + ", ".join(missing)
+                        )
+
+                    columns = [row.index(name) for name in names]
+                    width = len(row)
+                    continue
+
+            # Values are single characters, if there are as many 
+            # characters as values and no value is empty. 
+            line = "".join(row)
+            if (len(row) != width or len(line) != width or "" in row
+                    or line.strip("01")):
+                raise ValueError(
+                    f"{path}:{reader.line_num}: expected {width} values " 
+                    f"of 0 and 1, got {len(row)}: {','.join(row)}"
+                )
+
+            if columns is not None:
+                line = "".join(line[column] for column in columns)
+            rows.append(line)
+
+            if len(rows) == block_size:
+                yield rows
+                rows = []
+
+        if rows:
+            yield rows
+
+def _read_binary_blocks(path, names, block_size):
+    vector_size = (len(names) + 7) // 8
+    width = len(names)
+
+    with open(path, "rb") as file_:
+        while True:
+            data = file_.read(vector_size * block_size)
+
+            if not data:
+                break
+
+            if len(data) % vector_size:
+                raise ValueError(
+                    f"{path}: size isn't a multiple of {vector_size} bytes " 
+                    f"of vector of {width} switches"
+                )
+
+            yield [
+                format(
+                    int.from_bytes(data[n:n + vector_size], "little"),
+                    f"0{width}b"
+                )[::-1][:width]
+                for n in range(0, len(data), vector_size)
+            ]
+
+def _get_writer(file_, binary, lamps):
+    """
+    Returns function writing list of rows of lamps values (strings 
+    of 0 and 1) to output file in format of vectors file. 
+    """
+
+    if binary:
+        lamps_size = (len(lamps) + 7) // 8
+
+        def write(rows):
+            file_.write(b"".join(
+                int(row[::-1] or "0", 2).to_bytes(lamps_size, "little")
+                for row in rows
+            ))
+    else:
+        writer = csv.writer(file_)
+        writer.writerow(lamps)
+
+        def write(rows):
+            writer.writerows(list(row) for row in rows)
+
+    return write
+
+def _open_output(path, binary):
+    if binary:
+        return open(path, "wb")
+
+    return open(path, "w", newline="")
+
+def run_circuit(circuit_path, vectors_path, output_path, block_size=4096,
+                use_cache=True):
+    """
+    Evaluates circuit over all vectors streaming them block by block. 
+    Returns number of evaluated vectors and time it took. 
+    """
+
+    start_time = time.perf_counter()
+
+    if use_cache:
+        circuit = CompiledCache().get(netlist.load(circuit_path))
+    else:
+        circuit = CompiledCircuit(netlist.load(circuit_path))
+    binary = vectors_path.endswith(".bin")
+
+    read_blocks = _read_binary_blocks if binary else _read_csv_blocks
+    vectors_number = 0
+
+    with _open_output(output_path, binary) as output:
+        write = _get_writer(output, binary, circuit.outputs)
+
+        for rows in read_blocks(vectors_path, circuit.inputs, block_size):
+            size = len(rows)
+            mask = (1 << size) - 1
+
+            values = circuit.evaluate(
+                pack_vectors(rows, len(circuit.inputs)), mask
+            )
+            write(unpack_vectors(values, size))
+
+            vectors_number += size
+
+    return vectors_number, time.perf_counter() - start_time
+
+def run_timed(circuit_path, vectors_path, output_path, toggles_path, 
+              period=None, block_size=4096):
+    """
+    Applies vectors one by one to event-driven simulation of circuit 
+    with gate delays, every vector for period time units (by default, 
+    until circuit without loops settles). Writes lamps values at the end 
+    of every period and numbers of toggles of nets. Returns number 
+    of vectors, time it took and number of glitches: pulses of lamps 
+    inside periods. 
+    """
+
+    start_time = time.perf_counter()
+
+    circuit = netlist.load(circuit_path)
+    simulator = TimedSimulator(circuit)
+
+    if period is None:
+        # Circuit with loops may never settle, so it needs period. 
+        try:
+            period = simulator.get_settling_time()
+        except ValueError:
+            raise ValueError(
+                f"{circuit_path} contains loops, so --period is needed"
+            ) from None
+
+    counters = ToggleCounters(len(circuit.net_names))
+    simulator.toggle_counters = counters
+
+    switches = [gate.name for gate in circuit.switches]
+    lamps = [gate.name for gate in circuit.lamps]
+    lamps_nets = [gate.inputs[0] for gate in circuit.lamps]
+
+    binary = vectors_path.endswith(".bin")
+    read_blocks = _read_binary_blocks if binary else _read_csv_blocks
+
+    previous = "0" * len(switches)   # switches are inactive at start 
+    vectors_number = 0
+    glitches_number = 0
+
+    with _open_output(output_path, binary) as output:
+        write = _get_writer(output, binary, lamps)
+
+        for rows in read_blocks(vectors_path, switches, block_size):
+            output_rows = []
+
+            for row in rows:
+                for name, value, old_value in zip(switches, row, previous):
+                    if value != old_value:
+                        simulator.set_input(name, value == "1")
+                previous = row
+
+                counts = [counters.counts[net] for net in lamps_nets]
+                simulator.run(simulator.time + period)
+
+                # Every pulse is two toggles, one more toggle 
+                # is a change of lamp's value. 
+                for net, count in zip(lamps_nets, counts):
+                    glitches_number += (counters.counts[net] - count) // 2
+
+                output_rows.append("".join(
+                    str(simulator.net_values[net]) for net in lamps_nets
+                ))
+
+            write(output_rows)
+            vectors_number += len(rows)
+
+    with open(toggles_path, "w", newline="") as file_:
+        counters.export_csv(file_, [
+            (net, circuit.get_net_name(net)) 
+            for net in range(len(circuit.net_names))
+        ])
+
+    return (
+        vectors_number, time.perf_counter() - start_time, glitches_number
+    )
+
+def _circuits_names(paths):
+    """
+    Returns names of files of outputs of circuits: names of circuits' 
+    files without extension or, if they repeat, paths relative to 
+    common directory of circuits, so circuits never overwrite each 
+    other's outputs. 
+    """
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+    if len(set(names)) == len(names):
+        return names
+
+    paths = [os.path.abspath(path) for path in paths]
+    directory = os.path.commonpath(
+        [os.path.dirname(path) for path in paths]
+    )
+
+    return [os.path.relpath(path, directory) for path in paths]
+
+def _run_job(job):
+    function, arguments = job
+
+    return function(*arguments)
+
+def render(circuit_path, image_path):
+    """
+    Draws circuit into image file using the application's widgets. 
+    """
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.sandbox.load_netlist(netlist.load(circuit_path))
+
+    rect = window.sandbox.childrenRect()
+    window.sandbox.resize(
+        rect.right() + rect.left(), rect.bottom() + rect.top()
+    )
+    window.sandbox.grab().save(image_path)
+    window.close()
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluates circuits over files of input vectors."
+    )
+    parser.add_argument("circuits", nargs="+", help=".blif or .v files")
+    parser.add_argument("--vectors", required=True,
+                        help="input vectors (.csv or .bin)")
+    parser.add_argument("--output-dir", default=".",
+                        help="directory for lamps values")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--block-size", type=int, default=4096,
+                        help="vectors evaluated at once")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't use cache of compiled circuits")
+    parser.add_argument("--render", action="store_true",
+                        help="also draw every circuit into .png file")
+    parser.add_argument("--timed", action="store_true",
+                        help="simulate with gate delays and count glitches")
+    parser.add_argument("--period", type=int,
+                        help="time units of every vector with --timed")
+
+    arguments = parser.parse_args(arguments)
+
+    extension = ".bin" if arguments.vectors.endswith(".bin") else ".csv"
+    names = _circuits_names(arguments.circuits)
+    jobs = []
+
+    for path, name in zip(arguments.circuits, names):
+        output_path = os.path.join(
+            arguments.output_dir, name + ".out" + extension
+        )
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        if arguments.timed:
+            toggles_path = os.path.join(
+                arguments.output_dir, name + ".toggles.csv"
+            )
+            jobs.append((run_timed, (
+                path, arguments.vectors, output_path, toggles_path, 
+                arguments.period, arguments.block_size
+            )))
+        else:
+            jobs.append((run_circuit, (
+                path, arguments.vectors, output_path, arguments.block_size, 
+                not arguments.no_cache
+            )))
+
+    start_time = time.perf_counter()
+
+    workers = max(1, min(arguments.workers or 1, len(jobs)))
+    if workers == 1:
+        results = [_run_job(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_run_job, jobs)
+
+    total_time = time.perf_counter() - start_time
+    total_vectors = 0
+
+    for path, (vectors_number, seconds, *glitches) in zip(
+            arguments.circuits, results):
+        total_vectors += vectors_number
+        print(f"{path}: {vectors_number} vectors in {seconds:.3f} s "
+              f"({vectors_number / max(seconds, 1e-9):.0f} vectors/s)")
+
+        if glitches:
+            print(f"{path}: {glitches[0]} glitches of lamps")
+
+    print(f"Total: {total_vectors} vectors in {total_time:.3f} s "
+          f"({total_vectors / max(total_time, 1e-9):.0f} vectors/s)")
+
+    if arguments.render:
+        for path, name in zip(arguments.circuits, names):
+            render(path, os.path.join(arguments.output_dir, name + ".png"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Contains reduced ordered binary decision diagrams (BDD) 
+of circuits' lamps. 
+"""
+
+from gatelib import LIBRARY
+
+class BDDSizeError(ValueError):
+    """
+    Raised when number of BDD nodes exceeds limit. 
+    """
+
+class BDD:
+    """
+    Manager of BDD nodes over ordered variables. 
+
+    Nodes are integers: 0 and 1 are terminal nodes, other nodes 
+    are indexes in arrays of variables levels and low and high 
+    children. Equal nodes are never created twice (unique table), 
+    so equal functions are equal integers. Results of operations 
+    are kept in a fixed-size computed table, where new results 
+    evict old ones with the same hash. 
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, variables, cache_size=1 << 16, max_nodes=None):
+        self.variables = list(variables)
+        self._levels = {name: n for n, name in enumerate(self.variables)}
+
+        # Terminal nodes are below all variables. 
+        terminal_level = len(self.variables)
+        self._level = [terminal_level, terminal_level]
+        self._low = [0, 1]
+        self._high = [0, 1]
+
+        self._unique = {}
+
+        cache_size = 1 << max(cache_size - 1, 1).bit_length()
+        self._cache = [None] * cache_size
+        self._cache_mask = cache_size - 1
+
+        self.max_nodes = max_nodes
+
+    def __len__(self):
+        """
+        Returns number of nodes including terminal ones. 
+        """
+
+        return len(self._level)
+
+    # Building 
+
+    def _make(self, level, low, high):
+        if low == high:
+            return low
+
+        key = (level, low, high)
+        node = self._unique.get(key)
+
+        if node is None:
+            node = len(self._level)
+
+            if self.max_nodes is not None and node >= self.max_nodes:
+                raise BDDSizeError(f"BDD has more than {self.max_nodes} nodes")
+
+            self._level.append(level)
+            self._low.append(low)
+            self._high.append(high)
+            self._unique[key] = node
+
+        return node
+
+    def variable(self, name):
+        return self._make(self._levels[name], self.FALSE, self.TRUE)
+
+    def _apply(self, operation, f, g):
+        # Terminal cases 
+        if f <= 1 and g <= 1:
+            if operation == "and":
+                return f & g
+            if operation == "or":
+                return f | g
+            return f ^ g
+
+        if operation == "and":
+            if f == 0 or g == 0:
+                return 0
+            if f == 1 or f == g:
+                return g
+            if g == 1:
+                return f
+        elif operation == "or":
+            if f == 1 or g == 1:
+                return 1
+            if f == 0 or f == g:
+                return g
+            if g == 0:
+                return f
+        else:
+            if f == g:
+                return 0
+            if f == 0:
+                return g
+            if g == 0:
+                return f
+
+        # All operations are commutative. 
+        if f > g:
+            f, g = g, f
+
+        key = (operation, f, g)
+        slot = hash(key) & self._cache_mask
+        cached = self._cache[slot]
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        level_f = self._level[f]
+        level_g = self._level[g]
+        level = min(level_f, level_g)
+
+        f_low, f_high = (
+            (self._low[f], self._high[f]) if level_f == level else (f, f)
+        )
+        g_low, g_high = (
+            (self._low[g], self._high[g]) if level_g == level else (g, g)
+        )
+
+        node = self._make(
+            level,
+            self._apply(operation, f_low, g_low),
+            self._apply(operation, f_high, g_high)
+        )
+
+        self._cache[slot] = (key, node)
+
+        return node
+
+    def and_(self, f, g):
+        return self._apply("and", f, g)
+
+    def or_(self, f, g):
+        return self._apply("or", f, g)
+
+    def xor(self, f, g):
+        return self._apply("xor", f, g)
+
+    def not_(self, f):
+        return self._apply("xor", f, self.TRUE)
+
+    # Queries 
+
+    def evaluate(self, f, values):
+        """
+        Returns value of function f for mapping of variables to values. 
+        """
+
+        while f > 1:
+            name = self.variables[self._level[f]]
+            f = self._high[f] if values.get(name) else self._low[f]
+
+        return bool(f)
+
+    def sat_count(self, f):
+        """
+        Returns number of assignments of all variables 
+        for which function f is true. 
+        """
+
+        counts = {0: 0, 1: 1}
+
+        def count(node):
+            # Number of assignments of variables below node's level 
+            if node not in counts:
+                level = self._level[node]
+                low = self._low[node]
+                high = self._high[node]
+
+                counts[node] = (
+                    count(low) << (self._level[low] - level - 1)
+                ) + (
+                    count(high) << (self._level[high] - level - 1)
+                )
+
+            return counts[node]
+
+        return count(f) << self._level[f]
+
+    def satisfy(self, f):
+        """
+        Returns mapping of variables to values for which function f 
+        is true or None if f is always false. Variables not affecting 
+        result are false. 
+        """
+
+        if f == self.FALSE:
+            return None
+
+        values = dict.fromkeys(self.variables, False)
+
+        while f > 1:
+            name = self.variables[self._level[f]]
+
+            if self._low[f] != self.FALSE:
+                f = self._low[f]
+            else:
+                values[name] = True
+                f = self._high[f]
+
+        return values
+
+def build(bdd, netlist, variables=None):
+    """
+    Returns dictionary mapping names of netlist's lamps to their 
+    BDD nodes. variables maps names of switches to names of BDD 
+    variables (switches are variables themselves by default). 
+    """
+
+    variables = variables or {}
+    operations = {"And": bdd.and_, "Or": bdd.or_, "Xor": bdd.xor}
+
+    order, _ = netlist.levelize()
+    nodes = [bdd.FALSE] * len(netlist.net_names)
+
+    for gate in order:
+        if gate.kind == "Lamp":
+            continue
+
+        if gate.kind == "Switch":
+            node = bdd.variable(variables.get(gate.name, gate.name))
+        elif gate.kind == "Not":
+            node = bdd.not_(nodes[gate.inputs[0]])
+        elif gate.kind in operations:
+            node = operations[gate.kind](*[nodes[net] for net in gate.inputs])
+        elif gate.kind in LIBRARY:
+            node = LIBRARY[gate.kind].apply(
+                [nodes[net] for net in gate.inputs], 
+                bdd.and_, bdd.or_, bdd.xor, bdd.not_, bdd.FALSE, bdd.TRUE
+            )
+        else:
+            raise ValueError(f"BDD of {gate.kind} gate can't be built")
+
+        # Net driven by several gates is active if any of them is active. 
+        nodes[gate.output] = bdd.or_(nodes[gate.output], node)
+
+    return {
+        gate.name: nodes[gate.inputs[0]]
+        for gate in netlist.gates if gate.kind == "Lamp"
+    }
+
+def dfs_order(netlist):
+    """
+    Returns switches names in order they are reached by depth-first 
+    search from lamps. Switches affecting the same lamps get close 
+    to each other, which usually keeps BDDs small. 
+    """
+
+    drivers = {}
+    for gate in netlist.gates:
+        if gate.output is not None:
+            drivers.setdefault(gate.output, []).append(gate)
+
+    order = []
+    visited = set()
+
+    for lamp in netlist.lamps:
+        stack = [lamp]
+
+        while stack:
+            gate = stack.pop()
+
+            if gate in visited:
+                continue
+            visited.add(gate)
+
+            if gate.kind == "Switch":
+                order.append(gate.name)
+
+            for net in reversed(gate.inputs):
+                stack.extend(reversed(drivers.get(net, ())))
+
+    # Switches not affecting any lamp
+    order.extend(
+        gate.name for gate in netlist.switches if gate not in visited
+    )
+
+    return order
+
+def from_netlist(netlist, order=None, **options):
+    """
+    Returns BDD manager and dictionary of lamps nodes of netlist. 
+    order is a list of switches names giving variable ordering, 
+    by default switches are ordered as in netlist. 
+    """
+
+    if order is None:
+        order = [gate.name for gate in netlist.switches]
+
+    bdd = BDD(order, **options)
+
+    return bdd, build(bdd, netlist)
@@ -0,0 +1,235 @@
+"""
+Contains on-disk cache of compiled evaluators of circuits. 
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+from simulation import CompiledCircuit
+
+DEFAULT_MAX_SIZE = 64 << 20   # in bytes 
+
+def default_directory():
+    """
+    Returns directory of cache given by LOGIC_CIRCUITS_CACHE 
+    environment variable or default user's cache directory. 
+    """
+
+    directory = os.environ.get("LOGIC_CIRCUITS_CACHE")
+
+    if not directory:
+        directory = os.path.join(
+            os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"),
+            "logic-circuits"
+        )
+
+    return directory
+
+class CompiledCache:
+    """
+    Directory of compiled evaluators (their sources and code objects) 
+    keyed by structural hashes of netlists and order of their switches 
+    and lamps, so circuits differing only by layout share one entry. 
+    Code objects depend on Python version, so every version has its 
+    own entries. 
+
+    Structural hash levelizes circuit, which costs almost as much as 
+    compiling it, so every entry also has an alias keyed by cheap hash 
+    of gates as they are listed (see Netlist.gates_hash). Circuit read 
+    again from the same file is found by its alias without levelizing, 
+    other circuits are levelized once and get their own aliases. 
+
+    Every file starts with checksum of its data: damaged files are 
+    detected and compiled again. Files are written to temporary files 
+    and renamed, so readers never see partly written ones. When total 
+    size exceeds max_size, least recently used files are removed. 
+    """
+
+    suffix = ".circuit"
+    alias_suffix = ".alias"
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def _get_path(self, key, suffix=None):
+        return os.path.join(self.directory, key + (suffix or self.suffix))
+
+    def get(self, netlist):
+        """
+        Returns CompiledCircuit of netlist from cache or compiles it 
+        and stores in cache. Circuit's inputs and outputs are always 
+        in order of netlist's switches and lamps. 
+        """
+
+        tag = sys.implementation.cache_tag
+
+        alias_path = self._get_path(
+            f"{netlist.gates_hash()}-{tag}", self.alias_suffix
+        )
+        alias = self._read(alias_path)
+
+        if alias is not None:
+            circuit = self._load(self._get_path(alias.decode()))
+
+            if circuit is not None:
+                self.hits += 1
+                return circuit
+
+        key = f"{netlist.structural_hash()}-{_ports_hash(netlist)}-{tag}"
+        path = self._get_path(key)
+        circuit = self._load(path)
+
+        if circuit is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+            circuit = CompiledCircuit(netlist)
+            self._write(path, marshal.dumps((circuit.source, circuit.code)))
+
+        self._write(alias_path, key.encode())
+
+        return circuit
+
+    def _load(self, path):
+        """
+        Returns CompiledCircuit stored in file or None if there is 
+        no file or it is damaged. 
+        """
+
+        data = self._read(path)
+
+        if data is None:
+            return None
+
+        try:
+            source, code = marshal.loads(data)
+            return CompiledCircuit(source=source, code=code)
+        except (ValueError, EOFError, TypeError, SyntaxError):
+            return None
+
+    def _read(self, path):
+        """
+        Returns data stored in file or None if there is no file 
+        or it is damaged. 
+        """
+
+        try:
+            with open(path, "rb") as file_:
+                checksum = file_.readline().rstrip(b"\n")
+                data = file_.read()
+        except OSError:
+            return None
+
+        if checksum != _checksum(data):
+            return None
+
+        # Access time is kept in modification time, so it works 
+        # on file systems mounted with noatime too. 
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return data
+
+    def _write(self, path, data):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            descriptor, temporary_path = tempfile.mkstemp(
+                suffix=".tmp", dir=self.directory
+            )
+        except OSError:
+            # Cache is only an optimization. 
+            return
+
+        try:
+            with os.fdopen(descriptor, "wb") as file_:
+                file_.write(_checksum(data) + b"\n")
+                file_.write(data)
+
+                file_.flush()
+                os.fsync(file_.fileno())
+
+            os.replace(temporary_path, path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes least recently used files until total size of cache 
+        is not greater than max_size. 
+        """
+
+        entries = []
+        total_size = 0
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        for name in names:
+            if not name.endswith((self.suffix, self.alias_suffix)):
+                continue
+
+            path = os.path.join(self.directory, name)
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # File was removed by another process. 
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            total_size -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith((self.suffix, self.alias_suffix)):
+                os.remove(os.path.join(self.directory, name))
+
+def _ports_hash(netlist):
+    # Vectors are matched with switches and lamps by position, so 
+    # circuits with the same structure, but ports in different order, 
+    # need their own entries. 
+    names = (
+        [gate.name for gate in netlist.switches] + [""] 
+        + [gate.name for gate in netlist.lamps]
+    )
+
+    return hashlib.blake2b(
+        "\t".join(names).encode(), digest_size=8
+    ).hexdigest()
+
+def _checksum(data):
+    return hashlib.sha256(data).hexdigest().encode()
@@ -2,14 +2,31 @@
 Contains some classes implementing elements' logic. 
 """
 
-from PyQt5.QtCore import Qt, QRect, QPoint
-from PyQt5.QtGui import QPainterPath, QPen, QBrush
+import math
+
+from PyQt5.QtCore import Qt, QRect, QPoint, QPointF
+from PyQt5.QtGui import QPainterPath, QPen, QBrush, QPolygonF
 
 from palette import Palette
 
 class Contact:
+    __slots__ = (
+        "element", "cx", "cy", "r", "_terminal", "_wire", 
+        "_type", "links", "condition"
+    )
+
     default_r = 10
 
+    # Width of pen drawing contact's wire 
+    pen_width = 6
+
+    # Buses carry integers and are connected only to buses. 
+    bus = False
+
+    # Terminals are shared by all contacts placed at the same point 
+    # of element, i.e. by the same contacts of all elements of a type. 
+    _terminals = {}
+
     def __init__(self, element, type_, cx, cy, wire):
         self.element = element
 
@@ -17,20 +34,36 @@ class Contact:
         self.cy = cy
         self.r = self.default_r
 
-        self._terminal = QPainterPath()
-        self._terminal.addEllipse(cx - self.r, cy - self.r,
-                                  2*self.r, 2*self.r)
+        self._terminal = self._get_terminal(cx, cy)
         self._wire = wire
 
         self._type = type_   # "i" - input; "o" - output 
-        self.links = set()
+
+        # Pins have only a few links, so list is much more compact 
+        # than set here. Link.bind doesn't allow duplicates in it. 
+        self.links = []
         self.condition = False   # False - inactive; True - active 
 
+    @classmethod
+    def _get_terminal(cls, cx, cy):
+        terminal = cls._terminals.get((cx, cy))
+
+        if terminal is None:
+            r = cls.default_r
+
+            terminal = QPainterPath()
+            terminal.addEllipse(cx - r, cy - r, 2*r, 2*r)
+
+            cls._terminals[(cx, cy)] = terminal
+
+        return terminal
 
     def draw(self, painter):
-        color = Palette.element.contact[self.condition]
+        color = Palette.element.contact[bool(self.condition)]
 
-        pen = QPen(color, 6, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        pen = QPen(
+            color, self.pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin
+        )
         brush = QBrush(color)
 
         painter.strokePath(self._wire, pen)
@@ -46,7 +79,7 @@ class Contact:
 
         r = cls.default_r
 
-        painter.drawEllipse(data[1] - r, data[2] - r, 2*r, 2*r)
+        painter.drawEllipse(QPointF(data[1], data[2]), r, r)
         painter.drawPath(data[3])
 
 
@@ -82,7 +115,7 @@ class Contact:
 
     def try_to_connect_to(self, contacts):
         for contact in contacts:
-            if self.is_overlaid_on(contact):
+            if contact.bus == self.bus and self.is_overlaid_on(contact):
                 self.move_to(contact.abs_cx, contact.abs_cy)
                 self.connect_to(contact)
 
@@ -110,16 +143,23 @@ class Contact:
                     link.element.upd(updating_element=self.element)
 
 class WireContact(Contact):
+    __slots__ = ("segments",)
+
     def __init__(self, element, cx, cy):
         # Type of WireContact is "io", 
         # i.e. and input, and output at the same time. 
         Contact.__init__(self, element, "io", cx, cy, None)
 
-        self.segments = []
+        self.segments = set()
+
+    @classmethod
+    def _get_terminal(cls, cx, cy):
+        # WireContact is drawn by its wire, so it doesn't need terminal. 
+        return None
 
     def draw(self, painter):
         r = round(self.r)
-        painter.drawEllipse(self.cx - r, self.cy - r, 2*r, 2*r)
+        painter.drawEllipse(QPointF(self.cx, self.cy), r, r)
 
     def move_to(self, cx, cy):
         """
@@ -145,13 +185,43 @@ class WireContact(Contact):
 
         return not self.links and len(self.segments) < 2
 
+class BusContact(Contact):
+    """
+    Contact of bus. Its condition is integer, which bits are values 
+    of bus's lines, so input receives bitwise OR of linked outputs. 
+    """
+
+    __slots__ = ()
+
+    pen_width = 14
+    bus = True
+
+    def receive_signals(self):
+        if "i" in self._type:
+            condition = 0
+
+            for link in self.links:
+                if "o" in link.contact._type:
+                    condition |= link.contact.condition
+
+            self.condition = condition
+
+class BusWireContact(BusContact, WireContact):
+    __slots__ = ()
+
 class WireSegment:
+    __slots__ = ("wire", "contacts", "path")
+
     def __init__(self, wire, contact_0, contact_1):
         self.wire = wire
-        self.contacts = [contact_0, contact_1]
+        self.contacts = (contact_0, contact_1)
 
-        contact_0.segments.append(self)
-        contact_1.segments.append(self)
+        # Points of route found by autorouter relative to sandbox's 
+        # circuit origin or None if segment is drawn as L-shape. 
+        self.path = None
+
+        contact_0.segments.add(self)
+        contact_1.segments.add(self)
 
     def draw(self, painter):
         """
@@ -159,6 +229,10 @@ class WireSegment:
         using painter. 
         """
 
+        if self.path:
+            painter.drawPolyline(self._get_polygon())
+            return
+
         cx_0 = self.contacts[0].cx
         cy_0 = self.contacts[0].cy
         cx_1 = self.contacts[1].cx
@@ -168,17 +242,48 @@ class WireSegment:
         kx = -(cx_1 - cx_0 < 0) | (cx_1 - cx_0 > 0)
         ky = -(cy_1 - cy_0 < 0) | (cy_1 - cy_0 > 0)
 
-        painter.drawLine(cx_0 + r*kx, cy_0, cx_1, cy_0)
-        painter.drawLine(cx_1, cy_0, cx_1, cy_1 - r*ky)
+        painter.drawLine(QPointF(cx_0 + r*kx, cy_0), QPointF(cx_1, cy_0))
+        painter.drawLine(QPointF(cx_1, cy_0), QPointF(cx_1, cy_1 - r*ky))
 
-    def get_rect(self):
-        rect = QRect(
-            QPoint(self.contacts[0].abs_cx, self.contacts[0].abs_cy), 
-            QPoint(self.contacts[1].abs_cx, self.contacts[1].abs_cy)
-        )
+    def _get_polygon(self):
+        """
+        Returns polygon of path relative to wire. Its ends are moved 
+        to borders of contacts like ends of L-shaped segment. 
+        """
+
+        origin = self.wire.parentWidget().circuit_origin
+        dx = origin.x() - self.wire.x()
+        dy = origin.y() - self.wire.y()
+
+        points = [QPointF(x + dx, y + dy) for x, y in self.path]
         r = self.contacts[0].r
 
-        return rect.normalized().adjusted(-r, -r, r, r)
+        for end, neighbour in ((0, 1), (-1, -2)):
+            vector = points[neighbour] - points[end]
+            length = abs(vector.x()) + abs(vector.y())
+
+            if length > r:
+                points[end] += vector * (r / length)
+
+        return QPolygonF(points)
+
+    def get_rect(self):
+        points = [
+            QPoint(contact.abs_cx, contact.abs_cy) for contact in self.contacts
+        ]
+
+        if self.path:
+            origin = self.wire.parentWidget().circuit_origin
+            points.extend(origin + QPoint(x, y) for x, y in self.path)
+
+        xs = [point.x() for point in points]
+        ys = [point.y() for point in points]
+
+        rect = QRect(QPoint(min(xs), min(ys)), QPoint(max(xs), max(ys)))
+        # Radius of scaled contact is fractional, but QRect's isn't. 
+        r = math.ceil(self.contacts[0].r)
+
+        return rect.adjusted(-r, -r, r, r)
 
     def is_invalid(self):
         """
@@ -193,28 +298,70 @@ class WireSegment:
         else:
             return False
 
+    def other_contact(self, contact):
+        """
+        Returns contact of segment which is opposite to contact. 
+        """
+
+        return self.contacts[self.contacts[0] is contact]
+
     def remove(self):
         """
-        Removes segment and its invalid contacts from its wire. 
+        Detaches segment from its contacts. Removed segments and 
+        contacts are dropped from wire's lists by Wire.update_segments. 
         """
 
-        self.wire.segments.remove(self)
+        self.contacts[0].segments.discard(self)
+        self.contacts[1].segments.discard(self)
+
+class ContactsGrid:
+    """
+    Spatial hash of contacts. Allows to find contacts which can be 
+    overlaid on a given one without checking every pair of contacts. 
+    """
 
-        if self.contacts[0].is_invalid():
-            self.wire.contacts.remove(self.contacts[0])
+    def __init__(self, contacts):
+        contacts = list(contacts)
 
-        if self.contacts[1].is_invalid():
-            self.wire.contacts.remove(self.contacts[1])
+        # Two contacts can be overlaid only if distance between 
+        # their centers is not greater than sum of their radii. 
+        self._cell_size = max(
+            [2 * contact.r for contact in contacts], default=1
+        )
+        self._cells = {}
+
+        for contact in contacts:
+            cell = self._get_cell(contact.abs_cx, contact.abs_cy)
+            self._cells.setdefault(cell, []).append(contact)
 
-        self.contacts[0].segments.remove(self)
-        self.contacts[1].segments.remove(self)
+    def _get_cell(self, x, y):
+        return int(x // self._cell_size), int(y // self._cell_size)
+
+    def near(self, contact):
+        """
+        Returns list of contacts from cells adjacent to contact's one. 
+        """
+
+        column, row = self._get_cell(contact.abs_cx, contact.abs_cy)
+
+        contacts = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                contacts.extend(self._cells.get((column + dx, row + dy), ()))
+
+        return contacts
 
 class Link:
+    __slots__ = ("contact", "_trackback")
+
     def __init__(self, contact):
         self.contact = contact
-        self.element = contact.element
         self._trackback = None
 
+    @property
+    def element(self):
+        return self.contact.element
+
     def __eq__(self, other):
         return self.contact is other.contact
 
@@ -222,20 +369,100 @@ class Link:
         return hash(self.contact)
 
     @classmethod
-    def bind(cls, contact_0, contact_1):
+    def bind(cls, contact_0, contact_1, update=True):
+        """
+        Links two contacts. If update is False, conditions of their 
+        elements are not updated (it is useful when whole circuit 
+        is built at once and its conditions are set afterwards). 
+        """
+
         link_0 = cls(contact_1)
-        link_1 = cls(contact_0)
 
-        contact_0.links.add(link_0)
-        contact_1.links.add(link_1)
+        if link_0 not in contact_0.links:
+            link_1 = cls(contact_0)
+
+            contact_0.links.append(link_0)
+            contact_1.links.append(link_1)
 
-        link_0._trackback = link_1
-        link_1._trackback = link_0
+            link_0._trackback = link_1
+            link_1._trackback = link_0
 
-        contact_0.element.upd()
+            _mark_in_journal(contact_0, contact_1)
+            _update_order(contact_0, contact_1, True)
+
+        if update:
+            contact_0.element.upd()
 
     def remove(self):
         self._trackback.contact.links.remove(self)
         self.contact.links.remove(self._trackback)
 
+        _mark_in_journal(self.contact, self._trackback.contact)
+        _update_order(self.contact, self._trackback.contact, False)
+
         self.element.upd(update_wire_segments=True)
+
+def _mark_in_journal(contact_0, contact_1):
+    """
+    Marks elements of linked (or unlinked) contacts as changed 
+    in journal of sandbox, if it is autosaved. 
+    """
+
+    journal = contact_0.element.parentWidget().journal
+
+    if journal is not None:
+        journal.mark((contact_0.element, contact_1.element))
+
+def _gives_edge(source, target):
+    """
+    Returns whether link from contact source to contact target gives 
+    edge of topological order: from element of output to element 
+    of input. Contacts of wires are both inputs and outputs, but a wire 
+    only continues another one, so links of wires give no edges. 
+    """
+
+    return (
+        "o" in source._type and "i" in target._type 
+        and source._type != target._type
+    )
+
+def get_successors(element):
+    """
+    Returns list of elements, to which outputs of element are linked, 
+    an element once per link giving edge of topological order. 
+    """
+
+    return [
+        link.element for contact in element.contacts 
+        for link in contact.links if _gives_edge(contact, link.contact)
+    ]
+
+def get_predecessors(element):
+    """
+    Returns list of elements, whose outputs are linked to inputs 
+    of element, an element once per link giving edge of topological 
+    order. 
+    """
+
+    return [
+        link.element for contact in element.contacts 
+        for link in contact.links if _gives_edge(link.contact, contact)
+    ]
+
+def _update_order(contact_0, contact_1, linked):
+    """
+    Adds (or removes) edge of topological order of sandbox given 
+    by link of contacts, if it gives one. Sandbox shows loop closed 
+    by new edge. 
+    """
+
+    sandbox = contact_0.element.parentWidget()
+    order = sandbox.topological_order
+
+    for source, target in ((contact_0, contact_1), (contact_1, contact_0)):
+        if _gives_edge(source, target):
+            if linked:
+                if not order.add_edge(source.element, target.element):
+                    sandbox.report_cycle(source.element, target.element)
+            else:
+                order.remove_edge(source.element, target.element)
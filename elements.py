@@ -2,12 +2,16 @@
 Contains circuit elements widgets for creating circuits. 
 """
 
-from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtCore import Qt, QRect, QRectF, QPointF
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QPen, QBrush
+from PyQt5.QtGui import QPainter, QPen, QBrush, QFont, QTransform
 
-from connections import Contact, WireContact, WireSegment
+from connections import (
+    Contact, WireContact, WireSegment, ContactsGrid, BusContact, 
+    BusWireContact
+)
 
+from gatelib import LIBRARY
 from graphics import Graphics
 from palette import Palette
 
@@ -17,12 +21,22 @@ class LogicElement(QWidget):
 
     contacts_data = []
 
+    # Indexes of contacts carrying buses 
+    bus_contacts = ()
+
+    # Waveform recording element's condition, if it is probed. 
+    probe = None
+
     def __init__(self, parent):
         QWidget.__init__(self, parent)
 
+        # Counters of toggles of sandbox, if activity is recorded. 
+        self.toggle_counters = parent.toggle_counters
+
         self.contacts = []
-        for data in self.contacts_data:
-            self.contacts.append(Contact(self, *data))
+        for n, data in enumerate(self.contacts_data):
+            constructor = BusContact if n in self.bus_contacts else Contact
+            self.contacts.append(constructor(self, *data))
 
         self.scale_value = 1
         self.hover = False
@@ -64,6 +78,17 @@ class LogicElement(QWidget):
 
             self.update_condition()
 
+            if self.probe is not None:
+                self.probe.record(self.condition)
+
+            # The last contact is the output of element, or the input 
+            # of lamp, or any contact of wire. 
+            if self.toggle_counters is not None:
+                counters = self.toggle_counters
+                counters.record(
+                    counters.get_index(self), self.contacts[-1].condition
+                )
+
             if updating_element:
                 self.update_stack = [
                     *updating_element.update_stack, updating_element
@@ -80,16 +105,24 @@ class LogicElement(QWidget):
         self.parentWidget().remove_element(self)
 
 class DraggableElement(LogicElement):
+    # Layouts of elements for each element class, rotation and scale, 
+    # see DraggableElement.get_layout. 
+    _layouts = {}
+
     def __init__(self, parent):
         LogicElement.__init__(self, parent)
 
         self._rotation = 0   # in degrees 
+        self.name = None   # name of element in netlist 
         self._press_pos = None
 
         # At the time of creation of new wire (or its new segment), 
         # created_wire stores this new (or already existing) wire. 
         self._created_wire = None
 
+        self._transform = None
+        self._apply_layout()
+
         self.setCursor(Qt.PointingHandCursor)
 
     # Drawing 
@@ -107,9 +140,9 @@ class DraggableElement(LogicElement):
             )
             painter.setPen(pen)
 
-            painter.drawRect(
+            painter.drawRect(QRectF(
                 1.5, 1.5, self.default_width - 3, self.default_height - 3
-            )
+            ))
 
         for contact in self.contacts:
             contact.draw(painter)
@@ -123,16 +156,7 @@ class DraggableElement(LogicElement):
         painter.end()
 
     def transform_painter(self, painter):
-        painter.rotate(self._rotation)
-
-        w = self.width()
-        h = self.height()
-        offsets = [
-            (0, 0), (0, -w), (-w, -h), (-h, 0)
-        ][self._rotation // 90]
-
-        painter.translate(*offsets)
-        painter.scale(self.scale_value, self.scale_value)
+        painter.setTransform(self._transform)
 
     def draw_outline(self, painter, pen):
         painter.strokePath(self.outline, pen)
@@ -186,7 +210,8 @@ class DraggableElement(LogicElement):
                     # or creating new. 
                     else:
                         self._created_wire = self.parentWidget().add_wire(
-                            contact.abs_cx, contact.abs_cy, new_cx, new_cy
+                            contact.abs_cx, contact.abs_cy, new_cx, new_cy, 
+                            constructor=BusWire if contact.bus else Wire
                         )
 
                         for link in contact.links:
@@ -203,6 +228,10 @@ class DraggableElement(LogicElement):
                     self.condition = not self.condition
                     self.upd()
 
+                    journal = self.parentWidget().journal
+                    if journal is not None:
+                        journal.mark((self,))
+
     def mouseMoveEvent(self, event):
         # Moving self .. 
         if self._press_pos:
@@ -221,11 +250,14 @@ class DraggableElement(LogicElement):
             self._press_pos = None
 
             self.connect_to(self.parentWidget().elements)
+            self.parentWidget().update_placement({self})
 
         elif self._created_wire:
             self._created_wire.connect_to(
                 self.parentWidget().elements
             )
+            self.parentWidget().update_placement({self._created_wire})
+
             self._created_wire = None
 
     def enterEvent(self, event):
@@ -238,42 +270,80 @@ class DraggableElement(LogicElement):
 
     # Additional methods 
 
-    def scale(self, q):
-        self.scale_value *= q
+    @classmethod
+    def get_layout(cls, rotation, scale_value):
+        """
+        Returns tuple with element's width and height, painter transform, 
+        contacts coordinates and radius for given rotation and scale. 
 
-        width = round(self.default_width * self.scale_value)
-        height = round(self.default_height * self.scale_value)
+        Layouts are computed once from default element's geometry, 
+        so rotating and scaling never accumulate rounding errors. 
+        """
 
-        if self._rotation % 180 == 0:
-            self.resize(width, height)
-        else:
-            self.resize(height, width)
+        key = (cls, rotation, scale_value)
+        layout = cls._layouts.get(key)
 
-        for contact in self.contacts:
-            contact.scale(q)
+        if layout is None:
+            width = round(cls.default_width * scale_value)
+            height = round(cls.default_height * scale_value)
+
+            if rotation % 180 != 0:
+                width, height = height, width
+
+            offsets = [
+                (0, 0), (0, -width), (-width, -height), (-height, 0)
+            ][rotation // 90]
+
+            transform = QTransform()
+            transform.rotate(rotation)
+            transform.translate(*offsets)
+            transform.scale(scale_value, scale_value)
+
+            contacts_coords = []
+            for data in cls.contacts_data:
+                point = transform.map(QPointF(data[1], data[2]))
+                contacts_coords.append((point.x(), point.y()))
+
+            contact_r = Contact.default_r * scale_value
+
+            layout = (
+                width, height, transform, tuple(contacts_coords), contact_r
+            )
+            cls._layouts[key] = layout
+
+        return layout
+
+    def _apply_layout(self):
+        layout = self.get_layout(self._rotation, self.scale_value)
+        width, height, self._transform, contacts_coords, contact_r = layout
+
+        self.resize(width, height)
+
+        for contact, (cx, cy) in zip(self.contacts, contacts_coords):
+            contact.cx = cx
+            contact.cy = cy
+            contact.r = contact_r
+
+    def scale(self, q):
+        self.scale_value *= q
+        self._apply_layout()
 
     def rotate(self, angle):
         self._rotation = (self._rotation + angle) % 360
+        self._apply_layout()
 
-        if angle % 180 == 0:
-            for contact in self.contacts:
-                contact.cx = self.width() - contact.cx
-                contact.cy = self.height() - contact.cy
-        else:
-            self.resize(self.height(), self.width())
+        self.update()
 
-            for contact in self.contacts:
-                if angle > 0:
-                    new_cx = self.width() - contact.cy
-                    new_cy = contact.cx
-                elif angle < 0:
-                    new_cx = contact.cy
-                    new_cy = self.height() - contact.cx
+    def get_state(self):
+        """
+        Returns state of element set by user (e.g. switch's condition), 
+        which is saved with its position, or None. 
+        """
 
-                contact.cx = new_cx
-                contact.cy = new_cy
+        return None
 
-        self.update()
+    def set_state(self, state):
+        pass
 
 class And(DraggableElement):
     default_width, default_height, outline, contacts_data = Graphics.And()
@@ -310,6 +380,47 @@ class Not(DraggableElement):
 
         self.contacts[1].condition = not i0
 
+class LibraryElement(DraggableElement):
+    """
+    Base class of elements generated from gates of library 
+    (see gatelib.py). 
+    """
+
+    definition = None
+
+    def update_condition(self):
+        contacts = self.contacts
+
+        # Mask True makes output boolean. 
+        contacts[-1].condition = self.definition.function(
+            True, *[contact.condition for contact in contacts[:-1]]
+        )
+
+def _create_library_element(definition):
+    default_width, default_height, outline, contacts_data = Graphics.gate(
+        definition
+    )
+
+    return type(definition.name, (LibraryElement,), {
+        "definition": definition,
+        "default_width": default_width,
+        "default_height": default_height,
+        "outline": outline,
+        "contacts_data": contacts_data
+    })
+
+# Element classes of library's gates by their names 
+LIBRARY_ELEMENTS = {
+    name: _create_library_element(definition)
+    for name, definition in LIBRARY.items()
+}
+
+Nand = LIBRARY_ELEMENTS["Nand"]
+Nor = LIBRARY_ELEMENTS["Nor"]
+Xnor = LIBRARY_ELEMENTS["Xnor"]
+Buffer = LIBRARY_ELEMENTS["Buffer"]
+Mux = LIBRARY_ELEMENTS["Mux"]
+
 class Switch(DraggableElement):
     default_width, default_height, base, toggle, toggle_offset, contacts_data = Graphics.Switch()
     condition = False   # False - inactive; True - active 
@@ -349,6 +460,12 @@ class Switch(DraggableElement):
     def update_condition(self):
         self.contacts[0].condition = self.condition
 
+    def get_state(self):
+        return self.condition
+
+    def set_state(self, state):
+        self.condition = state
+
 class Lamp(DraggableElement):
     default_width, default_height, base, bulb, contacts_data, contact_height = Graphics.Lamp()
     condition = False   # False - inactive; True - active 
@@ -381,12 +498,15 @@ class Lamp(DraggableElement):
 class Wire(LogicElement):
     condition = False
 
+    contact_class = WireContact
+    pen_width = 6
+
     def __init__(self, parent):
         LogicElement.__init__(self, parent)
 
         self.contacts = [
-            WireContact(self, 0, 0), 
-            WireContact(self, 0, 0)
+            self.contact_class(self, 0, 0), 
+            self.contact_class(self, 0, 0)
         ]
         self.segments = [WireSegment(self, *self.contacts)]
 
@@ -395,8 +515,8 @@ class Wire(LogicElement):
         painter.setRenderHint(QPainter.Antialiasing)
 
         pen = QPen(
-            Palette.element.contact[self.condition], 
-            round(6 * self.scale_value), 
+            Palette.element.contact[bool(self.condition)], 
+            round(self.pen_width * self.scale_value), 
             Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin
         )
         painter.setPen(pen)
@@ -417,14 +537,26 @@ class Wire(LogicElement):
 
         self.maximize()
 
-        new_contact = WireContact(self, 0, 0)
+        new_contact = self.add_contact(cx, cy)
+        self.segments.append(
+            WireSegment(self, existing_contact, new_contact)
+        )
+
+    def add_contact(self, cx, cy):
+        """
+        Adds new contact at cx and cy relative to the window to wire, 
+        which should be maximized, and returns it. Unlike add_segment 
+        it doesn't maximize wire, so wire with many contacts is built 
+        in linear time. 
+        """
+
+        new_contact = self.contact_class(self, 0, 0)
         new_contact.scale(self.scale_value)
         new_contact.move_to(cx, cy)
 
-        new_segment = WireSegment(self, existing_contact, new_contact)
-
         self.contacts.append(new_contact)
-        self.segments.append(new_segment)
+
+        return new_contact
 
     def scale(self, q):
         self.scale_value *= q
@@ -466,16 +598,44 @@ class Wire(LogicElement):
     def update_segments(self):
         """
         Determines invalid segments and removes them. 
-        """
 
-        while True:
-            for segment in self.segments:
-                if segment.is_invalid():
-                    segment.remove()
+        Invalid contacts are pruned like leaves of a tree: removing 
+        segment can invalidate only its opposite contact, so every 
+        segment and contact is visited at most once. 
+        """
 
-                    break
-            else:
-                break
+        invalid_contacts = [
+            contact for contact in self.contacts if contact.is_invalid()
+        ]
+        removed_contacts = set(invalid_contacts)
+        removed_segments = set()
+
+        while invalid_contacts:
+            contact = invalid_contacts.pop()
+
+            for segment in list(contact.segments):
+                segment.remove()
+                removed_segments.add(segment)
+
+                other_contact = segment.other_contact(contact)
+                if (other_contact not in removed_contacts
+                        and other_contact.is_invalid()):
+                    removed_contacts.add(other_contact)
+                    invalid_contacts.append(other_contact)
+
+        if removed_segments:
+            router = self.parentWidget().router
+            for segment in removed_segments:
+                router.remove_route(segment)
+
+            self.segments = [
+                segment for segment in self.segments 
+                if segment not in removed_segments
+            ]
+            self.contacts = [
+                contact for contact in self.contacts 
+                if contact not in removed_contacts
+            ]
 
         if self.segments:
             self.minimize()
@@ -494,6 +654,187 @@ class Wire(LogicElement):
         for contact in self.contacts:
             contact.condition = self.condition
 
+class BusWire(Wire):
+    """
+    Wire of bus carrying integer. Lines driven by several outputs 
+    are OR-ed like single wires. 
+    """
+
+    condition = 0
+
+    contact_class = BusWireContact
+    pen_width = 14
+
+    def update_condition(self):
+        condition = 0
+        for contact in self.contacts:
+            condition |= contact.condition
+
+        self.condition = condition
+
+        for contact in self.contacts:
+            contact.condition = condition
+
+class BusElement(DraggableElement):
+    """
+    Element applying operation to whole words carried by buses, 
+    so word of any width costs one contact, link and update. 
+    Bus contacts are marked with slashes. 
+    """
+
+    # Integer set by user (index of bit, width or value) and its name, 
+    # if element has it. 
+    parameter = None
+    parameter_name = None
+
+    def draw_outline(self, painter, pen):
+        painter.strokePath(self.outline, pen)
+
+        painter.setPen(pen)
+        self._draw_marks(painter)
+
+        label = self.get_label()
+
+        if label is not None:
+            painter.setFont(QFont("Sans", 48))
+            painter.drawText(
+                self.outline.boundingRect(), Qt.AlignCenter, label
+            )
+
+    @classmethod
+    def draw_in_panel(cls, painter, panel_width, panel_height):
+        super().draw_in_panel(painter, panel_width, panel_height)
+
+        cls._draw_marks(painter)
+
+    @classmethod
+    def _draw_marks(cls, painter):
+        for n in cls.bus_contacts:
+            point = cls.contacts_data[n][3].pointAtPercent(0.5)
+
+            painter.drawLine(
+                point + QPointF(-12, 24), point + QPointF(12, -24)
+            )
+
+    def get_label(self):
+        return None
+
+    def get_state(self):
+        return self.parameter
+
+    def set_state(self, state):
+        self.parameter = state
+
+class BusAnd(BusElement):
+    default_width, default_height, outline, contacts_data = Graphics.And()
+    bus_contacts = (0, 1, 2)
+
+    def update_condition(self):
+        self.contacts[2].condition = (
+            self.contacts[0].condition & self.contacts[1].condition
+        )
+
+class BusOr(BusElement):
+    default_width, default_height, outline, contacts_data = Graphics.Or()
+    bus_contacts = (0, 1, 2)
+
+    def update_condition(self):
+        self.contacts[2].condition = (
+            self.contacts[0].condition | self.contacts[1].condition
+        )
+
+class BusXor(BusElement):
+    default_width, default_height, outline, contacts_data = Graphics.Xor()
+    bus_contacts = (0, 1, 2)
+
+    def update_condition(self):
+        self.contacts[2].condition = (
+            self.contacts[0].condition ^ self.contacts[1].condition
+        )
+
+class BusNot(BusElement):
+    default_width, default_height, outline, contacts_data = Graphics.Not()
+    bus_contacts = (0, 1)
+
+    parameter = 8
+    parameter_name = "Width"
+
+    def update_condition(self):
+        mask = (1 << self.parameter) - 1
+
+        self.contacts[1].condition = ~self.contacts[0].condition & mask
+
+class Split(BusElement):
+    """
+    Takes one bit of bus. 
+    """
+
+    default_width, default_height, outline, contacts_data = Graphics.Split()
+    bus_contacts = (0,)
+
+    parameter = 0
+    parameter_name = "Bit"
+
+    def get_label(self):
+        return f"[{self.parameter}]"
+
+    def update_condition(self):
+        self.contacts[1].condition = bool(
+            self.contacts[0].condition >> self.parameter & 1
+        )
+
+class Merge(BusElement):
+    """
+    Replaces one bit of bus (the upper input) by single line 
+    (the lower input). 
+    """
+
+    default_width, default_height, outline, contacts_data = Graphics.Merge()
+    bus_contacts = (0, 2)
+
+    parameter = 0
+    parameter_name = "Bit"
+
+    def get_label(self):
+        return f"[{self.parameter}]"
+
+    def update_condition(self):
+        bit = 1 << self.parameter
+
+        self.contacts[2].condition = (
+            self.contacts[0].condition & ~bit 
+            | (bit if self.contacts[1].condition else 0)
+        )
+
+class BusSwitch(BusElement):
+    default_width, default_height, outline, contacts_data = (
+        Graphics.BusSwitch()
+    )
+    bus_contacts = (0,)
+
+    parameter = 0
+    parameter_name = "Value"
+
+    def get_label(self):
+        return hex(self.parameter)
+
+    def update_condition(self):
+        self.contacts[0].condition = self.parameter
+
+class BusLamp(BusElement):
+    default_width, default_height, outline, contacts_data = (
+        Graphics.BusLamp()
+    )
+    bus_contacts = (0,)
+
+    condition = 0
+
+    def get_label(self):
+        return hex(self.condition)
+
+    def update_condition(self):
+        self.condition = self.contacts[0].condition
+
 class ElementsGroup(QWidget):
     def __init__(self, parent, initial_mouse_pos):
         QWidget.__init__(self, parent)
@@ -536,12 +877,7 @@ class ElementsGroup(QWidget):
         if event.button() == 1:
             self._press_pos = event.pos()
 
-            if self.elements != self.parentWidget().elements:
-                for element in self.elements:
-                    element.disconnect_from(
-                        self.parentWidget().elements - self.elements
-                    )
-                    element.upd()
+            self._detach_boundary_links()
 
             self.setCursor(Qt.SizeAllCursor)
 
@@ -556,15 +892,58 @@ class ElementsGroup(QWidget):
         if self._press_pos:
             self._press_pos = None
 
-            if self.elements != self.parentWidget().elements:
-                for element in self.elements:
-                    element.connect_to(
-                        self.parentWidget().elements - self.elements
-                    )
+            self._attach_boundary_contacts()
+            self.parentWidget().update_placement(self.elements)
 
             self.update_()
             self.setCursor(Qt.PointingHandCursor)
 
+    def _detach_boundary_links(self):
+        """
+        Removes only links crossing group border. Links between 
+        grouped elements and their conditions stay untouched. 
+        """
+
+        boundary_links = [
+            (contact, link)
+            for element in self.elements
+            for contact in element.contacts
+            for link in contact.links
+            if link.element not in self.elements
+        ]
+
+        detached_elements = set()
+        for contact, link in boundary_links:
+            # Link can be already removed together with outer wire 
+            # which was removed because of previous detached links. 
+            if link in contact.links:
+                link.remove()
+                detached_elements.add(contact.element)
+
+        for element in detached_elements & self.parentWidget().elements:
+            element.upd()
+
+    def _attach_boundary_contacts(self):
+        """
+        Connects grouped elements to overlaid contacts of elements 
+        outside the group, looking only at nearby contacts. 
+        """
+
+        sandbox = self.parentWidget()
+
+        outer_contacts = ContactsGrid(
+            contact
+            for element in sandbox.elements - self.elements
+            for contact in element.contacts
+        )
+
+        for element in list(self.elements):
+            for contact in element.contacts:
+                contact.try_to_connect_to(outer_contacts.near(contact))
+
+            if isinstance(element, Wire) and element in sandbox.elements:
+                element.update_segments()
+
     def resize_(self, mouse_pos):
         self.setGeometry(
             QRect(self._initial_mouse_pos, mouse_pos).normalized()
@@ -0,0 +1,214 @@
+"""
+Contains equivalence checking of two circuits with the same 
+switches and lamps. 
+
+Usage: python equivalence.py <circuit_0> <circuit_1> 
+"""
+
+import random
+import sys
+
+import netlist
+from bdd import BDD, BDDSizeError, build, dfs_order
+from simulation import CompiledCircuit, exhaustive_patterns, outer_values
+
+EQUIVALENT = "equivalent"
+DIFFERENT = "different"
+UNKNOWN = "unknown"
+
+class Counterexample:
+    """
+    Input vector on which circuits have different lamps values. 
+
+    inputs is a pair of dictionaries mapping names of switches 
+    of each circuit to their values. 
+    """
+
+    def __init__(self, inputs, different_lamps):
+        self.inputs = inputs
+        self.different_lamps = different_lamps
+
+    def __str__(self):
+        values = ", ".join(
+            f"{name}={int(value)}" for name, value in self.inputs[0].items()
+        )
+
+        return f"{values} (different: {', '.join(self.different_lamps)})"
+
+def match_interfaces(netlist_0, netlist_1):
+    """
+    Returns pairs of lists of switches and lamps names of both netlists 
+    in matching order. Switches and lamps are matched by names 
+    or, if names differ, by their order. 
+    """
+
+    pairs = []
+
+    for kind in ("Switch", "Lamp"):
+        names = [
+            [gate.name for gate in netlist_.gates if gate.kind == kind]
+            for netlist_ in (netlist_0, netlist_1)
+        ]
+
+        if len(names[0]) != len(names[1]):
+            raise ValueError(
+                f"Circuits have different numbers of {kind} elements"
+            )
+
+        if set(names[0]) == set(names[1]):
+            names[1] = list(names[0])
+
+        pairs.append(names)
+
+    return pairs
+
+def _counterexample(switches, lamps, values, difference, bit):
+    inputs = tuple(
+        {name: bool(value >> bit & 1) for name, value in zip(names, values)}
+        for names in switches
+    )
+    different_lamps = [
+        name for name, value in zip(lamps[0], difference) if value >> bit & 1
+    ]
+
+    return Counterexample(inputs, different_lamps)
+
+def _compare(circuits, switches, lamps, values, mask):
+    """
+    Evaluates both circuits on packed input vectors. Returns 
+    Counterexample for the first differing vector or None. 
+    """
+
+    outputs = [
+        circuit.evaluate(dict(zip(names, values)), mask)
+        for circuit, names in zip(circuits, switches)
+    ]
+    outputs = [
+        dict(zip(circuit.outputs, values))
+        for circuit, values in zip(circuits, outputs)
+    ]
+
+    difference = [
+        outputs[0][name_0] ^ outputs[1][name_1]
+        for name_0, name_1 in zip(*lamps)
+    ]
+
+    differing_vectors = 0
+    for value in difference:
+        differing_vectors |= value
+
+    if not differing_vectors:
+        return None
+
+    bit = (differing_vectors & -differing_vectors).bit_length() - 1
+
+    return _counterexample(switches, lamps, values, difference, bit)
+
+def _exhaustive_words(inputs_number, word_bits):
+    """
+    Yields packed values of inputs and mask enumerating all 
+    input vectors. First inputs change inside word and the others 
+    are constant inside it. 
+    """
+
+    inner_number = min(inputs_number, word_bits.bit_length() - 1)
+    patterns = exhaustive_patterns(inner_number)
+    mask = (1 << (1 << inner_number)) - 1
+
+    for outer in range(1 << (inputs_number - inner_number)):
+        yield outer_values(patterns, outer, inputs_number, mask), mask
+
+def _prove(netlist_0, netlist_1, switches, lamps, max_nodes):
+    """
+    Compares BDDs of lamps of both circuits built over shared variables. 
+    """
+
+    bdd = BDD(dfs_order(netlist_0), max_nodes=max_nodes)
+
+    nodes_0 = build(bdd, netlist_0)
+    nodes_1 = build(bdd, netlist_1, dict(zip(switches[1], switches[0])))
+
+    differences = {
+        name_0: bdd.xor(nodes_0[name_0], nodes_1[name_1])
+        for name_0, name_1 in zip(*lamps)
+    }
+
+    for difference in differences.values():
+        values = bdd.satisfy(difference)
+
+        if values is not None:
+            inputs = tuple(
+                {
+                    name: values[name_0] 
+                    for name, name_0 in zip(names, switches[0])
+                }
+                for names in switches
+            )
+            different_lamps = [
+                name for name, difference in differences.items() 
+                if bdd.evaluate(difference, values)
+            ]
+
+            return DIFFERENT, Counterexample(inputs, different_lamps)
+
+    return EQUIVALENT, None
+
+def check_equivalence(netlist_0, netlist_1, random_words=64, word_bits=1024,
+                      exhaustive_limit=24, max_bdd_nodes=1 << 20, seed=None):
+    """
+    Checks whether two netlists compute the same functions of lamps. 
+
+    At first random_words words of word_bits random vectors are 
+    simulated. Then circuits with at most exhaustive_limit switches 
+    are checked on all input vectors, and bigger circuits are compared 
+    by BDDs while they have at most max_bdd_nodes nodes. 
+
+    Returns pair of verdict (EQUIVALENT, DIFFERENT or UNKNOWN) 
+    and Counterexample or None. 
+    """
+
+    switches, lamps = match_interfaces(netlist_0, netlist_1)
+    circuits = [CompiledCircuit(netlist_0), CompiledCircuit(netlist_1)]
+
+    inputs_number = len(switches[0])
+    mask = (1 << word_bits) - 1
+    generator = random.Random(seed)
+
+    for _ in range(random_words):
+        values = [
+            generator.getrandbits(word_bits) for _ in range(inputs_number)
+        ]
+
+        counterexample = _compare(circuits, switches, lamps, values, mask)
+        if counterexample:
+            return DIFFERENT, counterexample
+
+    if inputs_number > exhaustive_limit:
+        try:
+            return _prove(netlist_0, netlist_1, switches, lamps, max_bdd_nodes)
+        except BDDSizeError:
+            return UNKNOWN, None
+
+    for values, word_mask in _exhaustive_words(inputs_number, word_bits):
+        counterexample = _compare(
+            circuits, switches, lamps, values, word_mask
+        )
+        if counterexample:
+            return DIFFERENT, counterexample
+
+    return EQUIVALENT, None
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip())
+        sys.exit(2)
+
+    verdict, counterexample = check_equivalence(
+        netlist.load(sys.argv[1]), netlist.load(sys.argv[2])
+    )
+
+    print(verdict.capitalize())
+    if counterexample:
+        print(f"Counterexample: {counterexample}")
+
+    sys.exit(0 if verdict == EQUIVALENT else 1)
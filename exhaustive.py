@@ -0,0 +1,320 @@
+"""
+Contains evaluation of circuits over all input vectors by a pool 
+of processes writing lamps values into shared memory or a file. 
+
+Usage: python exhaustive.py [--workers N] [--output <file>] <circuit> 
+
+Table has a region of 2^n bits for every lamp (in order of lamps), 
+where bit k is value of lamp for vector k, in which value of switch i 
+is bit i of k. Regions are padded to whole bytes, bits are little-endian. 
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import netlist
+from simulation import CompiledCircuit, exhaustive_patterns, outer_values
+
+# Inputs changing inside one word evaluated at once 
+WORD_INPUTS = 16
+
+# Words evaluated by worker between reports of progress 
+CHUNK_WORDS = 16
+
+class TruthTable:
+    """
+    Values of lamps for all input vectors kept in buffer. 
+    """
+
+    def __init__(self, inputs, outputs, buffer, release=None):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.buffer = buffer
+
+        self.region_size = _get_region_size(len(inputs))
+        self._release = release
+
+    def get_value(self, lamp, vector):
+        """
+        Returns value of lamp (its name or index) for vector given 
+        as integer or mapping of switches names to values. 
+        """
+
+        if isinstance(lamp, str):
+            lamp = self.outputs.index(lamp)
+
+        if isinstance(vector, dict):
+            vector = sum(
+                1 << n for n, name in enumerate(self.inputs) 
+                if vector.get(name)
+            )
+
+        byte = self.buffer[lamp * self.region_size + vector // 8]
+
+        return bool(byte >> vector % 8 & 1)
+
+    def get_region(self, lamp):
+        """
+        Returns memoryview of bits of lamp (its name or index). 
+        """
+
+        if isinstance(lamp, str):
+            lamp = self.outputs.index(lamp)
+
+        start = lamp * self.region_size
+
+        return memoryview(self.buffer)[start:start + self.region_size]
+
+    def close(self):
+        if self._release is not None:
+            self._release()
+            self._release = None
+
+def _get_region_size(inputs_number):
+    return max((1 << inputs_number) // 8, 1)
+
+# Worker's state set by _init_worker 
+_worker = None
+
+def _init_worker(source, inputs_number, shared_name, path, size, cancelled):
+    global _worker
+
+    if shared_name is not None:
+        # Workers share resource tracker of the main process, 
+        # so attached memory is destroyed only by the main process. 
+        memory = shared_memory.SharedMemory(name=shared_name)
+        buffer = memory.buf
+    else:
+        with open(path, "r+b") as file_:
+            memory = mmap.mmap(file_.fileno(), size)
+
+        buffer = memory
+
+    inner_number = min(inputs_number, WORD_INPUTS)
+
+    _worker = {
+        "circuit": CompiledCircuit(source=source),
+        "memory": memory,
+        "buffer": buffer,
+        "inputs_number": inputs_number,
+        "patterns": exhaustive_patterns(inner_number),
+        "mask": (1 << (1 << inner_number)) - 1,
+        "cancelled": cancelled
+    }
+
+def _evaluate_words(words):
+    """
+    Evaluates range of words and writes lamps values into buffer. 
+    Returns number of evaluated words. 
+    """
+
+    start, stop = words
+
+    circuit = _worker["circuit"]
+    buffer = _worker["buffer"]
+    inputs_number = _worker["inputs_number"]
+    patterns = _worker["patterns"]
+    mask = _worker["mask"]
+
+    region_size = _get_region_size(inputs_number)
+    word_size = max((mask.bit_length() + 7) // 8, 1)
+
+    for outer in range(start, stop):
+        if _worker["cancelled"].is_set():
+            return outer - start
+
+        values = circuit.evaluate(
+            outer_values(patterns, outer, inputs_number, mask), mask
+        )
+
+        offset = outer * word_size
+        for n, value in enumerate(values):
+            position = n * region_size + offset
+            buffer[position:position + word_size] = value.to_bytes(
+                word_size, "little"
+            )
+
+    return stop - start
+
+class ExhaustiveEvaluation:
+    """
+    Evaluation of netlist over all input vectors running in background. 
+
+    Words of input vectors are split into chunks evaluated by pool 
+    of worker processes, which write lamps values directly into shared 
+    memory (or into file mapped into memory if path is given), so 
+    results are never sent between processes. 
+    """
+
+    def __init__(self, netlist, workers=None, path=None):
+        self.circuit = CompiledCircuit(netlist)
+        self.workers = workers or os.cpu_count()
+        self.path = path
+
+        inputs_number = len(self.circuit.inputs)
+        self.size = _get_region_size(inputs_number) * len(self.circuit.outputs)
+
+        self.words_number = 1 << max(inputs_number - WORD_INPUTS, 0)
+        self.done_words = 0
+
+        self.table = None
+        self.error = None
+        self.elapsed_time = None
+
+        self._cancelled = multiprocessing.Event()
+        self._thread = None
+        self._memory = None
+
+    @property
+    def progress(self):
+        return self.done_words / self.words_number
+
+    @property
+    def finished(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        # Size 0 isn't allowed for shared memory and files mapping. 
+        size = max(self.size, 1)
+
+        if self.path is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            shared_name = self._memory.name
+            buffer = self._memory.buf
+        else:
+            with open(self.path, "w+b") as file_:
+                file_.truncate(size)
+                self._memory = mmap.mmap(file_.fileno(), size)
+
+            shared_name = None
+            buffer = self._memory
+
+        self.table = TruthTable(
+            self.circuit.inputs, self.circuit.outputs, buffer, self._release
+        )
+
+        self._thread = threading.Thread(
+            target=self._run, args=(shared_name, size), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, shared_name, size):
+        start_time = time.perf_counter()
+
+        chunks = [
+            (start, min(start + CHUNK_WORDS, self.words_number))
+            for start in range(0, self.words_number, CHUNK_WORDS)
+        ]
+
+        initargs = (
+            self.circuit.source, len(self.circuit.inputs),
+            shared_name, self.path, size, self._cancelled
+        )
+
+        try:
+            with multiprocessing.Pool(
+                min(self.workers, len(chunks)), _init_worker, initargs
+            ) as pool:
+                for words in pool.imap_unordered(_evaluate_words, chunks):
+                    self.done_words += words
+
+                    if self.cancelled:
+                        break
+        except Exception as error:
+            self.error = error
+
+        self.elapsed_time = time.perf_counter() - start_time
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def wait(self):
+        """
+        Waits for the end of evaluation. Returns TruthTable or None 
+        if evaluation was cancelled (or failed), releasing its memory. 
+        """
+
+        self._thread.join()
+
+        if self.error is not None or self.cancelled:
+            self.table.close()
+
+            if self.error is not None:
+                raise self.error
+
+            return None
+
+        return self.table
+
+    def _release(self):
+        if self.path is None:
+            self._memory.close()
+            self._memory.unlink()
+        else:
+            self._memory.close()
+
+def evaluate(netlist, workers=None, path=None):
+    """
+    Evaluates netlist over all input vectors. Returns TruthTable 
+    which should be closed to release memory. 
+    """
+
+    evaluation = ExhaustiveEvaluation(netlist, workers, path)
+    evaluation.start()
+
+    return evaluation.wait()
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluates circuit over all input vectors."
+    )
+    parser.add_argument("circuit", help=".blif or .v file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--output", help="file for lamps values")
+
+    arguments = parser.parse_args(arguments)
+
+    evaluation = ExhaustiveEvaluation(
+        netlist.load(arguments.circuit), arguments.workers, arguments.output
+    )
+    evaluation.start()
+
+    try:
+        while not evaluation.finished:
+            time.sleep(0.5)
+            print(f"\r{evaluation.progress:.1%}", end="", file=sys.stderr)
+    except KeyboardInterrupt:
+        evaluation.cancel()
+
+    table = evaluation.wait()
+    print(file=sys.stderr)
+
+    if table is None:
+        print("Cancelled")
+        return 1
+
+    vectors_number = 1 << len(table.inputs)
+    print(f"{vectors_number} vectors in {evaluation.elapsed_time:.3f} s "
+          f"({vectors_number / evaluation.elapsed_time:.0f} vectors/s)")
+
+    if arguments.output:
+        print(f"Lamps {', '.join(table.outputs)} are written "
+              f"to {arguments.output}")
+
+    table.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Contains export of circuits to image files. 
+
+Circuit is drawn offscreen by elements' own painting into tiles of fixed 
+size, which are written to file one by one, so memory used by export 
+doesn't depend on size of image: PNG rows are assembled from tiles 
+in temporary file, TIFF is written as tiled image. SVG is vector image, 
+so it is drawn at once. 
+"""
+
+import math
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+
+from PyQt5.QtCore import QRect, QSize, QRectF
+from PyQt5.QtGui import QImage, QPainter, QRegion
+
+from palette import Palette
+
+TILE_SIZE = 512   # in pixels, multiple of 16 as TIFF requires 
+
+FORMATS = {".png": "PNG", ".tif": "TIFF", ".tiff": "TIFF", ".svg": "SVG"}
+
+# Types of values of TIFF entries 
+_SHORT = 3
+_LONG = 4
+
+class TiledRenderer:
+    """
+    Draws elements of sandbox scaled by scale into square tiles. 
+    Image covers bounding rectangle of elements with padding. 
+    """
+
+    def __init__(self, sandbox, elements, scale=1.0, tile_size=TILE_SIZE):
+        self.scale = scale
+        self.tile_size = tile_size
+
+        elements = set(elements)
+
+        # Children are in stacking order, so wires stay under gates. 
+        self.elements = [
+            child for child in sandbox.children() if child in elements
+        ]
+
+        bounding_rect = QRect()
+        for element in self.elements:
+            bounding_rect = bounding_rect.united(element.geometry())
+
+        padding = round(20 * sandbox.circuit_scale)
+        self.rect = bounding_rect.adjusted(-padding, -padding,
+                                           padding, padding)
+
+        self.width = max(math.ceil(self.rect.width() * scale), 1)
+        self.height = max(math.ceil(self.rect.height() * scale), 1)
+
+        self.columns = math.ceil(self.width / tile_size)
+        self.rows = math.ceil(self.height / tile_size)
+
+        # Elements of every tile in stacking order 
+        self._tiles = {}
+        for element in self.elements:
+            geometry = element.geometry().translated(-self.rect.topLeft())
+
+            first_column, first_row = self._get_tile(geometry.topLeft())
+            last_column, last_row = self._get_tile(geometry.bottomRight())
+
+            for row in range(max(first_row, 0),
+                             min(last_row + 1, self.rows)):
+                for column in range(max(first_column, 0),
+                                    min(last_column + 1, self.columns)):
+                    self._tiles.setdefault((column, row), []).append(element)
+
+    def _get_tile(self, point):
+        return (
+            math.floor(point.x() * self.scale / self.tile_size),
+            math.floor(point.y() * self.scale / self.tile_size)
+        )
+
+    def render_tile(self, column, row, image):
+        """
+        Draws tile into image of tile's size. 
+        """
+
+        image.fill(Palette.background)
+
+        elements = self._tiles.get((column, row))
+        if not elements:
+            return
+
+        x = column * self.tile_size
+        y = row * self.tile_size
+
+        # Tile in sandbox coordinates with margin for antialiasing 
+        tile_rect = QRectF(
+            self.rect.x() + x / self.scale, self.rect.y() + y / self.scale,
+            self.tile_size / self.scale, self.tile_size / self.scale
+        ).toAlignedRect().adjusted(-2, -2, 2, 2)
+
+        painter = QPainter(image)
+        painter.translate(-x, -y)
+        painter.scale(self.scale, self.scale)
+        painter.translate(-self.rect.topLeft())
+
+        for element in elements:
+            _render(
+                element, painter,
+                tile_rect.translated(-element.pos()) & element.rect()
+            )
+
+        painter.end()
+
+    def tiles(self):
+        """
+        Yields column, row and image of every tile, row by row. 
+        Image is reused, so it is valid until the next tile. 
+        """
+
+        image = QImage(self.tile_size, self.tile_size, QImage.Format_RGB32)
+
+        for row in range(self.rows):
+            for column in range(self.columns):
+                self.render_tile(column, row, image)
+
+                yield column, row, image
+
+def _render(element, painter, source_rect):
+    # Highlighting of hovered element isn't a part of circuit. 
+    hover = element.hover
+    element.hover = False
+
+    try:
+        # Top left corner of region is drawn at target offset. 
+        element.render(
+            painter, element.pos() + source_rect.topLeft(), 
+            QRegion(source_rect)
+        )
+    finally:
+        element.hover = hover
+
+def _get_rgb_rows(image, width, height):
+    """
+    Returns list of first height rows of image cut to width 
+    as RGB bytes. 
+    """
+
+    image = image.convertToFormat(QImage.Format_RGB888)
+    line_size = image.bytesPerLine()
+    data = image.constBits().asstring(image.sizeInBytes())
+
+    return [
+        data[line_size * n:line_size * n + 3 * width] for n in range(height)
+    ]
+
+def _write_png_chunk(file_, type_, data):
+    file_.write(struct.pack(">I", len(data)))
+    file_.write(type_ + data)
+    file_.write(struct.pack(">I", zlib.crc32(type_ + data)))
+
+def write_png(renderer, file_):
+    """
+    Writes PNG of renderer's image to binary file. Every row of tiles 
+    is assembled in temporary file, from which it is compressed row 
+    by row. 
+    """
+
+    tile_size = renderer.tile_size
+    line_size = 3 * renderer.width
+
+    file_.write(b"\x89PNG\r\n\x1a\n")
+    _write_png_chunk(file_, b"IHDR", struct.pack(
+        ">IIBBBBB", renderer.width, renderer.height, 8, 2, 0, 0, 0
+    ))
+
+    compressor = zlib.compressobj(6)
+
+    with tempfile.TemporaryFile() as band:
+        for column, row, image in renderer.tiles():
+            width = min(tile_size, renderer.width - column * tile_size)
+            height = min(tile_size, renderer.height - row * tile_size)
+
+            for n, line in enumerate(_get_rgb_rows(image, width, height)):
+                band.seek(n * line_size + 3 * column * tile_size)
+                band.write(line)
+
+            if column < renderer.columns - 1:
+                continue
+
+            # The whole row of tiles is drawn. 
+            band.seek(0)
+            for _ in range(height):
+                # Every line starts with filter type: 0 - none 
+                data = compressor.compress(b"\0" + band.read(line_size))
+
+                if data:
+                    _write_png_chunk(file_, b"IDAT", data)
+
+    _write_png_chunk(file_, b"IDAT", compressor.flush())
+    _write_png_chunk(file_, b"IEND", b"")
+
+def write_tiff(renderer, file_):
+    """
+    Writes tiled TIFF of renderer's image with Deflate compression 
+    to binary file. 
+    """
+
+    tile_size = renderer.tile_size
+
+    offsets = array("I")
+    sizes = array("I")
+
+    # Offset of image file directory is written at the end. 
+    file_.write(b"II*\0\0\0\0\0")
+
+    for column, row, image in renderer.tiles():
+        # Tiles are always full, parts outside image are ignored. 
+        data = zlib.compress(
+            b"".join(_get_rgb_rows(image, tile_size, tile_size)), 6
+        )
+
+        offset = file_.tell()
+        if offset + len(data) >= 1 << 32:
+            raise ValueError("Image is too large for TIFF")
+
+        offsets.append(offset)
+        sizes.append(len(data))
+        file_.write(data)
+
+        # Words are aligned as TIFF recommends. 
+        if file_.tell() % 2:
+            file_.write(b"\0")
+
+    # Values which don't fit into entries are written before directory. 
+    bits_offset = file_.tell()
+    file_.write(struct.pack("<3H", 8, 8, 8))
+    offsets_offset = file_.tell()
+    file_.write(struct.pack(f"<{len(offsets)}I", *offsets))
+    sizes_offset = file_.tell()
+    file_.write(struct.pack(f"<{len(sizes)}I", *sizes))
+
+    # Only values of one tile fit into entries. 
+    many = len(offsets) > 1
+
+    entries = (
+        (256, _LONG, 1, renderer.width),           # ImageWidth 
+        (257, _LONG, 1, renderer.height),          # ImageLength 
+        (258, _SHORT, 3, bits_offset),             # BitsPerSample 
+        (259, _SHORT, 1, 8),                       # Compression: Deflate 
+        (262, _SHORT, 1, 2),                       # Photometric: RGB 
+        (277, _SHORT, 1, 3),                       # SamplesPerPixel 
+        (284, _SHORT, 1, 1),                       # PlanarConfiguration 
+        (322, _LONG, 1, tile_size),                # TileWidth 
+        (323, _LONG, 1, tile_size),                # TileLength 
+        (324, _LONG, len(offsets), offsets_offset if many else offsets[0]),
+        (325, _LONG, len(sizes), sizes_offset if many else sizes[0])
+    )
+
+    directory_offset = file_.tell()
+    if directory_offset + 6 + 12 * len(entries) >= 1 << 32:
+        raise ValueError("Image is too large for TIFF")
+
+    file_.write(struct.pack("<H", len(entries)))
+    for tag, type_, count, value in entries:
+        if type_ == _SHORT and count == 1:
+            file_.write(struct.pack("<HHIHH", tag, type_, count, value, 0))
+        else:
+            file_.write(struct.pack("<HHII", tag, type_, count, value))
+    file_.write(struct.pack("<I", 0))   # no more directories 
+
+    file_.seek(4)
+    file_.write(struct.pack("<I", directory_offset))
+
+def write_svg(renderer, path):
+    # Imported here, because it is needed only for SVG. 
+    from PyQt5.QtSvg import QSvgGenerator
+
+    generator = QSvgGenerator()
+    generator.setFileName(path)
+    generator.setSize(QSize(renderer.width, renderer.height))
+    generator.setViewBox(QRect(0, 0, renderer.width, renderer.height))
+    generator.setTitle("Logic circuit")
+
+    painter = QPainter(generator)
+    painter.fillRect(0, 0, renderer.width, renderer.height,
+                     Palette.background)
+    painter.scale(renderer.scale, renderer.scale)
+    painter.translate(-renderer.rect.topLeft())
+
+    for element in renderer.elements:
+        _render(element, painter, element.rect())
+
+    painter.end()
+
+def export_image(sandbox, elements, path, scale=1.0, tile_size=TILE_SIZE):
+    """
+    Writes image of elements of sandbox scaled by scale to file 
+    of format given by extension of path (see FORMATS). 
+    """
+
+    format_ = FORMATS.get(os.path.splitext(path)[1].lower())
+
+    if format_ is None:
+        raise ValueError(f"Unknown image format of {path}")
+
+    renderer = TiledRenderer(sandbox, elements, scale, tile_size)
+
+    if format_ == "SVG":
+        write_svg(renderer, path)
+        return
+
+    with open(path, "wb") as file_:
+        if format_ == "PNG":
+            write_png(renderer, file_)
+        else:
+            write_tiff(renderer, file_)
@@ -0,0 +1,225 @@
+"""
+Contains declarative definitions of gates. 
+
+Gate is defined by names of its inputs, its function given as boolean 
+expression of inputs (with &, |, ^, ~, 0 and 1) or as truth table, 
+and its symbol. Everything else is derived from definition: evaluation 
+kernels for single values and for packed vectors, expressions for 
+compiled evaluators and Verilog, BLIF covers, and element widgets with 
+their outlines and contacts (see graphics.py and elements.py). 
+"""
+
+import ast
+import itertools
+
+# Symbols of gates (see Graphics.gate) 
+SHAPES = ("and", "or", "xor", "buffer", "mux")
+
+class GateDefinition:
+    """
+    Definition of gate named name with inputs named by inputs. 
+
+    table is a sequence of 2^n output values, where value k is output 
+    for vector k, in which value of input i is bit i of k. pins maps 
+    names of inputs to (cx, cy, x, y) of their contacts and ends 
+    of their wires at outline in coordinates of symbol, by default 
+    inputs are spread along its left side. 
+
+    function evaluates packed vectors: function(mask, *inputs). Single 
+    values are evaluated with mask 1 (or True for boolean result). 
+    """
+
+    def __init__(self, name, inputs, expression=None, table=None,
+                 shape="and", bubble=False, pins=None, delay=2,
+                 verilog=None):
+        if (expression is None) == (table is None):
+            raise ValueError(f"{name}: either expression or table "
+                             "must be given")
+        if shape not in SHAPES:
+            raise ValueError(f"{name}: unknown shape {shape!r}")
+
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.shape = shape
+        self.bubble = bubble
+        self.pins = pins or {}
+        self.delay = delay
+
+        # Verilog primitive of gate or None if it is written as assign 
+        self.verilog = verilog
+
+        if table is not None:
+            expression = _get_expression(self.inputs, table)
+
+        self.expression = expression
+        self._tree = ast.parse(expression, mode="eval").body
+        self._check(self._tree)
+
+        # Template of expression of packed vectors, where {n} is n-th 
+        # input and mask has ones in bits of all vectors. 
+        self.template = self._render(
+            self._tree,
+            name=lambda n: f"{{{n}}}",
+            invert=lambda value: f"({value} ^ mask)",
+            constant=lambda value: "mask" if value else "0"
+        )
+
+        arguments = [f"i{n}" for n in range(len(self.inputs))]
+        self.function = eval(
+            f"lambda mask, {', '.join(arguments)}: "
+            + self.template.format(*arguments)
+        )
+
+        patterns = [
+            sum(1 << k for k in range(1 << len(self.inputs)) if k >> n & 1)
+            for n in range(len(self.inputs))
+        ]
+        mask = (1 << (1 << len(self.inputs))) - 1
+
+        # Bit k is output for vector k. 
+        self.table = self.function(mask, *patterns)
+
+        self.commutative = all(
+            self.function(mask, *permutation) == self.table
+            for permutation in itertools.permutations(patterns)
+        )
+
+    def _check(self, node):
+        if isinstance(node, ast.BinOp):
+            if not isinstance(node.op, (ast.BitAnd, ast.BitOr, ast.BitXor)):
+                raise ValueError(f"{self.name}: unsupported operator")
+
+            self._check(node.left)
+            self._check(node.right)
+
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, ast.Invert):
+                raise ValueError(f"{self.name}: unsupported operator")
+
+            self._check(node.operand)
+
+        elif isinstance(node, ast.Name):
+            if node.id not in self.inputs:
+                raise ValueError(f"{self.name}: unknown input {node.id}")
+
+        elif isinstance(node, ast.Constant):
+            if node.value not in (0, 1):
+                raise ValueError(f"{self.name}: constant must be 0 or 1")
+
+        else:
+            raise ValueError(f"{self.name}: unsupported expression")
+
+    def _render(self, node, name, invert, constant):
+        """
+        Returns expression of node as string made by functions 
+        rendering inputs (by their indexes), inversions and constants. 
+        """
+
+        if isinstance(node, ast.BinOp):
+            operator = {ast.BitAnd: "&", ast.BitOr: "|", ast.BitXor: "^"}[
+                type(node.op)
+            ]
+            left = self._render(node.left, name, invert, constant)
+            right = self._render(node.right, name, invert, constant)
+
+            return f"({left} {operator} {right})"
+
+        if isinstance(node, ast.UnaryOp):
+            return invert(self._render(node.operand, name, invert, constant))
+
+        if isinstance(node, ast.Name):
+            return name(self.inputs.index(node.id))
+
+        return constant(node.value)
+
+    def apply(self, inputs, and_, or_, xor, not_, false, true):
+        """
+        Returns output computed by given operations on inputs of any 
+        type, e.g. on BDD nodes. 
+        """
+
+        def apply(node):
+            if isinstance(node, ast.BinOp):
+                operation = {ast.BitAnd: and_, ast.BitOr: or_,
+                             ast.BitXor: xor}[type(node.op)]
+
+                return operation(apply(node.left), apply(node.right))
+
+            if isinstance(node, ast.UnaryOp):
+                return not_(apply(node.operand))
+
+            if isinstance(node, ast.Name):
+                return inputs[self.inputs.index(node.id)]
+
+            return true if node.value else false
+
+        return apply(self._tree)
+
+    def get_verilog_expression(self, names):
+        return self._render(
+            self._tree,
+            name=lambda n: names[n],
+            invert=lambda value: f"~{value}",
+            constant=lambda value: "1'b1" if value else "1'b0"
+        )
+
+    def get_cover(self):
+        """
+        Returns rows of BLIF cover of gate. 
+        """
+
+        rows = []
+
+        for k in range(1 << len(self.inputs)):
+            if self.table >> k & 1:
+                plane = "".join(
+                    str(k >> n & 1) for n in range(len(self.inputs))
+                )
+                rows.append(f"{plane} 1")
+
+        return rows
+
+def _get_expression(inputs, table):
+    """
+    Returns expression of truth table as OR of its minterms. 
+    """
+
+    table = list(table)
+
+    if len(table) != 1 << len(inputs):
+        raise ValueError(f"Truth table of {len(inputs)} inputs must have "
+                         f"{1 << len(inputs)} rows")
+
+    minterms = [
+        " & ".join(
+            name if k >> n & 1 else f"~{name}"
+            for n, name in enumerate(inputs)
+        )
+        for k, value in enumerate(table) if value
+    ]
+
+    return " | ".join(f"({minterm})" for minterm in minterms) or "0"
+
+LIBRARY = {}
+
+def define(*arguments, **options):
+    """
+    Defines gate and adds it to library. Returns its definition. 
+    """
+
+    definition = GateDefinition(*arguments, **options)
+    LIBRARY[definition.name] = definition
+
+    return definition
+
+define("Nand", ("a", "b"), "~(a & b)", shape="and", bubble=True,
+       verilog="nand")
+define("Nor", ("a", "b"), "~(a | b)", shape="or", bubble=True,
+       verilog="nor")
+define("Xnor", ("a", "b"), "~(a ^ b)", shape="xor", bubble=True, delay=3,
+       verilog="xnor")
+define("Buffer", ("a",), "a", shape="buffer", delay=1, verilog="buf")
+
+# Output is a if s is inactive, otherwise b. 
+define("Mux", ("a", "b", "s"), "(a & ~s) | (b & s)", shape="mux",
+       pins={"s": (190, 287, 190, 272)}, delay=3)
@@ -1,6 +1,10 @@
+import math
+
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainterPath
 
+from connections import Contact
+
 class Graphics:
     """
     Contains graphic information about each circuit element such as: 
@@ -18,6 +22,10 @@ class Graphics:
     __Not = None
     __Switch = None
     __Lamp = None
+    __Split = None
+    __Merge = None
+    __BusSwitch = None
+    __BusLamp = None
 
     @classmethod
     def And(cls):
@@ -174,6 +182,187 @@ class Graphics:
 
         return cls.__Lamp
 
+    @classmethod
+    def Split(cls):
+        if cls.__Split is None:
+            width = 340
+            height = 200
+
+            outline = QPainterPath()
+            outline.moveTo(82, 3)
+            outline.lineTo(262, 53)
+            outline.lineTo(262, 147)
+            outline.lineTo(82, 197)
+            outline.closeSubpath()
+
+            contacts_data = (
+                ("i", 13, 100, cls.__create_wire(23, 100, 81, 100)),
+                ("o", 327, 100, cls.__create_wire(262, 100, 317, 100))
+            )
+
+            cls.__Split = (width, height, outline, contacts_data)
+
+        return cls.__Split
+
+    @classmethod
+    def Merge(cls):
+        if cls.__Merge is None:
+            width = 380
+            height = 200
+
+            outline = QPainterPath()
+            outline.moveTo(81, 3)
+            outline.lineTo(299, 53)
+            outline.lineTo(299, 147)
+            outline.lineTo(81, 197)
+            outline.closeSubpath()
+
+            contacts_data = (
+                ("i", 13, 50, cls.__create_wire(23, 50, 81, 50)),
+                ("i", 13, 150, cls.__create_wire(23, 150, 81, 150)),
+                ("o", 367, 100, cls.__create_wire(299, 100, 357, 100))
+            )
+
+            cls.__Merge = (width, height, outline, contacts_data)
+
+        return cls.__Merge
+
+    @classmethod
+    def BusSwitch(cls):
+        if cls.__BusSwitch is None:
+            width = 320
+            height = 100
+
+            outline = QPainterPath()
+            outline.addRoundedRect(3, 3, 248, 94, 20, 20)
+
+            contacts_data = (
+                ("o", 307, 50, cls.__create_wire(251, 50, 297, 50)),
+            )
+
+            cls.__BusSwitch = (width, height, outline, contacts_data)
+
+        return cls.__BusSwitch
+
+    @classmethod
+    def BusLamp(cls):
+        if cls.__BusLamp is None:
+            width = 320
+            height = 100
+
+            outline = QPainterPath()
+            outline.addRect(69, 3, 248, 94)
+
+            contacts_data = (
+                ("i", 13, 50, cls.__create_wire(23, 50, 69, 50)),
+            )
+
+            cls.__BusLamp = (width, height, outline, contacts_data)
+
+        return cls.__BusLamp
+
+    # Data of gates of library by their names 
+    __gates = {}
+
+    # Width, height, outline, x of ends of inputs' wires and x 
+    # of the start of output's wire of shapes of library's gates 
+    @staticmethod
+    def __get_shape(shape):
+        outline = QPainterPath()
+
+        if shape == "and":
+            outline.moveTo(81, 3)
+            outline.cubicTo(371, -5, 371, 205, 81, 197)
+            outline.closeSubpath()
+
+            return 380, 200, outline, 81, 299
+
+        if shape in ("or", "xor"):
+            outline.moveTo(81, 3)
+            outline.cubicTo(371, 23, 371, 177, 81, 197)
+            outline.quadTo(145, 100, 81, 3)
+            outline.closeSubpath()
+
+            if shape == "or":
+                return 380, 200, outline, 104, 299
+
+            outline.moveTo(66, 3)
+            outline.quadTo(130, 100, 66, 197)
+
+            return 380, 200, outline, 89, 299
+
+        if shape == "buffer":
+            outline.moveTo(82, 3)
+            outline.lineTo(242, 100)
+            outline.lineTo(82, 197)
+            outline.closeSubpath()
+
+            return 340, 200, outline, 81, 242
+
+        # Multiplexer 
+        outline.moveTo(81, 3)
+        outline.lineTo(299, 53)
+        outline.lineTo(299, 247)
+        outline.lineTo(81, 297)
+        outline.closeSubpath()
+
+        return 380, 300, outline, 81, 299
+
+    @classmethod
+    def gate(cls, definition):
+        """
+        Returns width, height, outline and contacts data of gate 
+        defined in library (see gatelib.py). 
+        """
+
+        if definition.name not in cls.__gates:
+            width, height, outline, input_x, output_x = cls.__get_shape(
+                definition.shape
+            )
+
+            if definition.bubble:
+                outline.addEllipse(output_x, height / 2 - 10, 20, 20)
+                output_x += 20
+
+            r = Contact.default_r
+
+            contacts_data = []
+            spread_inputs = [
+                name for name in definition.inputs 
+                if name not in definition.pins
+            ]
+
+            for name in definition.inputs:
+                if name in definition.pins:
+                    cx, cy, x, y = definition.pins[name]
+                else:
+                    n = spread_inputs.index(name)
+                    cx = 13
+                    cy = round(height * (2*n + 1) / (2 * len(spread_inputs)))
+                    x, y = input_x, cy
+
+                # Wire starts at border of contact. 
+                length = math.hypot(x - cx, y - cy) or 1
+                contacts_data.append((
+                    "i", cx, cy, cls.__create_wire(
+                        cx + (r + 3) * (x - cx) / length, 
+                        cy + (r + 3) * (y - cy) / length, 
+                        x, y
+                    )
+                ))
+
+            contacts_data.append((
+                "o", width - 13, height // 2, cls.__create_wire(
+                    output_x, height // 2, width - 23, height // 2
+                )
+            ))
+
+            cls.__gates[definition.name] = (
+                width, height, outline, tuple(contacts_data)
+            )
+
+        return cls.__gates[definition.name]
+
     @staticmethod
     def __create_wire(x0, y0, x1, y1):
         wire = QPainterPath()
@@ -2,12 +2,27 @@
 Contains widgets used for creating GUI. 
 """
 
-from PyQt5.QtCore import Qt
+import math
+
+from PyQt5.QtCore import Qt, QTimer, QPoint, QPointF, QRect
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QPen
+from PyQt5.QtGui import QPainter, QPen, QColor, QPixmap, QPolygonF
 
-from elements import And, Or, Xor, Not, Switch, Lamp, Wire, ElementsGroup
+import export
+from connections import (
+    Contact, WireSegment, Link, get_successors, get_predecessors
+)
+from elements import (
+    And, Or, Xor, Not, Switch, Lamp, Wire, ElementsGroup, BusWire, 
+    BusElement, BusAnd, BusOr, BusXor, BusNot, Split, Merge, BusSwitch, 
+    BusLamp, LIBRARY_ELEMENTS
+)
+from netlist import Netlist
+from ordering import TopologicalOrder
 from palette import Palette
+from activity import ToggleCounters
+from journal import Journal, read_state
+from routing import Router
 
 class Sandbox(QWidget):
     def __init__(self, parent, initial_scale):
@@ -16,6 +31,30 @@ class Sandbox(QWidget):
         self.elements = set()   # Contains all elements of circuit 
         self.circuit_scale = initial_scale
 
+        # Wires are routed around elements while autoroute is on. 
+        # Router works in coordinates relative to circuit_origin, 
+        # which moves together with circuit. 
+        self.autoroute = False
+        self.router = Router(
+            max(round(2 * Contact.default_r * initial_scale), 1)
+        )
+        self.circuit_origin = QPoint(0, 0)
+
+        # Topological order of elements by their links, updated 
+        # by every link's binding and removal 
+        self.topological_order = TopologicalOrder(
+            get_successors, get_predecessors
+        )
+
+        # ToggleCounters of elements while switching activity 
+        # is recorded, shared with all elements. 
+        self.toggle_counters = None
+        self._activity_overlay = None
+
+        # Journal of edits while circuit is autosaved 
+        self.journal = None
+        self._journal_timer = None
+
         self._press_pos = None
         self._elements_group = None
 
@@ -39,6 +78,7 @@ class Sandbox(QWidget):
                 element.move(
                     element.pos() + (event.pos() - self._press_pos)
                 )
+            self.circuit_origin += event.pos() - self._press_pos
             self._press_pos = event.pos()
 
         elif self._elements_group:
@@ -72,14 +112,28 @@ class Sandbox(QWidget):
         return new_element
 
     def remove_element(self, element):
+        if self.journal is not None:
+            self.journal.mark((element,))
+
         element.disconnect_from(self.elements)
         element.close()
 
+        self.topological_order.remove_node(element)
+
+        if self.toggle_counters is not None:
+            self.toggle_counters.release(element)
+
+        if isinstance(element, Wire):
+            for segment in element.segments:
+                self.router.remove_route(segment)
+        else:
+            self.router.remove_obstacle(element)
+
         if element in self.elements:
             self.elements.remove(element)
 
-    def add_wire(self, *contacts_coords):
-        new_wire = Wire(self)
+    def add_wire(self, *contacts_coords, constructor=Wire):
+        new_wire = constructor(self)
 
         new_wire.lower()
         self.window().toolbar.stackUnder(new_wire)
@@ -94,6 +148,24 @@ class Sandbox(QWidget):
 
         return new_wire
 
+    @property
+    def selected_elements(self):
+        if self._elements_group:
+            return set(self._elements_group.elements)
+
+        return set()
+
+    def select_elements(self, elements):
+        """
+        Makes group of elements, so they can be moved together. 
+        """
+
+        self.remove_elements_group()
+
+        self._elements_group = ElementsGroup(self, QPoint(0, 0))
+        self._elements_group.elements.update(elements)
+        self._elements_group.update_()
+
     def create_elements_group(self, mouse_pos):
         self.remove_elements_group()
         self._elements_group = ElementsGroup(self, mouse_pos)
@@ -109,37 +181,872 @@ class Sandbox(QWidget):
             self._elements_group.close()
             self._elements_group = None
 
+    def to_netlist(self, elements=None):
+        """
+        Returns netlist of circuit or of its part consisting of elements. 
+        Contacts connected by links or by wires form one net. 
+
+        Unnamed switches and lamps get names, so values of netlist's 
+        switches can be applied back by set_switches. 
+        """
+
+        if elements is None:
+            elements = self.elements
+
+        if any(
+            isinstance(element, (BusElement, BusWire)) for element in elements
+        ):
+            raise ValueError("Circuits with buses can't be converted "
+                             "to netlists")
+
+        # Finding nets of contacts with union-find 
+        parents = {}
+
+        def find(contact):
+            root = parents.setdefault(contact, contact)
+
+            while parents[root] is not root:
+                root = parents[root]
+
+            parents[contact] = root
+
+            return root
+
+        def join(contact_0, contact_1):
+            parents[find(contact_1)] = find(contact_0)
+
+        for element in elements:
+            for contact in element.contacts:
+                for link in contact.links:
+                    if link.element in elements:
+                        join(contact, link.contact)
+
+            if isinstance(element, Wire):
+                for contact in element.contacts[1:]:
+                    join(element.contacts[0], contact)
+
+        netlist = Netlist()
+        nets = {}
+
+        def get_net(contact):
+            root = find(contact)
+
+            if root not in nets:
+                nets[root] = netlist.add_net()
+
+            return nets[root]
+
+        # Elements are sorted by position, so switches and lamps 
+        # have the same order as user sees them. 
+        elements = sorted(
+            (element for element in elements 
+             if not isinstance(element, Wire)), 
+            key=lambda element: (element.y(), element.x())
+        )
+
+        prefixes = {Switch: "x", Lamp: "y"}
+        used_names = {
+            element.name for element in self.elements 
+            if isinstance(element, (Switch, Lamp))
+        }
+        counter = 0
+
+        for element in elements:
+            if element.name is None and type(element) in prefixes:
+                while True:
+                    counter += 1
+                    name = f"{prefixes[type(element)]}{counter}"
+
+                    if name not in used_names:
+                        break
+
+                element.name = name
+                used_names.add(name)
+
+            name = element.name
+
+            inputs = [
+                get_net(contact) for contact in element.contacts 
+                if contact._type == "i"
+            ]
+            outputs = [
+                get_net(contact) for contact in element.contacts 
+                if contact._type == "o"
+            ]
+
+            gate = netlist.add_gate(
+                type(element).__name__, inputs, 
+                outputs[0] if outputs else None, name
+            )
+
+            # Nets of switches and lamps are named after them. 
+            for net in outputs or inputs:
+                if name is not None and netlist.net_names[net] is None:
+                    netlist.net_names[net] = name
+
+        netlist.resolve()
+
+        return netlist
+
+    def set_switches(self, values):
+        """
+        Sets conditions of switches by mapping of their names to values. 
+        """
+
+        for element in self.elements:
+            if isinstance(element, Switch) and element.name in values:
+                condition = bool(values[element.name])
+
+                if element.condition != condition:
+                    element.condition = condition
+                    element.upd()
+
+                    if self.journal is not None:
+                        self.journal.mark((element,))
+
+    def load_netlist(self, netlist):
+        """
+        Creates elements of netlist placed in columns by their levels 
+        and connects them with wires. Circuit is added to elements 
+        already in sandbox (below them), so it should be cleared 
+        before to replace its circuit. 
+        """
+
+        constructors = {
+            constructor.__name__: constructor 
+            for constructor in (
+                And, Or, Xor, Not, Switch, Lamp, *LIBRARY_ELEMENTS.values()
+            )
+        }
+
+        order, levels = netlist.levelize()
+        lamps_level = max(levels.values(), default=0) + 1
+
+        column_width = round(2 * And.default_width * self.circuit_scale)
+        row_height = round(1.5 * And.default_height * self.circuit_scale)
+        padding = round(50 * self.circuit_scale)
+
+        previous_elements = set(self.elements)
+
+        top = padding
+        for element in previous_elements:
+            top = max(top, element.geometry().bottom() + padding)
+
+        rows = {}
+        drivers = {}   # net -> contacts of gates driving it 
+        sinks = {}   # net -> contacts of gates' inputs connected to it 
+
+        values = netlist.evaluate({})
+
+        for gate in order:
+            level = lamps_level if gate.kind == "Lamp" else levels[gate]
+            row = rows[level] = rows.get(level, -1) + 1
+
+            element = constructors[gate.kind](self)
+            element.name = gate.name
+            element.scale(self.circuit_scale)
+            element.move(
+                padding + level * column_width, top + row * row_height
+            )
+
+            # Contacts data are ordered: inputs first, then output. 
+            for contact, net in zip(element.contacts, gate.inputs):
+                sinks.setdefault(net, []).append(contact)
+                contact.condition = bool(values[net])
+
+            if gate.output is not None:
+                contact = element.contacts[-1]
+                drivers.setdefault(gate.output, []).append(contact)
+                contact.condition = bool(values[gate.output])
+
+            if gate.kind == "Lamp":
+                element.condition = bool(values[gate.inputs[0]])
+
+            self.elements.add(element)
+
+        # Links are ordered at once, as circuit is built from scratch. 
+        with self.topological_order.deferred():
+            for net, net_drivers in drivers.items():
+                contacts = net_drivers + sinks.get(net, [])
+
+                if len(contacts) < 2:
+                    continue
+
+                wire = self.add_wire(
+                    contacts[0].abs_cx, contacts[0].abs_cy, 
+                    contacts[1].abs_cx, contacts[1].abs_cy
+                )
+                Link.bind(wire.contacts[0], contacts[0], update=False)
+                Link.bind(wire.contacts[1], contacts[1], update=False)
+
+                # Wire stays maximized while segments are added and is 
+                # minimized once. 
+                for contact in contacts[2:]:
+                    wire_contact = wire.add_contact(
+                        contact.abs_cx, contact.abs_cy
+                    )
+                    wire.segments.append(
+                        WireSegment(wire, wire.contacts[0], wire_contact)
+                    )
+                    Link.bind(wire_contact, contact, update=False)
+
+                wire.minimize()
+
+                wire.condition = bool(values[net])
+                for contact in wire.contacts:
+                    contact.condition = wire.condition
+
+        self.update_placement(self.elements - previous_elements)
+
+    def paste(self, fragment, x, y):
+        """
+        Creates copy of fragment with its top left corner at x and y. 
+        Links inside fragment are restored directly, so copy is 
+        connected exactly as original, but not to other elements. 
+        Returns list of new elements. 
+        """
+
+        new_elements = []
+
+        for data in fragment.elements:
+            if issubclass(data[0], Wire):
+                constructor, contacts_coords, segments = data
+
+                coords = [(x + cx, y + cy) for cx, cy in contacts_coords]
+                wire = self.add_wire(
+                    *coords[0], *coords[1], constructor=constructor
+                )
+
+                # Segments of original are restored instead of the first 
+                # segment created with wire. 
+                wire.segments[0].remove()
+
+                for cx, cy in coords[2:]:
+                    wire.add_contact(cx, cy)
+
+                wire.segments = [
+                    WireSegment(wire, wire.contacts[n_0], wire.contacts[n_1])
+                    for n_0, n_1 in segments
+                ]
+
+                new_elements.append(wire)
+            else:
+                constructor, dx, dy, rotation, scale_value, state = data
+
+                element = constructor(self)
+                element.scale(scale_value)
+                if rotation:
+                    element.rotate(rotation)
+                element.move(x + dx, y + dy)
+
+                if state is not None:
+                    element.set_state(state)
+
+                self.elements.add(element)
+                new_elements.append(element)
+
+        # Links connect only new elements, so they are ordered at once. 
+        with self.topological_order.deferred():
+            for (n_0, contact_0), (n_1, contact_1) in fragment.links:
+                Link.bind(
+                    new_elements[n_0].contacts[contact_0], 
+                    new_elements[n_1].contacts[contact_1], 
+                    update=False
+                )
+
+        for element in new_elements:
+            if isinstance(element, Wire):
+                element.minimize()
+
+        self._settle(new_elements)
+        self.update_placement(new_elements)
+
+        return new_elements
+
+    def report_cycle(self, source, target):
+        """
+        Shows combinational loop closed by new link from element source 
+        to element target: elements of the loop are selected as soon 
+        as the current event is handled. 
+        """
+
+        cycle = self.topological_order.get_cycle(source, target)
+
+        def select_cycle():
+            elements = [
+                element for element in cycle if element in self.elements
+            ]
+
+            if elements:
+                self.select_elements(elements)
+
+        QTimer.singleShot(0, select_cycle)
+
+    def _settle(self, elements):
+        """
+        Sets conditions of elements connected only to each other. 
+
+        Recursive upd visits every element once per path reaching it, 
+        so elements are rather evaluated one by one in topological 
+        order, which is kept by sandbox. Wires linked to each other 
+        and loops aren't ordered, so passes are repeated while 
+        conditions change. 
+        """
+
+        order = self.topological_order.sort(elements)
+
+        for _ in range(len(order)):
+            changed = False
+
+            for element in order:
+                before = [contact.condition for contact in element.contacts]
+
+                for contact in element.contacts:
+                    contact.receive_signals()
+                element.update_condition()
+
+                changed |= before != [
+                    contact.condition for contact in element.contacts
+                ]
+
+            if not changed:
+                break
+
+        for element in order:
+            element.update()
+
+    def instantiate_array(self, elements, rows, columns):
+        """
+        Places copies of elements in grid of rows and columns, where 
+        elements themselves are in the top left cell. Returns list 
+        of new elements. 
+        """
+
+        fragment = CircuitFragment(elements)
+
+        padding = round(50 * self.circuit_scale)
+        x = fragment.x
+        y = fragment.y
+
+        new_elements = []
+
+        for row in range(rows):
+            for column in range(columns):
+                if row or column:
+                    new_elements.extend(self.paste(
+                        fragment, 
+                        x + column * (fragment.width + padding), 
+                        y + row * (fragment.height + padding)
+                    ))
+
+        return new_elements
+
+    def _get_obstacle_rect(self, element):
+        """
+        Returns rectangle of element in router's coordinates without 
+        its border, where contacts are. 
+        """
+
+        inset = round(2 * Contact.default_r * element.scale_value)
+        rect = element.geometry().adjusted(inset, inset, -inset, -inset)
+
+        return (
+            rect.x() - self.circuit_origin.x(), 
+            rect.y() - self.circuit_origin.y(), 
+            rect.width(), rect.height()
+        )
+
+    def set_autoroute(self, autoroute):
+        """
+        Turns autorouting on, routing all wires around elements, 
+        or off, returning all wires to L-shaped segments. 
+        """
+
+        self.autoroute = autoroute
+        self.router.clear()
+
+        if autoroute:
+            self.update_routes(self.elements)
+        else:
+            for element in self.elements:
+                if isinstance(element, Wire):
+                    for segment in element.segments:
+                        segment.path = None
+
+                    element.minimize()
+                    element.update()
+
+    def update_placement(self, elements):
+        """
+        Is called when elements are placed (created, moved or rotated) 
+        to reroute wires and record elements in journal. 
+        """
+
+        if self.journal is not None:
+            self.journal.mark(elements)
+
+        self.update_routes(elements)
+
+    def update_routes(self, elements):
+        """
+        Updates obstacles of moved (or new) elements and reroutes 
+        segments of moved wires and segments which were blocked. 
+        Other routes are left untouched. 
+        """
+
+        if not self.autoroute:
+            return
+
+        segments = set()
+
+        for element in elements:
+            if element not in self.elements:
+                continue
+
+            if isinstance(element, Wire):
+                segments.update(element.segments)
+            else:
+                segments |= self.router.set_obstacle(
+                    element, self._get_obstacle_rect(element)
+                )
+
+        wires = set()
+
+        for segment in segments:
+            wire = segment.wire
+
+            # Segment could be removed since it was routed. 
+            if wire not in self.elements or segment not in wire.segments:
+                continue
+
+            start, goal = [
+                (
+                    contact.abs_cx - self.circuit_origin.x(), 
+                    contact.abs_cy - self.circuit_origin.y()
+                )
+                for contact in segment.contacts
+            ]
+
+            segment.path = self.router.route(segment, start, goal)
+            wires.add(wire)
+
+        for wire in wires:
+            wire.minimize()
+            wire.update()
+
+    def set_activity(self, enabled):
+        """
+        Starts recording toggles of all elements (their outputs, lamps' 
+        inputs and wires' nets) showing them as heat map, or stops it. 
+        """
+
+        if enabled:
+            self.toggle_counters = ToggleCounters()
+
+            # Current values aren't counted as toggles. 
+            for element in self.elements:
+                self.toggle_counters.set_value(
+                    self.toggle_counters.get_index(element), 
+                    element.contacts[-1].condition
+                )
+
+            self._activity_overlay = ActivityOverlay(self)
+        else:
+            self.toggle_counters = None
+
+            self._activity_overlay.close()
+            self._activity_overlay = None
+
+        for element in self.elements:
+            element.toggle_counters = self.toggle_counters
+
+    def export_activity(self, file_):
+        """
+        Writes CSV with numbers of toggles of elements of circuit. 
+        Elements are named as in netlist or by type and position. 
+        """
+
+        counters = self.toggle_counters
+
+        names = []
+        for element in self.elements:
+            name = getattr(element, "name", None) or (
+                f"{type(element).__name__} "
+                f"({element.x() - self.circuit_origin.x()}, "
+                f"{element.y() - self.circuit_origin.y()})"
+            )
+            names.append((counters.get_index(element), name))
+
+        counters.export_csv(file_, sorted(names, key=lambda item: item[1]))
+
+    def export_image(self, path, elements=None, scale=1.0):
+        """
+        Writes image of elements (of whole circuit by default) 
+        to PNG, TIFF or SVG file given by extension of path. 
+        """
+
+        export.export_image(
+            self, self.elements if elements is None else elements, 
+            path, scale
+        )
+
+    def open_journal(self, path):
+        """
+        Restores circuit recorded in journal at path (replacing current 
+        one) and starts recording edits into it. 
+        """
+
+        state = read_state(path)
+
+        self.clear()
+        elements = self._restore(state)
+
+        self.journal = Journal(path, state)
+        for id_, element in elements.items():
+            self.journal.set_id(element, id_)
+
+        self._journal_timer = QTimer(self)
+        self._journal_timer.timeout.connect(self.flush_journal)
+        self._journal_timer.start(500)
+
+    def close_journal(self):
+        """
+        Writes pending edits and compacts journal, so it is restored 
+        quickly next time. 
+        """
+
+        self.flush_journal()
+        self.journal.compact()
+
+        self._journal_timer.stop()
+        self._journal_timer = None
+
+        self.journal.close()
+        self.journal = None
+
+    def flush_journal(self):
+        self.journal.flush(
+            self._get_journal_data, lambda element: element in self.elements
+        )
+
+    def _get_journal_data(self, element):
+        """
+        Returns JSON-compatible state of element with its links 
+        to other elements, in coordinates relative to circuit_origin. 
+        """
+
+        x_origin = self.circuit_origin.x()
+        y_origin = self.circuit_origin.y()
+
+        links = []
+        for n, contact in enumerate(element.contacts):
+            for link in contact.links:
+                if link.element in self.elements:
+                    links.append([
+                        n, self.journal.get_id(link.element), 
+                        link.element.contacts.index(link.contact)
+                    ])
+
+        if isinstance(element, Wire):
+            contacts = element.contacts
+            indexes = {contact: n for n, contact in enumerate(contacts)}
+
+            return [
+                type(element).__name__, 
+                [
+                    [contact.abs_cx - x_origin, contact.abs_cy - y_origin]
+                    for contact in contacts
+                ], 
+                [
+                    [indexes[contact] for contact in segment.contacts]
+                    for segment in element.segments
+                ], 
+                links
+            ]
+
+        return [
+            type(element).__name__, 
+            element.x() - x_origin, element.y() - y_origin, 
+            element._rotation, element.scale_value, element.get_state(), 
+            element.name, links
+        ]
+
+    def _restore(self, state):
+        """
+        Creates elements from journal's state by pasting it 
+        as fragment. Returns dictionary mapping ids to elements. 
+        """
+
+        constructors = {
+            constructor.__name__: constructor 
+            for constructor in (
+                And, Or, Xor, Not, Switch, Lamp, Wire, BusWire, BusAnd, 
+                BusOr, BusXor, BusNot, Split, Merge, BusSwitch, BusLamp, 
+                *LIBRARY_ELEMENTS.values()
+            )
+        }
+
+        # Wires go first, so they stay under other elements. 
+        ids = sorted(
+            state, 
+            key=lambda id_: not issubclass(constructors[state[id_][0]], Wire)
+        )
+        indexes = {id_: n for n, id_ in enumerate(ids)}
+
+        fragment = CircuitFragment(())
+
+        for n, id_ in enumerate(ids):
+            data = state[id_]
+            constructor = constructors[data[0]]
+
+            if issubclass(constructor, Wire):
+                _, contacts_coords, segments, links = data
+                fragment.elements.append(
+                    (constructor, contacts_coords, segments)
+                )
+            else:
+                _, x, y, rotation, scale_value, element_state, _, links = data
+                fragment.elements.append((
+                    constructor, x, y, rotation, scale_value, element_state
+                ))
+
+            for contact, other_id, other_contact in links:
+                # Every link is stored by both elements. 
+                if id_ < other_id and other_id in indexes:
+                    fragment.links.append(
+                        ((n, contact), (indexes[other_id], other_contact))
+                    )
+
+        new_elements = self.paste(
+            fragment, self.circuit_origin.x(), self.circuit_origin.y()
+        )
+
+        for element, id_ in zip(new_elements, ids):
+            if not isinstance(element, Wire):
+                element.name = state[id_][6]
+
+        return dict(zip(ids, new_elements))
+
     def clear(self):
+        if self.journal is not None:
+            self.journal.clear()
+
         for element in self.elements:
             element.close()
+
+            if self.toggle_counters is not None:
+                self.toggle_counters.release(element)
+
         self.elements.clear()
+        self.router.clear()
+        self.topological_order.clear()
 
         self.remove_elements_group()
         self._press_pos = None
 
         self.setCursor(Qt.ArrowCursor)
 
+class ActivityOverlay(QWidget):
+    """
+    Transparent widget over sandbox drawing heat map of toggles 
+    of elements: elements which toggle more are redder, elements which 
+    never toggled are outlined in blue. 
+    """
+
+    def __init__(self, sandbox):
+        QWidget.__init__(self, sandbox)
+
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        # Total and number of counters when heat map was drawn 
+        self._drawn_counts = None
+
+        # Overlay is kept over new elements and elements raised while 
+        # dragging, and heat map is redrawn when counters change. 
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start(200)
+
+        self._refresh()
+        self.show()
+
+    def _refresh(self):
+        sandbox = self.parentWidget()
+
+        if self.geometry() != sandbox.rect():
+            self.setGeometry(sandbox.rect())
+
+        top_widget = next(
+            child for child in reversed(sandbox.children()) 
+            if child.isWidgetType()
+        )
+        if top_widget is not self:
+            self.raise_()
+
+        counters = sandbox.toggle_counters
+        if counters is None:
+            return
+
+        counts = (sum(counters.counts), len(counters))
+        if counts != self._drawn_counts:
+            self._drawn_counts = counts
+            self.update()
+
+    def paintEvent(self, event):
+        sandbox = self.parentWidget()
+        counters = sandbox.toggle_counters
+
+        if counters is None:
+            return
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        counts = {
+            element: counters.get_count(element) 
+            for element in sandbox.elements
+        }
+
+        # Logarithmic scale shows both rare and frequent toggles. 
+        scale = math.log1p(max(counts.values(), default=0)) or 1
+
+        for element, count in counts.items():
+            if count:
+                heat = math.log1p(count) / scale
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(
+                    QColor(round(255 * heat), 0, round(255 * (1 - heat)), 
+                           round(60 + 100 * heat))
+                )
+            else:
+                painter.setPen(QPen(Palette.activity.untoggled, 2))
+                painter.setBrush(Qt.NoBrush)
+
+            if isinstance(element, Wire):
+                # Wire is marked at its contacts only, because its 
+                # rectangle can cover other elements. 
+                radius = element.contacts[0].r * 2
+
+                for contact in element.contacts:
+                    painter.drawEllipse(
+                        QPointF(contact.abs_cx, contact.abs_cy), 
+                        radius, radius
+                    )
+            else:
+                painter.drawRect(element.geometry())
+
+        painter.end()
+
+class CircuitFragment:
+    """
+    Copy of elements with links between them, which can be pasted 
+    into sandbox any number of times. 
+
+    Only types, positions and states of elements are stored. Pasted 
+    elements share outlines and contacts' paths of their classes, 
+    so copies cost no more memory than elements made by hand. 
+    """
+
+    def __init__(self, elements):
+        # Wires go first, so they stay under other elements. 
+        elements = sorted(
+            elements, key=lambda element: not isinstance(element, Wire)
+        )
+
+        rect = QRect()
+        for element in elements:
+            rect = rect.united(element.geometry())
+
+        self.x = rect.x()
+        self.y = rect.y()
+        self.width = rect.width()
+        self.height = rect.height()
+
+        # Tuples of element's class and data needed to recreate it 
+        self.elements = []
+
+        # Pairs of indexes of element and its contact 
+        self.links = []
+
+        indexes = {}   # contact -> (index of element, index of contact) 
+
+        for n, element in enumerate(elements):
+            for m, contact in enumerate(element.contacts):
+                indexes[contact] = (n, m)
+
+            if isinstance(element, Wire):
+                contacts_coords = [
+                    (contact.abs_cx - self.x, contact.abs_cy - self.y)
+                    for contact in element.contacts
+                ]
+                segments = [
+                    tuple(indexes[contact][1] for contact in segment.contacts)
+                    for segment in element.segments
+                ]
+
+                self.elements.append(
+                    (type(element), contacts_coords, segments)
+                )
+            else:
+                self.elements.append((
+                    type(element), 
+                    element.x() - self.x, element.y() - self.y, 
+                    element._rotation, element.scale_value, 
+                    element.get_state()
+                ))
+
+        for contact, index in indexes.items():
+            for link in contact.links:
+                other_index = indexes.get(link.contact)
+
+                # Every link is stored once. 
+                if other_index is not None and index < other_index:
+                    self.links.append((index, other_index))
+
 class Toolbar(QWidget):
     def __init__(self, parent, height):
         QWidget.__init__(self, parent)
 
+        # Height is fractional when it depends on screen's height. 
+        height = round(height)
+
         spacing = round(height * 0.125)
         panel_height = height - 2*spacing
         panel_width = round(
             panel_height / ElementPanel.default_height * ElementPanel.default_width
         )
 
-        elements = And, Or, Xor, Not, Switch, Lamp
+        self._height = height
+        self._spacing = spacing
+        self._panel_size = (panel_width, panel_height)
+        self._panels = []
+
+        self.set_elements((And, Or, Xor, Not, Switch, Lamp))
+        self.show()
+
+    def set_elements(self, elements):
+        """
+        Replaces panels by panels of elements. 
+        """
+
+        for panel in self._panels:
+            panel.close()
+
+        spacing = self._spacing
+        panel_width, panel_height = self._panel_size
+
+        self._panels = []
 
         for n in range(len(elements)):
             new_panel = ElementPanel(self, elements[n])
             new_panel.move(spacing + n *(panel_width + spacing), spacing)
             new_panel.resize(panel_width, panel_height)
 
+            self._panels.append(new_panel)
+
         self.resize(
-            len(elements) * (panel_width + spacing) + spacing, height
+            len(elements) * (panel_width + spacing) + spacing, self._height
         )
-        self.show()
 
 class ElementPanel(QWidget):
     default_width = 420
@@ -154,6 +1061,9 @@ class ElementPanel(QWidget):
         # created_element stores this element. 
         self._created_element = None
 
+        # Panel is rendered once per size and device pixel ratio. 
+        self._pixmap = None
+
         self.setCursor(Qt.PointingHandCursor)
         self.show()
 
@@ -176,13 +1086,40 @@ class ElementPanel(QWidget):
 
     def mouseReleaseEvent(self, event):
         if self._created_element:
-            self._created_element.connect_to(
-                self.window().sandbox.elements
-            )
+            sandbox = self.window().sandbox
+
+            self._created_element.connect_to(sandbox.elements)
+            sandbox.update_placement({self._created_element})
+
             self._created_element = None
 
+    def resizeEvent(self, event):
+        self._pixmap = None
+
     def paintEvent(self, event):
+        pixel_ratio = self.devicePixelRatioF()
+
+        if (self._pixmap is None 
+                or self._pixmap.devicePixelRatioF() != pixel_ratio):
+            self._pixmap = self._render(pixel_ratio)
+
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmap)
+        painter.end()
+
+    def _render(self, pixel_ratio):
+        """
+        Returns pixmap with panel's border and element drawn in it. 
+        """
+
+        pixmap = QPixmap(
+            round(self.width() * pixel_ratio), 
+            round(self.height() * pixel_ratio)
+        )
+        pixmap.setDevicePixelRatio(pixel_ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
 
         x_scale = self.width() / self.default_width
@@ -214,3 +1151,95 @@ class ElementPanel(QWidget):
         )
 
         painter.end()
+
+        return pixmap
+
+class TimingDiagram(QWidget):
+    """
+    Window drawing waveforms of recorder for last time_span seconds 
+    directly from their ring buffers. 
+    """
+
+    row_height = 40
+    label_width = 120
+    time_span = 10   # in seconds 
+
+    def __init__(self, recorder):
+        QWidget.__init__(self)
+
+        self._recorder = recorder
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.update)
+        self._timer.start(100)
+
+        self.setWindowTitle("Timing diagram")
+        self.setStyleSheet("background-color: #f0f0f0;")
+        self.resize(800, self.row_height)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        pen = QPen(
+            Palette.element.outline, 2, 
+            Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin
+        )
+
+        end_time = self._recorder.get_time()
+        start_time = end_time - self.time_span
+
+        x_scale = (self.width() - self.label_width) / self.time_span
+        signal_height = self.row_height * 0.6
+
+        for n, waveform in enumerate(self._recorder.waveforms):
+            low_y = (n + 0.8) * self.row_height
+            high_y = low_y - signal_height
+
+            painter.setPen(pen)
+            painter.drawText(
+                5, round(low_y), waveform.name
+            )
+
+            # Value at the left border is the last value recorded 
+            # before visible time range. 
+            points = QPolygonF()
+            value = None
+
+            for timestamp, new_value in waveform.buffer:
+                if timestamp > start_time:
+                    x = self.label_width + (timestamp - start_time) * x_scale
+
+                    if value is None:
+                        value = new_value
+                        points.append(QPointF(
+                            self.label_width, high_y if value else low_y
+                        ))
+
+                    points.append(QPointF(x, high_y if value else low_y))
+                    points.append(QPointF(x, high_y if new_value else low_y))
+
+                value = new_value
+
+            if value is None:
+                continue
+
+            if points.isEmpty():
+                points.append(QPointF(
+                    self.label_width, high_y if value else low_y
+                ))
+
+            points.append(QPointF(self.width(), high_y if value else low_y))
+
+            pen.setColor(Palette.element.contact[bool(value)])
+            painter.setPen(pen)
+            painter.drawPolyline(points)
+            pen.setColor(Palette.element.outline)
+
+        painter.end()
+
+    def update_size(self):
+        self.resize(
+            self.width(), 
+            max(len(self._recorder.waveforms), 1) * self.row_height
+        )
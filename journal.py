@@ -0,0 +1,228 @@
+"""
+Contains append-only journal of edits of circuit used for autosaving. 
+
+Journal is a file of JSON lines, each being a record: 
+    ["p", id, data] - element with id was put (created or changed), 
+        data is its whole state including its links; 
+    ["d", id] - element with id was removed; 
+    ["c"] - all elements were removed. 
+
+Records keep whole states of elements, so applying a record again 
+changes nothing. Journal is compacted by rotating it and writing 
+current state into snapshot (made of "p" records) in background; 
+recovery reads snapshot, rotated journal if compaction was interrupted, 
+and journal, in this order. Partly written last line is ignored. 
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_COMPACT_SIZE = 1 << 20   # in bytes 
+
+def default_path():
+    """
+    Returns path of journal given by LOGIC_CIRCUITS_JOURNAL 
+    environment variable or in default user's state directory. 
+    """
+
+    path = os.environ.get("LOGIC_CIRCUITS_JOURNAL")
+
+    if not path:
+        path = os.path.join(
+            os.environ.get("XDG_STATE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".local", "state"),
+            "logic-circuits", "autosave.journal"
+        )
+
+    return path
+
+def _apply(state, lines):
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # Line was being written when application stopped. 
+            continue
+
+        if record[0] == "p":
+            state[record[1]] = record[2]
+        elif record[0] == "d":
+            state.pop(record[1], None)
+        elif record[0] == "c":
+            state.clear()
+
+def read_state(path):
+    """
+    Returns dictionary mapping ids of elements to their data 
+    recovered from snapshot and journal at path. 
+    """
+
+    state = {}
+
+    for file_path in (path + ".snapshot", path + ".old", path):
+        try:
+            with open(file_path) as file_:
+                _apply(state, file_)
+        except OSError:
+            pass
+
+    return state
+
+class Journal:
+    """
+    Journal of circuit's elements at path. Elements (any hashable 
+    objects) are marked when they change and their records are written 
+    by flush, so an element changed many times between flushes costs 
+    one record. Ids of elements are given by journal. 
+    """
+
+    def __init__(self, path, state=None, compact_size=DEFAULT_COMPACT_SIZE):
+        self.path = path
+        self.compact_size = compact_size
+
+        # Current state of circuit as it is written in journal 
+        self._state = {} if state is None else state
+
+        self._ids = {}   # element -> id 
+        self._next_id = max(self._state, default=-1) + 1
+        self._marked = set()
+
+        self._snapshot_size = 0
+        self._thread = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Journal rotated by interrupted compaction would be replaced 
+        # by the next compaction, so its records are saved at once. 
+        if os.path.exists(path + ".old"):
+            self._write_snapshot(dict(self._state))
+
+        self._file = open(path, "a")
+
+    def set_id(self, element, id_):
+        self._ids[element] = id_
+
+    def get_id(self, element):
+        id_ = self._ids.get(element)
+
+        if id_ is None:
+            id_ = self._ids[element] = self._next_id
+            self._next_id += 1
+
+        return id_
+
+    def mark(self, elements):
+        self._marked.update(elements)
+
+    def flush(self, get_data, is_present):
+        """
+        Writes records of marked elements. get_data returns data 
+        of element, is_present tells whether element still exists. 
+        """
+
+        if not self._marked:
+            return
+
+        marked, self._marked = self._marked, set()
+        lines = []
+
+        for element in marked:
+            if is_present(element):
+                id_ = self.get_id(element)
+                data = get_data(element)
+
+                if self._state.get(id_) != data:
+                    self._state[id_] = data
+                    lines.append(json.dumps(("p", id_, data)))
+
+            elif element in self._ids:
+                id_ = self._ids.pop(element)
+
+                self._state.pop(id_, None)
+                lines.append(json.dumps(("d", id_)))
+
+        self._write(lines)
+
+    def clear(self):
+        """
+        Records removal of all elements. 
+        """
+
+        self._marked.clear()
+        self._ids.clear()
+        self._state.clear()
+
+        self._write([json.dumps(("c",))])
+
+    def _write(self, lines):
+        if not lines:
+            return
+
+        # Data reaches operating system at once, so it survives crash 
+        # of application. 
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+        if self._file.tell() > max(self.compact_size, self._snapshot_size):
+            self.compact()
+
+    def compact(self):
+        """
+        Starts writing snapshot of current state in background, unless 
+        previous compaction is still running. 
+        """
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        # Records are lists which are never changed after writing, 
+        # so shallow copy is enough. 
+        state = dict(self._state)
+
+        self._file.close()
+        os.replace(self.path, self.path + ".old")
+        self._file = open(self.path, "a")
+
+        self._thread = threading.Thread(
+            target=self._write_snapshot, args=(state,), daemon=True
+        )
+        self._thread.start()
+
+    def _write_snapshot(self, state):
+        directory = os.path.dirname(self.path) or "."
+        descriptor, temporary_path = tempfile.mkstemp(
+            suffix=".tmp", dir=directory
+        )
+
+        try:
+            with os.fdopen(descriptor, "w") as file_:
+                for id_, data in state.items():
+                    file_.write(json.dumps(("p", id_, data)) + "\n")
+
+                self._snapshot_size = file_.tell()
+
+                file_.flush()
+                os.fsync(file_.fileno())
+
+            os.replace(temporary_path, self.path + ".snapshot")
+            os.remove(self.path + ".old")
+        except OSError:
+            # Rotated journal is kept, so nothing is lost. 
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+    def close(self):
+        """
+        Waits for compaction and closes journal. 
+        """
+
+        if self._thread is not None:
+            self._thread.join()
+
+        self._file.close()
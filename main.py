@@ -1,18 +1,45 @@
 import sys
 import os.path
+import time
 
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QFileDialog, QMessageBox, QInputDialog, 
+    QProgressDialog
+)
+from PyQt5.QtGui import QIcon, QCursor
 
-from interface import Sandbox, Toolbar
+import bdd
+import journal
+import netlist
+from equivalence import check_equivalence, DIFFERENT, EQUIVALENT
+from exhaustive import ExhaustiveEvaluation
+from elements import (
+    And, Or, Xor, Not, Switch, Lamp, Wire, BusElement, BusAnd, BusOr, BusXor, 
+    BusNot, Split, Merge, BusSwitch, BusLamp, LIBRARY_ELEMENTS
+)
+from interface import Sandbox, Toolbar, TimingDiagram, CircuitFragment
+from simulation import FourValuedCircuit
+from waveform import WaveformRecorder
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    netlist_filter = "BLIF (*.blif);;Structural Verilog (*.v)"
+
+    # Limit of BDD nodes in analysis of lamps, so large circuits 
+    # are reported instead of exhausting memory 
+    analysis_max_nodes = 1 << 20
+
+    def __init__(self, window_height=None):
         QMainWindow.__init__(self)
 
-        window_height = max(self.screen().geometry().height(), 640) * 0.5
-        window_width = window_height * 1.6
+        # Size of interface depends on screen unless it is given, 
+        # e.g. to replay recorded interaction on another screen. 
+        if window_height is None:
+            window_height = max(self.screen().geometry().height(), 640) * 0.5
+
+        # Qt takes sizes of widgets in whole pixels. 
+        window_height = round(window_height)
+        window_width = round(window_height * 1.6)
 
         app_dir = os.path.dirname(os.path.abspath(__file__))
         window_icon_path = os.path.join(app_dir, "icon.ico")
@@ -22,11 +49,29 @@ class MainWindow(QMainWindow):
         self.sandbox = Sandbox(self, round(window_height * 0.0011, 1))
         self.toolbar = Toolbar(self.sandbox, window_height * 0.145)
 
+        # Circuit which selected group is compared with 
+        self.reference_netlist = None
+
+        # Copied elements 
+        self.clipboard = None
+
+        # Sets of elements shown by toolbar: basic gates, gates 
+        # of library and bus elements 
+        self.toolbar_sets = (
+            (And, Or, Xor, Not, Switch, Lamp),
+            (*LIBRARY_ELEMENTS.values(), Switch, Lamp),
+            (BusAnd, BusOr, BusXor, BusNot, Split, Merge, BusSwitch, BusLamp)
+        )
+        self.toolbar_set = 0
+
+        self.waveforms = WaveformRecorder()
+        self.timing_diagram = TimingDiagram(self.waveforms)
+
         # Window setting 
 
         self.setMinimumSize(window_width, window_height)
         self.setGeometry(
-            window_width * 0.34, window_height * 0.37, 
+            round(window_width * 0.34), round(window_height * 0.37), 
             window_width, window_height
         )
 
@@ -57,14 +102,499 @@ class MainWindow(QMainWindow):
                 if element.hover:
                     keys = {37: -90, 38: 180, 39: 90, 40: 180}
                     element.rotate(keys[event.nativeVirtualKey()])
+                    self.sandbox.update_placement({element})
 
                     break
 
+        # W pressed 
+        elif event.nativeVirtualKey() == 87:
+            self.toggle_probes()
+
+        # R pressed 
+        elif event.nativeVirtualKey() == 82:
+            self.sandbox.set_autoroute(not self.sandbox.autoroute)
+
+        # CTRL+H pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 72):
+            self.export_activity()
+
+        # H pressed 
+        elif event.nativeVirtualKey() == 72:
+            self.sandbox.set_activity(self.sandbox.toggle_counters is None)
+
+        # U pressed 
+        elif event.nativeVirtualKey() == 85:
+            self.switch_toolbar_set()
+
+        # P pressed 
+        elif event.nativeVirtualKey() == 80:
+            self.set_parameter()
+
+        # B pressed 
+        elif event.nativeVirtualKey() == 66:
+            self.analyze_lamp()
+
+        # E pressed 
+        elif event.nativeVirtualKey() == 69:
+            self.check_equivalence()
+
+        # CTRL+C pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 67):
+            self.copy_elements()
+
+        # CTRL+V pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 86):
+            self.paste_elements()
+
+        # A pressed 
+        elif event.nativeVirtualKey() == 65:
+            self.instantiate_array()
+
+        # T pressed 
+        elif event.nativeVirtualKey() == 84:
+            self.evaluate_truth_table()
+
+        # CTRL+O pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 79):
+            self.import_netlist()
+
+        # CTRL+S pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 83):
+            self.export_netlist()
+
+        # X pressed 
+        elif event.nativeVirtualKey() == 88:
+            self.check_four_valued()
+
+        # CTRL+I pressed 
+        elif (event.modifiers() == Qt.ControlModifier 
+                and event.nativeVirtualKey() == 73):
+            self.export_image()
+
+    def _get_target_elements(self):
+        """
+        Returns list with hovered element or elements of selected group. 
+        """
+
+        return [
+            element for element in self.sandbox.elements if element.hover
+        ][:1] or self.sandbox.selected_elements
+
+    def copy_elements(self):
+        elements = self._get_target_elements()
+
+        if elements:
+            self.clipboard = CircuitFragment(elements)
+
+    def paste_elements(self):
+        """
+        Pastes copied elements centered at mouse cursor and selects them. 
+        """
+
+        if self.clipboard is None:
+            return
+
+        position = self.sandbox.mapFromGlobal(QCursor.pos())
+
+        new_elements = self.sandbox.paste(
+            self.clipboard, 
+            position.x() - self.clipboard.width // 2, 
+            position.y() - self.clipboard.height // 2
+        )
+        self.sandbox.select_elements(new_elements)
+
+    def instantiate_array(self):
+        """
+        Asks for numbers of rows and columns and fills array 
+        with copies of selected group. 
+        """
+
+        elements = self.sandbox.selected_elements
+        if not elements:
+            return
+
+        text, accepted = QInputDialog.getText(
+            self, "Array", "Rows x columns:", text="2x2"
+        )
+        if not accepted:
+            return
+
+        try:
+            rows, columns = [int(value) for value in text.lower().split("x")]
+        except ValueError:
+            QMessageBox.warning(self, "Array", f"Invalid size: {text}")
+            return
+
+        new_elements = self.sandbox.instantiate_array(elements, rows, columns)
+        self.sandbox.select_elements(elements | set(new_elements))
+
+    def switch_toolbar_set(self):
+        self.toolbar_set = (self.toolbar_set + 1) % len(self.toolbar_sets)
+        self.toolbar.set_elements(self.toolbar_sets[self.toolbar_set])
+
+    def export_image(self):
+        """
+        Saves image of selected group or of whole circuit. Image 
+        of any size is drawn in tiles, so it needs little memory. 
+        """
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export image", "", 
+            "PNG (*.png);;TIFF (*.tif *.tiff);;SVG (*.svg)"
+        )
+        if not path:
+            return
+
+        scale, accepted = QInputDialog.getDouble(
+            self, "Export image", "Scale:", 1.0, 0.1, 20.0, 2
+        )
+        if not accepted:
+            return
+
+        try:
+            self.sandbox.export_image(
+                path, self.sandbox.selected_elements or None, scale
+            )
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "Export image", str(error))
+
+    def set_parameter(self):
+        """
+        Asks for new parameter of hovered bus element, e.g. index 
+        of bit of split or value of bus switch. 
+        """
+
+        for element in self.sandbox.elements:
+            if element.hover and isinstance(element, BusElement):
+                break
+        else:
+            return
+
+        if element.parameter_name is None:
+            return
+
+        text, accepted = QInputDialog.getText(
+            self, element.parameter_name, 
+            f"{element.parameter_name} (decimal or 0x hexadecimal):", 
+            text=str(element.parameter)
+        )
+        if not accepted:
+            return
+
+        try:
+            value = int(text, 0)
+        except ValueError:
+            value = -1
+
+        if value < 0:
+            QMessageBox.warning(
+                self, element.parameter_name, f"Invalid value: {text}"
+            )
+            return
+
+        element.set_state(value)
+        element.upd()
+
+        if self.sandbox.journal is not None:
+            self.sandbox.journal.mark((element,))
+
+    def toggle_probes(self):
+        """
+        Starts or stops recording waveforms of hovered element 
+        or of switches, lamps and wires of selected group. 
+        """
+
+        for element in self._get_target_elements():
+            if not isinstance(element, (Switch, Lamp, Wire)):
+                continue
+
+            if element.probe is None:
+                # Wires don't have names. 
+                name = getattr(element, "name", None) or (
+                    f"{type(element).__name__} "
+                    f"{len(self.waveforms.waveforms) + 1}"
+                )
+
+                element.probe = self.waveforms.add(name, element.condition)
+            else:
+                self.waveforms.remove(element.probe)
+                element.probe = None
+
+        self.timing_diagram.update_size()
+        self.timing_diagram.setVisible(bool(self.waveforms.waveforms))
+
+    def export_activity(self):
+        """
+        Saves numbers of toggles of elements recorded since 
+        heat map was turned on. 
+        """
+
+        if self.sandbox.toggle_counters is None:
+            QMessageBox.information(
+                self, "Switching activity", 
+                "Press H to start recording toggles of elements."
+            )
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Switching activity", "", "CSV (*.csv)"
+        )
+
+        if path:
+            try:
+                with open(path, "w", newline="") as file_:
+                    self.sandbox.export_activity(file_)
+            except OSError as error:
+                QMessageBox.warning(self, "Switching activity", str(error))
+
+    def analyze_lamp(self):
+        """
+        Reports for how many combinations of switches hovered lamp 
+        is on and sets switches to one of these combinations. 
+        """
+
+        for element in self.sandbox.elements:
+            if element.hover and isinstance(element, Lamp):
+                break
+        else:
+            return
+
+        try:
+            manager, nodes = bdd.from_netlist(
+                self.sandbox.to_netlist(), max_nodes=self.analysis_max_nodes
+            )
+
+            node = nodes[element.name]
+            count = manager.sat_count(node)
+            values = manager.satisfy(node)
+        except bdd.BDDSizeError as error:
+            QMessageBox.warning(
+                self, "Lamp analysis", 
+                f"Circuit is too large to analyze: {error}."
+            )
+            return
+        except RecursionError:
+            QMessageBox.warning(
+                self, "Lamp analysis", "Circuit is too deep to analyze."
+            )
+            return
+        except ValueError as error:
+            QMessageBox.warning(self, "Lamp analysis", str(error))
+            return
+
+        if values is None:
+            message = f"Lamp {element.name} is never on."
+        else:
+            self.sandbox.set_switches(values)
+            message = (
+                f"Lamp {element.name} is on for {count} of "
+                f"{2 ** len(manager.variables)} combinations of switches. "
+                "Switches are set to one of them."
+            )
+
+        QMessageBox.information(self, "Lamp analysis", message)
+
+    def check_four_valued(self):
+        """
+        Evaluates selected group (or whole circuit) for current values 
+        of switches in four-valued logic and reports lamps which are 
+        unknown (X) or not driven (Z), e.g. because of unconnected 
+        inputs, and nets driven to opposite values by several gates. 
+        """
+
+        elements = self.sandbox.selected_elements or self.sandbox.elements
+
+        try:
+            circuit = FourValuedCircuit(self.sandbox.to_netlist(elements))
+        except ValueError as error:
+            QMessageBox.warning(self, "Four-valued check", str(error))
+            return
+
+        conditions = {
+            element.name: element.condition for element in elements 
+            if isinstance(element, Switch)
+        }
+        lamps, conflicts = circuit.evaluate_vector(
+            ["1" if conditions[name] else "0" for name in circuit.inputs]
+        )
+
+        messages = [
+            f"Lamp {name} is {value}." 
+            for name, value in zip(circuit.outputs, lamps) if value in "XZ"
+        ]
+        if conflicts:
+            messages.append(
+                "Nets driven to opposite values: " 
+                + ", ".join(conflicts) + "."
+            )
+
+        QMessageBox.information(
+            self, "Four-valued check", 
+            "\n".join(messages) or "All lamps have known values."
+        )
+
+    def check_equivalence(self):
+        """
+        The first call remembers selected group (or whole circuit) 
+        as reference, the next one compares selected group with it. 
+        Counterexample found is applied to switches of selected group. 
+        """
+
+        elements = self.sandbox.selected_elements or self.sandbox.elements
+
+        try:
+            circuit = self.sandbox.to_netlist(elements)
+        except ValueError as error:
+            QMessageBox.warning(self, "Equivalence check", str(error))
+            return
+
+        if self.reference_netlist is None:
+            self.reference_netlist = circuit
+            QMessageBox.information(
+                self, "Equivalence check", 
+                "Circuit is remembered. Select another circuit "
+                "and press E again to compare them."
+            )
+
+            return
+
+        reference, self.reference_netlist = self.reference_netlist, None
+
+        try:
+            verdict, counterexample = check_equivalence(reference, circuit)
+        except ValueError as error:
+            QMessageBox.warning(self, "Equivalence check", str(error))
+            return
+
+        if verdict == DIFFERENT:
+            self.sandbox.set_switches(counterexample.inputs[1])
+            message = (
+                "Circuits are different. Switches are set to "
+                f"counterexample: {counterexample}"
+            )
+        elif verdict == EQUIVALENT:
+            message = "Circuits are equivalent."
+        else:
+            message = "No difference was found by random simulation."
+
+        QMessageBox.information(self, "Equivalence check", message)
+
+    def evaluate_truth_table(self):
+        """
+        Evaluates selected group (or whole circuit) over all 
+        combinations of switches in background processes, writing 
+        lamps values into file and showing progress. 
+        """
+
+        elements = self.sandbox.selected_elements or self.sandbox.elements
+
+        try:
+            evaluation = ExhaustiveEvaluation(
+                self.sandbox.to_netlist(elements)
+            )
+        except ValueError as error:
+            QMessageBox.warning(self, "Truth table", str(error))
+            return
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Truth table", "", "Lamps values (*.bin)"
+        )
+        if not path:
+            return
+
+        evaluation.path = path
+        evaluation.start()
+
+        dialog = QProgressDialog(
+            f"Evaluating {1 << len(evaluation.circuit.inputs)} vectors...", 
+            "Cancel", 0, 1000, self
+        )
+        dialog.setWindowTitle("Truth table")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.canceled.connect(evaluation.cancel)
+
+        timer = QTimer(dialog)
+
+        def check_progress():
+            dialog.setValue(round(evaluation.progress * 1000))
+
+            if not evaluation.finished:
+                return
+
+            timer.stop()
+            dialog.close()
+
+            try:
+                table = evaluation.wait()
+            except Exception as error:
+                QMessageBox.warning(self, "Truth table", str(error))
+                return
+
+            if table is None:
+                return
+
+            table.close()
+            QMessageBox.information(
+                self, "Truth table", 
+                f"Values of lamps {', '.join(table.outputs)} are written "
+                f"to {path} in {evaluation.elapsed_time:.1f} s."
+            )
+
+        timer.timeout.connect(check_progress)
+        timer.start(100)
+
+    def import_netlist(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import circuit", "", self.netlist_filter
+        )
+
+        if path:
+            try:
+                self.sandbox.load_netlist(netlist.load(path))
+            except (OSError, ValueError) as error:
+                QMessageBox.warning(self, "Import circuit", str(error))
+
+    def export_netlist(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export circuit", "", self.netlist_filter
+        )
+
+        if path:
+            try:
+                netlist.save(self.sandbox.to_netlist(), path)
+            except (OSError, ValueError) as error:
+                QMessageBox.warning(self, "Export circuit", str(error))
+
+    def closeEvent(self, event):
+        if self.sandbox.journal is not None:
+            self.sandbox.close_journal()
+
     def resizeEvent(self, event):
         self.sandbox.resize(self.width(), self.height())
         self.toolbar.move(0, self.height() - self.toolbar.height())
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+
+    start_time = time.perf_counter()
     window = MainWindow()
+    startup_time = time.perf_counter() - start_time
+
+    # Circuit edited last time is restored and edits are autosaved. 
+    if "--no-autosave" not in sys.argv:
+        try:
+            window.sandbox.open_journal(journal.default_path())
+        except OSError as error:
+            QMessageBox.warning(window, "Autosave", str(error))
+
+    # Cold-start cost of creating the interface can be tracked 
+    # by running application with --startup-time argument. 
+    if "--startup-time" in sys.argv:
+        print(f"Startup time: {startup_time * 1000:.1f} ms")
+
     sys.exit(app.exec_())
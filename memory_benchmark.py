@@ -0,0 +1,198 @@
+"""
+Memory benchmark of circuits built offscreen. 
+
+Usage: python memory_benchmark.py [--sizes N [N ...]] [--budget NAME=BYTES] 
+
+Reports bytes allocated by Python per element, contact, link, wire 
+segment and per gate of whole loaded circuits of increasing size, 
+measured with tracemalloc. Memory of Qt objects allocated by C++ 
+isn't seen by tracemalloc, so only Python side of elements is measured. 
+Exits with 1 when any measurement exceeds its budget. 
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+from netlist import Netlist
+
+# Default budgets in bytes 
+BUDGETS = {
+    "element": 2000,   # gate with its contacts 
+    "contact": 300,
+    "link": 250,   # pair of links between two contacts 
+    "wire segment": 800,   # segment with its new contact 
+    "circuit gate": 5000,   # gate of loaded circuit with its wires 
+}
+
+def random_netlist(gates_number, inputs_number=32, outputs_number=8,
+                   seed=0):
+    """
+    Returns netlist of random gates, each taking inputs from 
+    switches or earlier gates. 
+    """
+
+    generator = random.Random(seed)
+    netlist = Netlist()
+
+    nets = []
+    for n in range(inputs_number):
+        net = netlist.add_net()
+        netlist.add_gate("Switch", (), net, f"x{n}")
+        nets.append(net)
+
+    for _ in range(gates_number):
+        kind = generator.choice(("And", "Or", "Xor", "Not"))
+        inputs = generator.sample(nets[-64:], 1 if kind == "Not" else 2)
+
+        net = netlist.add_net()
+        netlist.add_gate(kind, inputs, net)
+        nets.append(net)
+
+    for n in range(outputs_number):
+        netlist.add_gate("Lamp", (nets[-1 - n],), None, f"y{n}")
+
+    netlist.resolve()
+
+    return netlist
+
+def _measure(function, *arguments):
+    """
+    Returns result of function and number of bytes allocated by it 
+    and still in use. 
+    """
+
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+
+    result = function(*arguments)
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+
+    return result, after - before
+
+def run(sizes, window):
+    """
+    Returns dictionary mapping names of measurements to bytes per item. 
+    """
+
+    from PyQt5.QtCore import QPoint
+    from connections import Contact, Link
+    from elements import And
+
+    sandbox = window.sandbox
+    count = max(sizes)
+    results = {}
+
+    def add_elements():
+        return [
+            sandbox.add_element(And, QPoint(n % 100 * 10, n // 100 * 10))
+            for n in range(count)
+        ]
+
+    elements, size = _measure(add_elements)
+    results["element"] = size / count
+
+    def add_contacts():
+        return [
+            Contact(elements[n], *And.contacts_data[0]) for n in range(count)
+        ]
+
+    contacts, size = _measure(add_contacts)
+    results["contact"] = size / count
+
+    def bind_links():
+        for n in range(count):
+            Link.bind(
+                elements[n].contacts[2],
+                elements[(n + 1) % count].contacts[0],
+                update=False
+            )
+
+    _, size = _measure(bind_links)
+    results["link"] = size / count
+
+    wire = sandbox.add_wire(0, 0, 10, 10)
+
+    def add_segments():
+        for n in range(count):
+            wire.add_segment(wire.contacts[-1], n % 100 * 10, n // 100 * 10)
+
+    _, size = _measure(add_segments)
+    results["wire segment"] = size / count
+
+    del elements, contacts, wire
+    sandbox.clear()
+
+    for gates_number in sizes:
+        netlist = random_netlist(gates_number)
+
+        _, size = _measure(sandbox.load_netlist, netlist)
+        results[f"circuit gate ({gates_number} gates)"] = (
+            size / len(netlist.gates)
+        )
+
+        sandbox.clear()
+
+    return results
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Measures memory used by circuits."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 4000],
+                        help="numbers of gates of measured circuits")
+    parser.add_argument("--budget", action="append", default=[],
+                        metavar="NAME=BYTES",
+                        help="budget of measurement, e.g. element=1500")
+
+    arguments = parser.parse_args(arguments)
+
+    budgets = dict(BUDGETS)
+    for budget in arguments.budget:
+        name, _, value = budget.rpartition("=")
+
+        if name not in budgets:
+            parser.error(f"unknown budget {name!r}")
+        budgets[name] = float(value)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    # Window is created before tracing starts, so its own memory 
+    # isn't counted. 
+    window = MainWindow(540)
+
+    tracemalloc.start()
+    try:
+        results = run(arguments.sizes, window)
+    finally:
+        tracemalloc.stop()
+
+    window.close()
+    window.timing_diagram.close()
+
+    exceeded = False
+
+    for name, size in results.items():
+        # Circuits of all sizes share one budget. 
+        budget = budgets[name.split(" (")[0]]
+        verdict = "ok" if size <= budget else "OVER BUDGET"
+        exceeded |= size > budget
+
+        print(f"{name:<32}{size:>10.0f} B  "
+              f"(budget {budget:.0f} B)  {verdict}")
+
+    return 1 if exceeded else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,921 @@
+"""
+Contains Qt-independent description of circuits (netlist) 
+and its reading from and writing to BLIF and structural Verilog. 
+"""
+
+import hashlib
+import marshal
+import os.path
+import re
+
+from gatelib import LIBRARY
+
+# Number of inputs and presence of output of each element kind. 
+# Kinds are named after element classes from elements.py. 
+GATE_KINDS = {
+    "And": (2, True),
+    "Or": (2, True),
+    "Xor": (2, True),
+    "Not": (1, True),
+    "Switch": (0, True),
+    "Lamp": (1, False)
+}
+
+# Bitwise functions of gates. Every bit of integer value is a separate 
+# input vector, so the same functions evaluate many vectors at once. 
+GATE_FUNCTIONS = {
+    "And": lambda mask, a, b: a & b,
+    "Or": lambda mask, a, b: a | b,
+    "Xor": lambda mask, a, b: a ^ b,
+    "Not": lambda mask, a: ~a & mask
+}
+
+# Kinds of gates whose result doesn't depend on order of inputs 
+COMMUTATIVE_KINDS = {"And", "Or", "Xor"}
+
+# The same functions as Python expressions of input nets, 
+# used for generating compiled evaluators (see simulation.py). 
+GATE_EXPRESSIONS = {
+    "And": "{0} & {1}",
+    "Or": "{0} | {1}",
+    "Xor": "{0} ^ {1}",
+    "Not": "~{0} & mask"
+}
+
+# Gates of library (see gatelib.py) 
+for _definition in LIBRARY.values():
+    GATE_KINDS[_definition.name] = (len(_definition.inputs), True)
+    GATE_FUNCTIONS[_definition.name] = _definition.function
+    GATE_EXPRESSIONS[_definition.name] = _definition.template
+
+    if _definition.commutative:
+        COMMUTATIVE_KINDS.add(_definition.name)
+
+# Gates computing inversions of outputs of 2-input gates 
+NEGATED_KINDS = {"And": "Nand", "Or": "Nor", "Xor": "Xnor"}
+
+class Gate:
+    __slots__ = ("kind", "name", "inputs", "output")
+
+    def __init__(self, kind, name, inputs, output):
+        self.kind = kind
+        self.name = name
+        self.inputs = inputs   # tuple of nets indexes 
+        self.output = output   # net index or None (for Lamp) 
+
+class Netlist:
+    """
+    Circuit as a list of gates connected by nets. 
+
+    Nets are numbered from 0 and can have names. Net driven by several 
+    gates is active if at least one of them is active, the same way as 
+    wires in the sandbox. Switches and lamps are gates too: they are 
+    inputs and outputs of the circuit. 
+    """
+
+    def __init__(self, name="circuit"):
+        self.name = name
+
+        self.gates = []
+        self.net_names = []   # net index -> name or None 
+
+        self._net_indexes = {}   # name -> net index 
+        self._aliases = []   # net index -> index of net it merged to 
+
+    # Building 
+
+    def add_net(self, name=None):
+        index = len(self.net_names)
+
+        self.net_names.append(name)
+        self._aliases.append(index)
+
+        if name is not None:
+            self._net_indexes[name] = index
+
+        return index
+
+    def net(self, name):
+        """
+        Returns index of net with given name, creating it if needed. 
+        """
+
+        index = self._net_indexes.get(name)
+
+        if index is None:
+            index = self.add_net(name)
+
+        return self._find(index)
+
+    def find_net(self, name):
+        """
+        Returns index of existing net with given name. 
+        """
+
+        return self._find(self._net_indexes[name])
+
+    def add_gate(self, kind, inputs=(), output=None, name=None):
+        inputs_number, has_output = GATE_KINDS[kind]
+
+        if len(inputs) != inputs_number or (output is None) == has_output:
+            raise ValueError(f"Wrong connections of {kind} gate")
+
+        gate = Gate(kind, name, tuple(inputs), output)
+        self.gates.append(gate)
+
+        return gate
+
+    def add_tree(self, kind, inputs, output=None, root_kind=None):
+        """
+        Connects any number of inputs with balanced tree of 
+        2-input gates of given kind. Returns tree's output net. 
+        If root_kind is given, the root gate (if there is any) 
+        is of this kind, e.g. Nand for tree of And gates. 
+        """
+
+        inputs = list(inputs)
+
+        while len(inputs) > 2:
+            next_inputs = []
+
+            for n in range(0, len(inputs) - 1, 2):
+                net = self.add_net()
+                self.add_gate(kind, inputs[n:n + 2], net)
+                next_inputs.append(net)
+
+            if len(inputs) % 2:
+                next_inputs.append(inputs[-1])
+
+            inputs = next_inputs
+
+        if len(inputs) == 1:
+            if output is None:
+                return inputs[0]
+
+            self.merge_nets(output, inputs[0])
+
+            return self._find(output)
+
+        if output is None:
+            output = self.add_net()
+
+        self.add_gate(root_kind or kind, inputs, output)
+
+        return output
+
+    def merge_nets(self, net_0, net_1):
+        """
+        Makes two nets one net. Gates are reconnected by resolve(). 
+        """
+
+        net_0 = self._find(net_0)
+        net_1 = self._find(net_1)
+
+        if net_0 != net_1:
+            self._aliases[net_1] = net_0
+
+            if self.net_names[net_0] is None:
+                self.net_names[net_0] = self.net_names[net_1]
+
+    def _find(self, net):
+        aliases = self._aliases
+
+        while aliases[net] != net:
+            aliases[net] = aliases[aliases[net]]
+            net = aliases[net]
+
+        return net
+
+    def resolve(self):
+        """
+        Reconnects gates to merged nets and renumbers nets, 
+        so there are no unused net indexes. 
+        """
+
+        new_indexes = {}
+        new_names = []
+
+        def renumber(net):
+            net = self._find(net)
+            index = new_indexes.get(net)
+
+            if index is None:
+                index = new_indexes[net] = len(new_names)
+                new_names.append(self.net_names[net])
+
+            return index
+
+        for gate in self.gates:
+            gate.inputs = tuple(renumber(net) for net in gate.inputs)
+
+            if gate.output is not None:
+                gate.output = renumber(gate.output)
+
+        self.net_names = new_names
+        self._net_indexes = {
+            name: index for index, name in enumerate(new_names)
+            if name is not None
+        }
+        self._aliases = list(range(len(new_names)))
+
+    # Circuit structure 
+
+    @property
+    def switches(self):
+        return [gate for gate in self.gates if gate.kind == "Switch"]
+
+    @property
+    def lamps(self):
+        return [gate for gate in self.gates if gate.kind == "Lamp"]
+
+    def get_net_name(self, net):
+        name = self.net_names[net]
+
+        return f"n{net}" if name is None else name
+
+    def levelize(self):
+        """
+        Returns list of gates in topological order and dictionary 
+        with level of each gate. Switches have level 0. 
+
+        Raises ValueError if circuit contains combinational cycle. 
+        """
+
+        drivers = [[] for _ in self.net_names]
+        for gate in self.gates:
+            if gate.output is not None:
+                drivers[gate.output].append(gate)
+
+        sinks = {gate: [] for gate in self.gates}
+        unresolved = {}
+
+        for gate in self.gates:
+            unresolved[gate] = 0
+
+            for net in gate.inputs:
+                for driver in drivers[net]:
+                    sinks[driver].append(gate)
+                    unresolved[gate] += 1
+
+        order = [gate for gate in self.gates if not unresolved[gate]]
+        levels = dict.fromkeys(order, 0)
+
+        for gate in order:
+            for sink in sinks[gate]:
+                levels[sink] = max(levels.get(sink, 0), levels[gate] + 1)
+                unresolved[sink] -= 1
+
+                if not unresolved[sink]:
+                    order.append(sink)
+
+        if len(order) != len(self.gates):
+            raise ValueError("Circuit contains combinational cycle")
+
+        return order, levels
+
+    def structural_hash(self):
+        """
+        Returns hexadecimal hash of circuit's structure: kinds of gates, 
+        their connections and names of switches and lamps. It doesn't 
+        depend on order of gates, numbers and names of internal nets 
+        and order of inputs of commutative gates, so circuits differing 
+        only by layout have the same hash. 
+
+        Raises ValueError if circuit contains combinational cycle. 
+        """
+
+        def digest(*parts):
+            return hashlib.blake2b(
+                b"\0".join(parts), digest_size=16
+            ).digest()
+
+        order, _ = self.levelize()
+
+        drivers = [[] for _ in self.net_names]   # net -> drivers' hashes 
+        nets_hashes = {}
+
+        def get_net_hash(net):
+            # All drivers of net precede its sinks in topological order. 
+            if net not in nets_hashes:
+                nets_hashes[net] = digest(b"net", *sorted(drivers[net]))
+
+            return nets_hashes[net]
+
+        switches_names = {
+            gate: str(n if gate.name is None else gate.name).encode()
+            for n, gate in enumerate(self.switches)
+        }
+        lamps = []
+
+        for gate in order:
+            inputs = [get_net_hash(net) for net in gate.inputs]
+
+            if gate.kind in COMMUTATIVE_KINDS:
+                inputs.sort()
+
+            if gate.kind == "Switch":
+                drivers[gate.output].append(
+                    digest(b"Switch", switches_names[gate])
+                )
+            elif gate.kind == "Lamp":
+                lamps.append(digest(str(gate.name).encode(), *inputs))
+            else:
+                drivers[gate.output].append(
+                    digest(gate.kind.encode(), *inputs)
+                )
+
+        return hashlib.blake2b(
+            b"\0".join(sorted(switches_names.values())) + b"\0" 
+            + b"".join(sorted(lamps)), 
+            digest_size=16
+        ).hexdigest()
+
+    def gates_hash(self):
+        """
+        Returns hexadecimal hash of gates as they are listed: their 
+        kinds, names and nets. Unlike structural_hash it doesn't 
+        levelize circuit, but it depends on order of gates and numbers 
+        of nets, so it is the same only for circuits read from the same 
+        description. 
+        """
+
+        # Merged nets are given by aliases, so they aren't resolved. 
+        # Marshal format 2 doesn't refer to shared objects, so equal 
+        # gates give equal data. 
+        data = marshal.dumps((
+            [
+                (gate.kind, gate.name, gate.inputs, gate.output)
+                for gate in self.gates
+            ],
+            self._aliases
+        ), 2)
+
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def evaluate(self, inputs, mask=1):
+        """
+        Returns list of values of nets for given values of switches 
+        (mapping of switch name to value or sequence in switches order). 
+
+        Values are integers: with mask of k ones, k input vectors 
+        are evaluated at once, one per bit. 
+        """
+
+        switches = self.switches
+        if not isinstance(inputs, dict):
+            inputs = {
+                gate.name: value for gate, value in zip(switches, inputs)
+            }
+
+        values = [0] * len(self.net_names)
+        order, _ = self.levelize()
+
+        for gate in order:
+            if gate.kind == "Switch":
+                value = inputs.get(gate.name, 0) & mask
+            elif gate.kind == "Lamp":
+                continue
+            else:
+                value = GATE_FUNCTIONS[gate.kind](
+                    mask, *[values[net] for net in gate.inputs]
+                )
+
+            values[gate.output] |= value
+
+        return values
+
+# Reading 
+
+def load(path):
+    """
+    Reads netlist from .blif or .v file. 
+    """
+
+    readers = {".blif": read_blif, ".v": read_verilog}
+    reader = readers.get(os.path.splitext(path)[1].lower())
+
+    if reader is None:
+        raise ValueError(f"Unknown netlist format: {path}")
+
+    with open(path) as file_:
+        netlist = reader(file_)
+
+    if netlist.name == "circuit":
+        netlist.name = os.path.splitext(os.path.basename(path))[0]
+
+    return netlist
+
+def _add_constant(netlist, value, output):
+    # Circuit has no constant elements: net without drivers is inactive 
+    # and inverted net without drivers is active. 
+    if value:
+        netlist.add_gate("Not", (netlist.add_net(),), output)
+
+def _add_cover(netlist, inputs, output, cover):
+    """
+    Adds gates computing function given by BLIF sum of products. 
+    """
+
+    # Each row of cover is a pair of input plane and output value. 
+    if not cover:
+        _add_constant(netlist, False, output)
+        return
+
+    inverted = cover[0][1] == "0"
+    rows = sorted(plane for plane, _ in cover)
+
+    # Recognizing simple 1- and 2-input functions 
+    simple_functions = {
+        ("1",): (None, False), ("0",): (None, True),
+        ("11",): ("And", False), ("-1", "1-"): ("Or", False),
+        ("01", "10"): ("Xor", False), ("00", "11"): ("Xor", True),
+        ("00", "01", "10"): ("And", True), ("00",): ("Or", True)
+    }
+
+    if tuple(rows) in simple_functions:
+        kind, negation = simple_functions[tuple(rows)]
+        negation ^= inverted
+
+        if kind is None:
+            if negation:
+                netlist.add_gate("Not", inputs, output)
+            else:
+                netlist.merge_nets(output, inputs[0])
+        elif negation:
+            netlist.add_gate(NEGATED_KINDS[kind], inputs, output)
+        else:
+            netlist.add_gate(kind, inputs, output)
+
+        return
+
+    # Generic cover: OR of ANDs of literals 
+    inverted_inputs = {}
+    products = []
+
+    for plane in rows:
+        literals = []
+
+        for net, literal in zip(inputs, plane):
+            if literal == "1":
+                literals.append(net)
+            elif literal == "0":
+                if net not in inverted_inputs:
+                    inverted_inputs[net] = netlist.add_net()
+                    netlist.add_gate("Not", (net,), inverted_inputs[net])
+
+                literals.append(inverted_inputs[net])
+
+        if not literals:
+            # Product without literals is always active. 
+            _add_constant(netlist, not inverted, output)
+            return
+
+        products.append(netlist.add_tree("And", literals))
+
+    if inverted and len(products) > 1:
+        netlist.add_tree("Or", products, output, "Nor")
+    elif inverted:
+        netlist.add_gate("Not", products, output)
+    else:
+        netlist.add_tree("Or", products, output)
+
+def _blif_statements(lines):
+    """
+    Yields lists of tokens of BLIF lines joining continued lines. 
+    """
+
+    tokens = []
+
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+
+        continued = line.endswith("\\")
+        tokens.extend(line.rstrip("\\").split())
+
+        if not continued and tokens:
+            yield tokens
+            tokens = []
+
+    if tokens:
+        yield tokens
+
+def read_blif(lines):
+    """
+    Reads combinational gate-level BLIF line by line. 
+
+    Inputs and outputs of model become switches and lamps, 
+    .names covers are mapped to And, Or, Xor and Not gates. 
+    """
+
+    netlist = Netlist()
+
+    names = None   # inputs, output and cover of current .names 
+
+    def finish_names():
+        if names is not None:
+            _add_cover(netlist, *names)
+
+    for tokens in _blif_statements(lines):
+        keyword = tokens[0]
+
+        if not keyword.startswith("."):
+            if names is None:
+                raise ValueError(f"Unexpected BLIF line: {' '.join(tokens)}")
+
+            if len(names[0]):
+                names[2].append((tokens[0], tokens[1]))
+            else:
+                names[2].append(("", tokens[0]))
+
+            continue
+
+        finish_names()
+        names = None
+
+        if keyword == ".model":
+            netlist.name = tokens[1] if len(tokens) > 1 else netlist.name
+        elif keyword == ".inputs":
+            for name in tokens[1:]:
+                netlist.add_gate("Switch", (), netlist.net(name), name)
+        elif keyword == ".outputs":
+            for name in tokens[1:]:
+                netlist.add_gate("Lamp", (netlist.net(name),), None, name)
+        elif keyword == ".names":
+            inputs = tuple(netlist.net(name) for name in tokens[1:-1])
+            names = (inputs, netlist.net(tokens[-1]), [])
+        elif keyword == ".end":
+            break
+        elif keyword in (".latch", ".subckt", ".gate", ".mlatch"):
+            raise ValueError(f"BLIF {keyword} is not supported")
+
+    finish_names()
+    netlist.resolve()
+
+    return netlist
+
+def _verilog_statements(lines):
+    """
+    Yields Verilog statements (without ";") skipping comments. 
+    """
+
+    statement = []
+    in_comment = False
+
+    for line in lines:
+        if in_comment:
+            if "*/" not in line:
+                continue
+
+            line = line.split("*/", 1)[1]
+            in_comment = False
+
+        line = re.sub(r"/\*.*?\*/", " ", line.split("//", 1)[0])
+
+        if "/*" in line:
+            line, in_comment = line.split("/*", 1)[0], True
+
+        parts = line.split(";")
+        for part in parts[:-1]:
+            statement.append(part)
+            yield " ".join(" ".join(statement).split())
+            statement = []
+
+        statement.append(parts[-1])
+
+        if " ".join(statement).strip() == "endmodule":
+            yield "endmodule"
+            statement = []
+
+_verilog_primitives = {
+    "and": ("And", False), "or": ("Or", False), "xor": ("Xor", False),
+    "nand": ("And", True), "nor": ("Or", True), "xnor": ("Xor", True),
+    "not": ("Not", False), "buf": (None, False)
+}
+
+def _unescape_verilog_name(name):
+    return name[1:] if name.startswith("\\") else name
+
+def _expand_verilog_names(declaration):
+    """
+    Returns list of names declared by "[msb:lsb] a, b" declaration. 
+    """
+
+    match = re.match(r"\[\s*(\d+)\s*:\s*(\d+)\s*\](.*)", declaration.strip())
+    names = (match.group(3) if match else declaration).replace(",", " ")
+    names = [_unescape_verilog_name(name) for name in names.split()]
+
+    if not match:
+        return names
+
+    msb, lsb = int(match.group(1)), int(match.group(2))
+    step = 1 if msb >= lsb else -1
+
+    return [
+        f"{name}[{index}]"
+        for name in names
+        for index in range(lsb, msb + step, step)
+    ]
+
+_verilog_token = re.compile(
+    r"\s*(\\\S+|[A-Za-z_][\w$]*(?:\s*\[\s*\d+\s*\])?|1'b[01]|[~&|^()])"
+)
+
+def _add_verilog_expression(netlist, connect, source):
+    """
+    Adds gates computing bitwise expression of nets (with ~, &, ^, | 
+    in order of precedence and parentheses). Returns its net. 
+    """
+
+    tokens = []
+    position = 0
+
+    while source[position:].strip():
+        match = _verilog_token.match(source, position)
+        if match is None:
+            raise ValueError(f"Unsupported Verilog expression: {source}")
+
+        tokens.append(match.group(1))
+        position = match.end()
+
+    tokens.append(None)
+    position = 0
+
+    def parse(operators):
+        nonlocal position
+
+        # Operators from the lowest precedence 
+        if not operators:
+            return parse_unary()
+
+        (operator, kind), *higher = operators
+        net = parse(higher)
+
+        while tokens[position] == operator:
+            position += 1
+            net = netlist.add_tree(kind, (net, parse(higher)))
+
+        return net
+
+    def parse_unary():
+        nonlocal position
+
+        token = tokens[position]
+        position += 1
+
+        if token == "~":
+            operand = parse_unary()
+            net = netlist.add_net()
+            netlist.add_gate("Not", (operand,), net)
+
+            return net
+
+        if token == "(":
+            net = parse(operations)
+
+            if tokens[position] != ")":
+                raise ValueError(f"Unbalanced parentheses: {source}")
+            position += 1
+
+            return net
+
+        if token is None or token in "&|^)":
+            raise ValueError(f"Unsupported Verilog expression: {source}")
+
+        return connect(token)
+
+    operations = (("|", "Or"), ("^", "Xor"), ("&", "And"))
+    net = parse(operations)
+
+    if tokens[position] is not None:
+        raise ValueError(f"Unsupported Verilog expression: {source}")
+
+    return net
+
+def read_verilog(lines):
+    """
+    Reads structural Verilog module line by line. 
+
+    Supports input, output and wire declarations, gate primitives 
+    (and, or, xor, nand, nor, xnor, not, buf) and assign statements 
+    with bitwise expressions of nets and constants. 
+    """
+
+    netlist = Netlist()
+
+    def connect(net_name):
+        net_name = _unescape_verilog_name(net_name.strip().replace(" ", ""))
+
+        if net_name in ("1'b0", "1'b1"):
+            net = netlist.add_net()
+            _add_constant(netlist, net_name == "1'b1", net)
+
+            return net
+
+        return netlist.net(net_name)
+
+    for statement in _verilog_statements(lines):
+        if not statement:
+            continue
+
+        keyword, _, rest = statement.partition(" ")
+
+        if keyword == "module":
+            netlist.name = re.split(r"[\s(]", rest.strip(), 1)[0]
+
+        elif keyword == "input":
+            for name in _expand_verilog_names(rest):
+                netlist.add_gate("Switch", (), netlist.net(name), name)
+
+        elif keyword == "output":
+            for name in _expand_verilog_names(rest):
+                netlist.add_gate("Lamp", (netlist.net(name),), None, name)
+
+        elif keyword == "wire":
+            for name in _expand_verilog_names(rest):
+                netlist.net(name)
+
+        elif keyword == "assign":
+            target, _, source = rest.partition("=")
+            source = source.strip()
+
+            netlist.merge_nets(
+                connect(target), 
+                _add_verilog_expression(netlist, connect, source)
+            )
+
+        elif keyword in _verilog_primitives:
+            kind, negation = _verilog_primitives[keyword]
+
+            for instance in re.findall(r"\(([^)]*)\)", rest):
+                nets = [connect(name) for name in instance.split(",")]
+                output, inputs = nets[0], nets[1:]
+
+                if kind is None:
+                    netlist.merge_nets(output, inputs[0])
+                elif kind == "Not":
+                    netlist.add_gate("Not", inputs, output)
+                elif negation and len(inputs) > 1:
+                    netlist.add_tree(
+                        kind, inputs, output, NEGATED_KINDS[kind]
+                    )
+                elif negation:
+                    netlist.add_gate("Not", inputs, output)
+                else:
+                    netlist.add_tree(kind, inputs, output)
+
+        elif keyword == "endmodule":
+            break
+
+        else:
+            raise ValueError(f"Unsupported Verilog statement: {statement}")
+
+    netlist.resolve()
+
+    return netlist
+
+# Writing 
+
+def save(netlist, path):
+    """
+    Writes netlist to .blif or .v file. 
+    """
+
+    writers = {".blif": write_blif, ".v": write_verilog}
+    writer = writers.get(os.path.splitext(path)[1].lower())
+
+    if writer is None:
+        raise ValueError(f"Unknown netlist format: {path}")
+
+    with open(path, "w") as file_:
+        writer(netlist, file_)
+
+def _exported_gates(netlist):
+    """
+    Yields tuples (kind, inputs names, output name) of logic gates, 
+    adding Or gates for nets with several drivers and buffers between 
+    nets and differently named switches and lamps. 
+    """
+
+    drivers = {}
+    used_nets = set()
+
+    for gate in netlist.gates:
+        used_nets.update(gate.inputs)
+
+        if gate.output is not None:
+            drivers.setdefault(gate.output, []).append(gate)
+
+    for net in sorted(used_nets - drivers.keys()):
+        yield "Zero", [], netlist.get_net_name(net)
+
+    def output_name(gate, n):
+        name = netlist.get_net_name(gate.output)
+
+        return name if len(drivers[gate.output]) == 1 else f"{name}_{n}"
+
+    for net, net_drivers in drivers.items():
+        for n, gate in enumerate(net_drivers):
+            inputs = [netlist.get_net_name(input_) for input_ in gate.inputs]
+
+            if gate.kind == "Switch":
+                if gate.name != output_name(gate, n):
+                    yield "Buffer", [gate.name], output_name(gate, n)
+            else:
+                yield gate.kind, inputs, output_name(gate, n)
+
+        if len(net_drivers) > 1:
+            yield "Or", [
+                output_name(gate, n) for n, gate in enumerate(net_drivers)
+            ], netlist.get_net_name(net)
+
+    for gate in netlist.lamps:
+        net_name = netlist.get_net_name(gate.inputs[0])
+
+        if gate.name != net_name:
+            yield "Buffer", [net_name], gate.name
+
+def _ports_names(netlist):
+    inputs = [gate.name for gate in netlist.switches]
+    outputs = [gate.name for gate in netlist.lamps]
+
+    return inputs, outputs
+
+def write_blif(netlist, file_):
+    covers = {
+        "And": ["11 1"], "Or": None, "Xor": ["01 1", "10 1"],
+        "Not": ["0 1"], "Buffer": ["1 1"], "Zero": []
+    }
+
+    for definition in LIBRARY.values():
+        covers.setdefault(definition.name, definition.get_cover())
+
+    inputs, outputs = _ports_names(netlist)
+
+    file_.write(f".model {netlist.name}\n")
+    file_.write(f".inputs {' '.join(inputs)}\n")
+    file_.write(f".outputs {' '.join(outputs)}\n")
+
+    for kind, inputs, output in _exported_gates(netlist):
+        file_.write(f".names {' '.join(inputs)} {output}\n")
+
+        if kind == "Or":
+            for n in range(len(inputs)):
+                plane = "-" * n + "1" + "-" * (len(inputs) - n - 1)
+                file_.write(f"{plane} 1\n")
+        else:
+            for row in covers[kind]:
+                file_.write(f"{row}\n")
+
+    file_.write(".end\n")
+
+def _verilog_name(name):
+    if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_$]*", name):
+        return name
+
+    # Escaped identifier 
+    return f"\\{name} "
+
+def write_verilog(netlist, file_):
+    inputs, outputs = _ports_names(netlist)
+    ports = [_verilog_name(name) for name in inputs + outputs]
+
+    file_.write(f"module {_verilog_name(netlist.name)} ({', '.join(ports)});\n")
+
+    for name in inputs:
+        file_.write(f"  input {_verilog_name(name)};\n")
+    for name in outputs:
+        file_.write(f"  output {_verilog_name(name)};\n")
+
+    gates = list(_exported_gates(netlist))
+    ports = set(inputs) | set(outputs)
+
+    wires = set()
+    for _, gate_inputs, output in gates:
+        wires.update(gate_inputs)
+        wires.add(output)
+
+    for name in sorted(wires - ports):
+        file_.write(f"  wire {_verilog_name(name)};\n")
+
+    for n, (kind, gate_inputs, output) in enumerate(gates):
+        if kind == "Zero":
+            file_.write(f"  assign {_verilog_name(output)} = 1'b0;\n")
+            continue
+
+        definition = LIBRARY.get(kind)
+
+        if definition is not None and definition.verilog is None:
+            expression = definition.get_verilog_expression(
+                [_verilog_name(name) for name in gate_inputs]
+            )
+            file_.write(f"  assign {_verilog_name(output)} = {expression};\n")
+            continue
+
+        primitive = "buf" if kind == "Buffer" else kind.lower()
+        nets = ", ".join(
+            _verilog_name(name) for name in [output, *gate_inputs]
+        )
+
+        file_.write(f"  {primitive} g{n} ({nets});\n")
+
+    file_.write("endmodule\n")
@@ -0,0 +1,365 @@
+"""
+Contains topological order of directed graph maintained incrementally 
+as edges are added and removed (Pearce-Kelly algorithm). 
+"""
+
+import contextlib
+
+class TopologicalOrder:
+    """
+    Order of nodes (any hashable objects) in which every edge goes 
+    from earlier node to later one. 
+
+    Graph itself isn't copied: get_successors and get_predecessors 
+    return nodes connected with given node by its outgoing and incoming 
+    edges (a node once per edge), and order is told about every edge 
+    just after it is added to graph or removed from it. So order costs 
+    only positions of its nodes. 
+
+    Adding edge against order reorders only nodes placed between its 
+    ends, which are reachable from them, so a change costs as much 
+    as the region it affects rather than the whole graph. Edge which 
+    would close a cycle isn't ordered: it is kept in cyclic_edges until 
+    removal of other edges breaks the cycle. 
+    """
+
+    def __init__(self, get_successors, get_predecessors):
+        self._get_successors = get_successors
+        self._get_predecessors = get_predecessors
+
+        self.clear()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, node):
+        return node in self._positions
+
+    def __iter__(self):
+        return (node for node in self._nodes if node is not None)
+
+    def add_node(self, node):
+        if node not in self._positions:
+            self._positions[node] = len(self._nodes)
+            self._nodes.append(node)
+
+    def remove_node(self, node):
+        """
+        Removes node, whose edges are already removed from graph. 
+        Does nothing if there is no such node. 
+        """
+
+        position = self._positions.pop(node, None)
+        if position is None:
+            return
+
+        self._nodes[position] = None
+        self._removed += 1
+
+        if self.cyclic_edges:
+            self.cyclic_edges = {
+                edge: number for edge, number in self.cyclic_edges.items()
+                if node not in edge
+            }
+
+            if self._deferred_start is None:
+                self._retry_cyclic_edges()
+
+        if self._deferred_start is not None:
+            return
+
+        # Holes left by removed nodes are dropped when they prevail. 
+        if self._removed > len(self._nodes) // 2:
+            self._nodes = list(self)
+            self._positions = {
+                node: position for position, node in enumerate(self._nodes)
+            }
+            self._removed = 0
+
+    def clear(self):
+        self._positions = {}   # node -> position 
+        self._nodes = []       # position -> node or None if removed 
+        self._removed = 0
+
+        # Edges closing cycles: (source, target) -> number 
+        self.cyclic_edges = {}
+
+        # Position of the first node added while ordering is deferred 
+        # or None, and whether deferred edges connect only such nodes 
+        self._deferred_start = None
+        self._deferred_local = True
+
+    def get_position(self, node):
+        """
+        Returns number comparable with positions of other nodes. 
+        """
+
+        return self._positions[node]
+
+    def sort(self, nodes):
+        """
+        Returns list of nodes in topological order. Nodes which 
+        aren't in order (i.e. don't have edges) go first. 
+        """
+
+        positions = self._positions
+
+        return sorted(nodes, key=lambda node: positions.get(node, -1))
+
+    def add_edge(self, source, target):
+        """
+        Orders edge from source to target added to graph, adding its 
+        nodes if needed. Returns False if edge closes a cycle, 
+        otherwise True. 
+        """
+
+        self.add_node(source)
+        self.add_node(target)
+
+        edge = (source, target)
+
+        number = self.cyclic_edges.get(edge)
+        if number is not None:
+            self.cyclic_edges[edge] = number + 1
+            return False
+
+        start = self._deferred_start
+        if start is not None:
+            if (self._positions[source] < start
+                    or self._positions[target] < start):
+                self._deferred_local = False
+
+            return True
+
+        if self._insert(source, target):
+            return True
+
+        self.cyclic_edges[edge] = 1
+        return False
+
+    def remove_edge(self, source, target):
+        """
+        Forgets edge from source to target removed from graph. 
+        """
+
+        edge = (source, target)
+
+        number = self.cyclic_edges.get(edge)
+        if number is not None:
+            if number > 1:
+                self.cyclic_edges[edge] = number - 1
+            else:
+                del self.cyclic_edges[edge]
+
+            return
+
+        # Cycles can be broken only when the last parallel edge is gone. 
+        if (self.cyclic_edges and self._deferred_start is None
+                and source in self._positions
+                and target not in self._get_successors(source)):
+            self._retry_cyclic_edges()
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """
+        Defers ordering of edges added inside with-block until its end, 
+        where they are ordered at once. It is much faster when many 
+        edges are added, e.g. when circuit is loaded or pasted. If they 
+        connect only nodes added inside the block, only these nodes 
+        are sorted, otherwise the whole order is built again. 
+        Inside the block add_edge always returns True. 
+        """
+
+        if self._deferred_start is not None:
+            yield
+            return
+
+        self._deferred_start = len(self._nodes)
+        self._deferred_local = True
+
+        try:
+            yield
+        finally:
+            start = self._deferred_start if self._deferred_local else 0
+            self._deferred_start = None
+
+            self._sort(start)
+
+            # Removals inside the block could break other cycles. 
+            if start and self.cyclic_edges:
+                self._retry_cyclic_edges()
+
+    def _sort(self, start):
+        """
+        Sorts nodes from start position to the end by depth-first 
+        search, edges against the order it gives (back edges) become 
+        cyclic. Edges of these nodes go only to each other. 
+        """
+
+        positions = self._positions
+        get_successors = self._get_successors
+
+        nodes = [node for node in self._nodes[start:] if node is not None]
+
+        # Cyclic edges of these nodes may become ordered. 
+        self.cyclic_edges = {
+            (source, target): number
+            for (source, target), number in self.cyclic_edges.items()
+            if positions[source] < start or positions[target] < start
+        }
+
+        # Reversed postorder of search is topological order. 
+        postorder = []
+        visited = set()
+
+        for root in nodes:
+            if root in visited:
+                continue
+
+            visited.add(root)
+            stack = [(root, iter(get_successors(root)))]
+
+            while stack:
+                node, children = stack[-1]
+
+                for child in children:
+                    if child not in visited:
+                        visited.add(child)
+                        stack.append((child, iter(get_successors(child))))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(node)
+
+        self._removed -= len(self._nodes) - start - len(nodes)
+        self._nodes[start:] = reversed(postorder)
+
+        for position, node in enumerate(self._nodes[start:], start):
+            positions[node] = position
+
+        cyclic_edges = self.cyclic_edges
+
+        for source in nodes:
+            for target in get_successors(source):
+                if positions[target] <= positions[source]:
+                    edge = (source, target)
+                    cyclic_edges[edge] = cyclic_edges.get(edge, 0) + 1
+
+    def _retry_cyclic_edges(self):
+        for edge in list(self.cyclic_edges):
+            if self._insert(*edge):
+                del self.cyclic_edges[edge]
+
+    def _iter_successors(self, node):
+        # Cyclic edges aren't a part of ordered graph. 
+        cyclic_edges = self.cyclic_edges
+
+        for successor in self._get_successors(node):
+            if (node, successor) not in cyclic_edges:
+                yield successor
+
+    def _iter_predecessors(self, node):
+        cyclic_edges = self.cyclic_edges
+
+        for predecessor in self._get_predecessors(node):
+            if (predecessor, node) not in cyclic_edges:
+                yield predecessor
+
+    def _insert(self, source, target):
+        """
+        Reorders nodes, so that edge from source to target goes 
+        forward, if needed. Returns False without changes if edge 
+        would close a cycle. 
+        """
+
+        if source == target:
+            return False
+
+        positions = self._positions
+        lower = positions[target]
+        upper = positions[source]
+
+        if lower < upper:
+            # Nodes reachable from target, which are placed before 
+            # source, would be placed after it. 
+            forward = self._search(target, self._iter_successors,
+                                   lambda position: position <= upper)
+            if source in forward:
+                return False
+
+            # Nodes reaching source, which are placed after target, 
+            # would be placed before it. 
+            backward = self._search(source, self._iter_predecessors,
+                                    lambda position: position >= lower)
+
+            self._reorder(backward, forward)
+
+        return True
+
+    def _search(self, start, get_edges, is_in_region):
+        """
+        Returns nodes reachable from start by edges (successors 
+        or predecessors) through region of positions. 
+        """
+
+        positions = self._positions
+
+        found = {start}
+        stack = [start]
+
+        while stack:
+            for node in get_edges(stack.pop()):
+                if node not in found and is_in_region(positions[node]):
+                    found.add(node)
+                    stack.append(node)
+
+        return found
+
+    def _reorder(self, backward, forward):
+        """
+        Places backward nodes before forward ones keeping their 
+        relative order, in positions they occupied. 
+        """
+
+        positions = self._positions
+        nodes = self._nodes
+
+        def get_position(node):
+            return positions[node]
+
+        moved = (
+            sorted(backward, key=get_position)
+            + sorted(forward, key=get_position)
+        )
+        free_positions = sorted(map(get_position, moved))
+
+        for node, position in zip(moved, free_positions):
+            positions[node] = position
+            nodes[position] = node
+
+    def get_cycle(self, source, target):
+        """
+        Returns list of nodes of cycle closed by cyclic edge from 
+        source to target, starting with target and ending with source. 
+        """
+
+        parents = {target: None}
+        stack = [target]
+
+        while stack:
+            node = stack.pop()
+
+            if node == source:
+                cycle = []
+                while node is not None:
+                    cycle.append(node)
+                    node = parents[node]
+
+                return cycle[::-1]
+
+            for successor in self._iter_successors(node):
+                if successor not in parents:
+                    parents[successor] = node
+                    stack.append(successor)
+
+        return [target, source] if source == target else []
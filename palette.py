@@ -8,6 +8,7 @@ class Palette:
     __new__ = None
 
     panel_border = QColor(62, 63, 65)
+    background = QColor(240, 240, 240)
 
     class elements_group:
         border = QColor(128, 132, 129)
@@ -33,3 +34,6 @@ class Palette:
         }
 
     lamp_light = QColor(210, 207, 24, 200)
+
+    class activity:
+        untoggled = QColor(40, 90, 200, 200)   # element never toggled 
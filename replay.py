@@ -0,0 +1,304 @@
+"""
+Recording of user's interaction with a circuit and its headless replay 
+measuring latency of interface. 
+
+Usage: 
+    python replay.py record <circuit> <recording.json> 
+    python replay.py play [options] <recording.json> [...] 
+
+While recording, the application works as usual and all mouse events 
+and some keys are saved when its window is closed. Replay sends the 
+same events to a new window and prints percentiles of time spent 
+in event handlers and in painting after each event (frame). 
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+
+import netlist
+
+# Keys which can be replayed: they don't open dialogs waiting for user 
+# and don't depend on hovered element or position of cursor (so copying 
+# and pasting aren't replayed). Values are native virtual keys. 
+REPLAYABLE_KEYS = {
+    82,   # R - autorouting 
+}
+
+PERCENTILES = (50, 90, 99)
+
+def percentile(values, percent):
+    """
+    Returns percentile of sorted values by nearest rank. 
+    """
+
+    if not values:
+        return 0.0
+
+    rank = math.ceil(percent / 100 * len(values))
+
+    return values[min(max(rank, 1), len(values)) - 1]
+
+def _save_circuit(netlist_):
+    file_ = io.StringIO()
+    netlist.write_blif(netlist_, file_)
+
+    return file_.getvalue()
+
+def record(circuit_path, recording_path):
+    from PyQt5.QtCore import QObject, QEvent
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    app = QApplication(sys.argv)
+
+    circuit = netlist.load(circuit_path)
+
+    window = MainWindow()
+    window.sandbox.load_netlist(circuit)
+
+    mouse_types = {
+        QEvent.MouseButtonPress: "press",
+        QEvent.MouseMove: "move",
+        QEvent.MouseButtonRelease: "release"
+    }
+
+    events = []
+    start_time = time.perf_counter()
+
+    class Recorder(QObject):
+        def eventFilter(self, watched, event):
+            # Events are recorded when they come to window, so every 
+            # event is recorded once in window's coordinates. 
+            if watched is window.windowHandle():
+                timestamp = time.perf_counter() - start_time
+
+                if event.type() in mouse_types:
+                    events.append({
+                        "time": timestamp,
+                        "type": mouse_types[event.type()],
+                        "x": event.x(),
+                        "y": event.y(),
+                        "button": int(event.button()),
+                        "buttons": int(event.buttons()),
+                        "modifiers": int(event.modifiers())
+                    })
+
+                elif (event.type() == QEvent.KeyPress
+                        and event.nativeVirtualKey() in REPLAYABLE_KEYS):
+                    events.append({
+                        "time": timestamp,
+                        "type": "key",
+                        "key": event.key(),
+                        "native_key": event.nativeVirtualKey(),
+                        "modifiers": int(event.modifiers())
+                    })
+
+            return False
+
+    # Circuit is saved as it was loaded, so replay starts from the same 
+    # layout of elements. 
+    recording = {
+        "window_height": window.height(),
+        "circuit": _save_circuit(circuit),
+        "events": events
+    }
+
+    recorder = Recorder()
+    app.installEventFilter(recorder)
+    app.exec_()
+
+    with open(recording_path, "w") as file_:
+        json.dump(recording, file_)
+
+    print(f"{len(events)} events are recorded to {recording_path}")
+
+class ReplayResult:
+    """
+    Times of handling and painting of every frame in seconds. 
+    """
+
+    def __init__(self):
+        self.frames = []   # tuples of event type, handler and paint times 
+
+    def summary(self):
+        """
+        Returns dictionary mapping names of measured times ("handler", 
+        "paint" or "total" followed by event type or "all") to 
+        dictionaries of percentiles and maximums in milliseconds. 
+        """
+
+        groups = {}
+
+        for type_, handler_time, paint_time in self.frames:
+            for name in (type_, "all"):
+                group = groups.setdefault(name, ([], [], []))
+
+                group[0].append(handler_time)
+                group[1].append(paint_time)
+                group[2].append(handler_time + paint_time)
+
+        summary = {}
+
+        for name, times in groups.items():
+            for kind, values in zip(("handler", "paint", "total"), times):
+                values.sort()
+
+                statistics = {
+                    f"p{percent}": percentile(values, percent) * 1000
+                    for percent in PERCENTILES
+                }
+                statistics["max"] = values[-1] * 1000
+                statistics["frames"] = len(values)
+
+                summary[f"{kind} {name}"] = statistics
+
+        return summary
+
+def replay(recording, repeat=1):
+    """
+    Replays recorded events in offscreen window as fast as possible. 
+    Returns ReplayResult. 
+    """
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5.QtCore import Qt, QEvent, QPoint, QPointF
+    from PyQt5.QtGui import QMouseEvent, QKeyEvent
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    mouse_types = {
+        "press": QEvent.MouseButtonPress,
+        "move": QEvent.MouseMove,
+        "release": QEvent.MouseButtonRelease
+    }
+
+    circuit = netlist.read_blif(recording["circuit"].splitlines())
+    result = ReplayResult()
+
+    for _ in range(repeat):
+        window = MainWindow(recording["window_height"])
+        window.sandbox.load_netlist(circuit)
+        app.processEvents()
+
+        # Widget receiving mouse events while button is pressed 
+        grabber = None
+
+        for data in recording["events"]:
+            type_ = data["type"]
+
+            if type_ == "key":
+                target = window
+                event = QKeyEvent(
+                    QEvent.KeyPress, data["key"],
+                    Qt.KeyboardModifiers(data["modifiers"]),
+                    0, data["native_key"], 0
+                )
+            else:
+                window_pos = QPoint(data["x"], data["y"])
+
+                target = grabber or window.childAt(window_pos) or window
+                if type_ == "press":
+                    grabber = target
+                elif type_ == "release":
+                    grabber = None
+
+                local_pos = target.mapFrom(window, window_pos) \
+                    if target is not window else window_pos
+
+                event = QMouseEvent(
+                    mouse_types[type_], QPointF(local_pos),
+                    QPointF(window_pos),
+                    QPointF(window.mapToGlobal(window_pos)),
+                    Qt.MouseButton(data["button"]),
+                    Qt.MouseButtons(data["buttons"]),
+                    Qt.KeyboardModifiers(data["modifiers"])
+                )
+
+            start_time = time.perf_counter()
+            QApplication.sendEvent(target, event)
+            handler_time = time.perf_counter() - start_time
+
+            # Pending repaints are done by processing update requests. 
+            start_time = time.perf_counter()
+            app.processEvents()
+            paint_time = time.perf_counter() - start_time
+
+            result.frames.append((type_, handler_time, paint_time))
+
+        window.close()
+        window.timing_diagram.close()
+
+    return result
+
+def _print_summary(path, summary):
+    print(path)
+
+    columns = [f"p{percent}" for percent in PERCENTILES] + ["max"]
+    print(f"  {'':<16}{'frames':>8}" + "".join(
+        f"{column + ', ms':>11}" for column in columns
+    ))
+
+    for name, statistics in sorted(summary.items()):
+        print(f"  {name:<16}{statistics['frames']:>8}" + "".join(
+            f"{statistics[column]:>11.3f}" for column in columns
+        ))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Records and replays interaction with circuits."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record")
+    record_parser.add_argument("circuit", help=".blif or .v file")
+    record_parser.add_argument("recording", help="output .json file")
+
+    play_parser = subparsers.add_parser("play")
+    play_parser.add_argument("recordings", nargs="+", help=".json files")
+    play_parser.add_argument("--repeat", type=int, default=1,
+                             help="number of replays of each recording")
+    play_parser.add_argument("--budget", type=float,
+                             help="maximal 99th percentile of frame time "
+                                  "in milliseconds")
+    play_parser.add_argument("--json", help="write summaries to .json file")
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.command == "record":
+        record(arguments.circuit, arguments.recording)
+        return 0
+
+    summaries = {}
+    exceeded = False
+
+    for path in arguments.recordings:
+        with open(path) as file_:
+            recording = json.load(file_)
+
+        summary = replay(recording, arguments.repeat).summary()
+        summaries[path] = summary
+
+        _print_summary(path, summary)
+
+        frame_time = summary.get("total all", {}).get("p99", 0.0)
+        if arguments.budget is not None and frame_time > arguments.budget:
+            print(f"  99th percentile of frame time {frame_time:.3f} ms "
+                  f"exceeds budget {arguments.budget} ms")
+            exceeded = True
+
+    if arguments.json:
+        with open(arguments.json, "w") as file_:
+            json.dump(summaries, file_, indent=4)
+
+    return 1 if exceeded else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Contains orthogonal routing of wires around elements. 
+"""
+
+import heapq
+
+# Directions of steps between cells: right, down, left, up 
+_STEPS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+class Router:
+    """
+    Occupancy grid of square cells and A* search of orthogonal paths 
+    between points avoiding cells blocked by obstacles. 
+
+    Grid is sparse: only blocked cells and cells of routes are stored, 
+    so it doesn't depend on size of circuit. Every cell knows routes 
+    passing through it, so when obstacle is added or moved, only 
+    routes crossing newly blocked cells have to be rerouted. 
+    """
+
+    def __init__(self, cell_size, bend_cost=4, margin=8):
+        self.cell_size = cell_size
+        self.bend_cost = bend_cost   # cost of a bend in steps 
+        self.margin = margin   # cells around ends where path is searched 
+
+        self._blocked = {}   # cell -> number of obstacles covering it 
+        self._obstacles = {}   # obstacle -> its cells 
+        self._routes = {}   # route -> its cells 
+        self._cell_routes = {}   # cell -> routes passing through it 
+
+    def clear(self):
+        self._blocked.clear()
+        self._obstacles.clear()
+        self._routes.clear()
+        self._cell_routes.clear()
+
+    def _get_cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    # Obstacles 
+
+    def _covered_cells(self, x, y, width, height):
+        # Only cells lying entirely inside rectangle are blocked, 
+        # so contacts near its border stay reachable. 
+        size = self.cell_size
+
+        return [
+            (column, row)
+            for column in range(-int(-x // size), int((x + width) // size))
+            for row in range(-int(-y // size), int((y + height) // size))
+        ]
+
+    def set_obstacle(self, obstacle, rect):
+        """
+        Places obstacle to rectangle given as tuple of x, y, width 
+        and height. Returns set of routes crossing cells which 
+        became blocked. 
+        """
+
+        self.remove_obstacle(obstacle)
+
+        cells = self._covered_cells(*rect)
+        self._obstacles[obstacle] = cells
+
+        affected_routes = set()
+
+        for cell in cells:
+            count = self._blocked.get(cell, 0)
+            self._blocked[cell] = count + 1
+
+            if not count:
+                affected_routes.update(self._cell_routes.get(cell, ()))
+
+        return affected_routes
+
+    def remove_obstacle(self, obstacle):
+        for cell in self._obstacles.pop(obstacle, ()):
+            count = self._blocked[cell] - 1
+
+            if count:
+                self._blocked[cell] = count
+            else:
+                del self._blocked[cell]
+
+    # Routes 
+
+    def remove_route(self, route):
+        for cell in self._routes.pop(route, ()):
+            routes = self._cell_routes[cell]
+            routes.discard(route)
+
+            if not routes:
+                del self._cell_routes[cell]
+
+    def route(self, route, start, goal):
+        """
+        Finds path of route from start point to goal one. Returns 
+        tuple of points of path including its ends, or None if 
+        there is no path or ends are in the same cell. 
+        """
+
+        self.remove_route(route)
+
+        start_cell = self._get_cell(*start)
+        goal_cell = self._get_cell(*goal)
+
+        if start_cell == goal_cell:
+            return None
+
+        # Searching in small area around ends at first, then in bigger 
+        # ones if path has to go around large obstacles. 
+        for margin in (self.margin, 4 * self.margin):
+            cells = self._search(start_cell, goal_cell, margin)
+
+            if cells is not None:
+                break
+        else:
+            return None
+
+        self._routes[route] = cells
+        for cell in cells:
+            self._cell_routes.setdefault(cell, set()).add(route)
+
+        return self._get_points(cells, start, goal)
+
+    def _search(self, start, goal, margin):
+        """
+        Returns list of cells of the cheapest path from start cell 
+        to goal one inside their bounding box extended by margin. 
+        """
+
+        min_column = min(start[0], goal[0]) - margin
+        max_column = max(start[0], goal[0]) + margin
+        min_row = min(start[1], goal[1]) - margin
+        max_row = max(start[1], goal[1]) + margin
+
+        blocked = self._blocked
+        bend_cost = self.bend_cost
+        goal_column, goal_row = goal
+
+        # States are cells with direction of the last step into them, 
+        # so bends are penalized. Direction of start state is None. 
+        start_state = (start, None)
+        costs = {start_state: 0}
+        previous = {start_state: None}
+
+        # Among states with equal estimates deeper ones are taken first 
+        # (costs are negated), so search doesn't flood whole area 
+        # of equally good paths. 
+        queue = [(0, 0, start[0], start[1], -1)]
+
+        while queue:
+            _, cost, column, row, direction = heapq.heappop(queue)
+            cost = -cost
+            state = ((column, row), None if direction < 0 else direction)
+
+            if cost > costs[state]:
+                continue
+
+            if (column, row) == goal:
+                cells = []
+
+                while state is not None:
+                    cells.append(state[0])
+                    state = previous[state]
+
+                return cells[::-1]
+
+            for new_direction, (dx, dy) in enumerate(_STEPS):
+                # Going back is never useful. 
+                if direction >= 0 and new_direction == direction ^ 2:
+                    continue
+
+                new_cell = (column + dx, row + dy)
+
+                if (new_cell in blocked and new_cell != goal
+                        or not min_column <= new_cell[0] <= max_column
+                        or not min_row <= new_cell[1] <= max_row):
+                    continue
+
+                new_cost = cost + 1
+                if direction >= 0 and new_direction != direction:
+                    new_cost += bend_cost
+
+                new_state = (new_cell, new_direction)
+
+                if new_cost < costs.get(new_state, new_cost + 1):
+                    costs[new_state] = new_cost
+                    previous[new_state] = state
+
+                    distance_x = goal_column - new_cell[0]
+                    distance_y = goal_row - new_cell[1]
+                    estimate = new_cost + abs(distance_x) + abs(distance_y)
+
+                    # One more bend is needed unless goal is straight ahead 
+                    if (distance_x * dy or distance_y * dx 
+                            or distance_x * dx < 0 or distance_y * dy < 0):
+                        estimate += bend_cost
+
+                    heapq.heappush(queue, (
+                        estimate, -new_cost, 
+                        new_cell[0], new_cell[1], new_direction
+                    ))
+
+        return None
+
+    def _get_points(self, cells, start, goal):
+        """
+        Turns path of cells into points of its bends. Runs go through 
+        centers of cells except the first and the last ones, which 
+        are aligned with start and goal points. 
+        """
+
+        corners = [cells[0]]
+
+        for n in range(1, len(cells) - 1):
+            before = cells[n - 1]
+            after = cells[n + 1]
+
+            if before[0] != after[0] and before[1] != after[1]:
+                corners.append(cells[n])
+
+        corners.append(cells[-1])
+
+        half = self.cell_size / 2
+
+        # Each run is horizontal or vertical and has one fixed coordinate 
+        runs = []
+        for n in range(len(corners) - 1):
+            horizontal = corners[n][1] == corners[n + 1][1]
+            axis = 1 if horizontal else 0
+
+            if n == 0:
+                fixed = start[axis]
+            elif n == len(corners) - 2:
+                fixed = goal[axis]
+            else:
+                fixed = corners[n][axis] * self.cell_size + half
+
+            runs.append((horizontal, fixed))
+
+        if len(runs) == 1:
+            horizontal, _ = runs[0]
+            axis = 1 if horizontal else 0
+
+            if start[axis] == goal[axis]:
+                return (tuple(start), tuple(goal))
+
+            # Ends are in the same row (column) but not on one line, 
+            # so path makes a jog in the middle. 
+            middle = round((start[1 - axis] + goal[1 - axis]) / 2)
+
+            if horizontal:
+                jog = ((middle, start[1]), (middle, goal[1]))
+            else:
+                jog = ((start[0], middle), (goal[0], middle))
+
+            return (tuple(start), *jog, tuple(goal))
+
+        points = [tuple(start)]
+
+        for (horizontal, fixed), (_, next_fixed) in zip(runs, runs[1:]):
+            if horizontal:
+                points.append((round(next_fixed), round(fixed)))
+            else:
+                points.append((round(fixed), round(next_fixed)))
+
+        points.append(tuple(goal))
+
+        return tuple(points)
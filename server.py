@@ -0,0 +1,267 @@
+"""
+Simulation server holding a loaded circuit for other processes. 
+
+Usage: python server.py [--socket <path> | --host <host> --port <port>] 
+<circuit> 
+
+Clients send requests as JSON objects, one per line: 
+
+    {"id": 1, "vectors": ["0110", "1011"]} 
+
+where character n of every vector is value of switch n, and receive 
+lamps values of all vectors in the same format: 
+
+    {"id": 1, "outputs": ["10", "01"]} 
+
+Request {"id": 2, "info": true} returns names of switches and lamps. 
+Requests of one connection are answered in order, and clients may 
+send the next requests without waiting for answers. 
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+import netlist
+from cache import CompiledCache
+from simulation import CompiledCircuit, pack_vectors, unpack_vectors
+
+# Maximal size of one request line in bytes 
+LINE_LIMIT = 1 << 26
+
+class SimulationServer:
+    """
+    Answers requests of any number of clients with one compiled circuit. 
+    """
+
+    def __init__(self, circuit):
+        self.circuit = circuit
+
+        self.requests_number = 0
+        self.vectors_number = 0
+
+    def handle(self, request):
+        """
+        Returns answer to request. 
+        """
+
+        answer = {"id": request.get("id")}
+
+        if request.get("info"):
+            answer["inputs"] = self.circuit.inputs
+            answer["outputs"] = self.circuit.outputs
+            return answer
+
+        vectors = request.get("vectors")
+        width = len(self.circuit.inputs)
+
+        if not isinstance(vectors, list) or any(
+            not isinstance(vector, str) or len(vector) != width
+            or vector.strip("01") for vector in vectors
+        ):
+            answer["error"] = (
+                f"vectors must be a list of strings of {width} "
+                "characters 0 and 1"
+            )
+            return answer
+
+        count = len(vectors)
+        values = self.circuit.evaluate(
+            pack_vectors(vectors, width), (1 << count) - 1
+        )
+
+        answer["outputs"] = unpack_vectors(values, count)
+
+        self.requests_number += 1
+        self.vectors_number += count
+
+        return answer
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line is longer than the limit. 
+                    break
+
+                if not line:
+                    break
+
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    answer = {"id": None, "error": f"invalid JSON: {error}"}
+                else:
+                    if isinstance(request, dict):
+                        answer = self.handle(request)
+                    else:
+                        answer = {"id": None, "error": "request isn't object"}
+
+                writer.write(json.dumps(answer).encode() + b"\n")
+
+                # Waits only if client doesn't read answers, and lets 
+                # other clients be served between requests. 
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        """
+        Starts listening on Unix socket path or on TCP host and port. 
+        Returns asyncio server. 
+        """
+
+        if path is not None:
+            return await asyncio.start_unix_server(
+                self._serve_client, path, limit=LINE_LIMIT
+            )
+
+        return await asyncio.start_server(
+            self._serve_client, host, port, limit=LINE_LIMIT
+        )
+
+class SimulationClient:
+    """
+    Connection to simulation server. 
+
+    Every call of evaluate sends request at once, so many requests 
+    can be in flight, and answers are matched to them by ids. 
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+        self._futures = {}
+        self._next_id = 0
+
+        self._reading = asyncio.ensure_future(self._read_answers())
+
+    @classmethod
+    async def connect(cls, path=None, host="127.0.0.1", port=None):
+        if path is not None:
+            streams = await asyncio.open_unix_connection(
+                path, limit=LINE_LIMIT
+            )
+        else:
+            streams = await asyncio.open_connection(
+                host, port, limit=LINE_LIMIT
+            )
+
+        return cls(*streams)
+
+    async def _read_answers(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+
+                if not line:
+                    break
+
+                answer = json.loads(line)
+                future = self._futures.pop(answer.get("id"), None)
+
+                if future is None or future.done():
+                    continue
+
+                if "error" in answer:
+                    future.set_exception(ValueError(answer["error"]))
+                else:
+                    future.set_result(answer)
+        except (ConnectionError, ValueError) as error:
+            exception = error
+        else:
+            exception = ConnectionError("Server closed connection")
+
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(exception)
+
+        self._futures.clear()
+
+    async def _request(self, request):
+        request["id"] = self._next_id
+        self._next_id += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[request["id"]] = future
+
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+
+        return await future
+
+    async def info(self):
+        """
+        Returns lists of names of switches and lamps. 
+        """
+
+        answer = await self._request({"info": True})
+
+        return answer["inputs"], answer["outputs"]
+
+    async def evaluate(self, vectors):
+        """
+        Returns lamps values of input vectors given as strings 
+        of 0 and 1. 
+        """
+
+        answer = await self._request({"vectors": list(vectors)})
+
+        return answer["outputs"]
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+        self._reading.cancel()
+
+async def _serve(arguments):
+    circuit = netlist.load(arguments.circuit)
+
+    if arguments.no_cache:
+        server = SimulationServer(CompiledCircuit(circuit))
+    else:
+        server = SimulationServer(CompiledCache().get(circuit))
+
+    if arguments.socket and os.path.exists(arguments.socket):
+        os.remove(arguments.socket)
+
+    listener = await server.start(
+        arguments.socket, arguments.host, arguments.port
+    )
+
+    for socket_ in listener.sockets:
+        print(f"Serving {arguments.circuit} on {socket_.getsockname()}")
+
+    async with listener:
+        await listener.serve_forever()
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Serves evaluation of circuit over local socket."
+    )
+    parser.add_argument("circuit", help=".blif or .v file")
+    parser.add_argument("--socket", help="path of Unix socket")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen if no socket is given")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="port to listen if no socket is given")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't use cache of compiled circuits")
+
+    try:
+        asyncio.run(_serve(parser.parse_args(arguments)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
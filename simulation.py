@@ -0,0 +1,407 @@
+"""
+Contains compiled bit-parallel evaluation of netlists in two-valued 
+and four-valued logic. 
+"""
+
+from gatelib import LIBRARY
+from netlist import GATE_EXPRESSIONS
+
+class CompiledCircuit:
+    """
+    Netlist levelized once and compiled into a Python function. 
+
+    Function takes values of switches (in order of netlist's switches) 
+    and returns values of lamps (in order of netlist's lamps). 
+    Values are integers: every bit is a separate input vector, 
+    so one call evaluates as many vectors as there are ones in mask. 
+    """
+
+    def __init__(self, netlist=None, source=None, code=None):
+        if source is None:
+            source = generate_source(netlist)
+
+        self.source = source
+        self.inputs, self.outputs = _read_header(source)
+
+        # Code object compiled from source can be given, e.g. by cache. 
+        if code is None:
+            code = compile(source, f"<circuit {len(self.inputs)}>", "exec")
+        self.code = code
+
+        namespace = {}
+        exec(code, namespace)
+
+        self._function = namespace["evaluate"]
+
+    def evaluate(self, inputs, mask=1):
+        """
+        Returns tuple of lamps values for sequence of switches values 
+        or mapping of switches names to values. 
+        """
+
+        if isinstance(inputs, dict):
+            inputs = [inputs.get(name, 0) for name in self.inputs]
+
+        return self._function(inputs, mask)
+
+    def evaluate_vector(self, inputs):
+        """
+        Evaluates one input vector of booleans and returns 
+        tuple of booleans. 
+        """
+
+        return tuple(bool(value) for value in self.evaluate(inputs))
+
+def _read_header(source):
+    # First two lines of source are comments with names of 
+    # switches and lamps separated by tabulation. 
+    lines = source.split("\n", 2)
+
+    return [
+        line[2:].split("\t") if len(line) > 2 else []
+        for line in lines[:2]
+    ]
+
+def generate_source(netlist):
+    """
+    Returns source code of function evaluating netlist. 
+    """
+
+    order, _ = netlist.levelize()
+
+    switches = netlist.switches
+    lamps = netlist.lamps
+
+    lines = [
+        "# " + "\t".join(gate.name for gate in switches),
+        "# " + "\t".join(gate.name for gate in lamps),
+        "def evaluate(inputs, mask):"
+    ]
+
+    driven_nets = set()
+    used_nets = set()
+
+    for gate in netlist.gates:
+        used_nets.update(gate.inputs)
+
+        if gate.output is not None:
+            driven_nets.add(gate.output)
+
+    # Nets without drivers are always inactive. 
+    for net in sorted(used_nets - driven_nets):
+        lines.append(f"    n{net} = 0")
+
+    assigned_nets = set()
+    switches_indexes = {gate: n for n, gate in enumerate(switches)}
+
+    for gate in order:
+        if gate.kind == "Lamp":
+            continue
+
+        if gate.kind == "Switch":
+            expression = f"inputs[{switches_indexes[gate]}] & mask"
+        else:
+            expression = GATE_EXPRESSIONS[gate.kind].format(
+                *[f"n{net}" for net in gate.inputs]
+            )
+
+        # Net driven by several gates is active if any of them is active. 
+        if gate.output in assigned_nets:
+            lines.append(f"    n{gate.output} |= {expression}")
+        else:
+            lines.append(f"    n{gate.output} = {expression}")
+            assigned_nets.add(gate.output)
+
+    outputs = "".join(f"n{gate.inputs[0]}, " for gate in lamps)
+    lines.append(f"    return ({outputs})")
+
+    return "\n".join(lines) + "\n"
+
+# Values of four-valued logic as pairs of bits of planes: the first 
+# plane has ones where net can be active, the second one where it can 
+# be inactive. Unknown value (X) can be both, value of net which isn't 
+# driven (Z) is neither, so drivers of a net are resolved by OR of their 
+# planes and drivers of opposite values give X. 
+FOUR_VALUES = {"0": (0, 1), "1": (1, 0), "X": (1, 1), "Z": (0, 0)}
+
+class FourValuedCircuit(CompiledCircuit):
+    """
+    Netlist compiled for evaluation in four-valued logic. 
+
+    Function takes values of switches as pairs of integers (planes, 
+    see FOUR_VALUES) and returns pairs of lamps and conflicts of nets 
+    driven by several gates (see conflict_nets), which are integers 
+    with ones where gates drive net to opposite values. Gates read 
+    inputs which aren't driven as X. 
+    """
+
+    def __init__(self, netlist=None, source=None, code=None):
+        if source is None:
+            source = generate_four_valued_source(netlist)
+
+        CompiledCircuit.__init__(self, source=source, code=code)
+
+        # Third line of header has names of nets with several drivers. 
+        line = source.split("\n", 3)[2]
+        self.conflict_nets = line[2:].split("\t") if len(line) > 2 else []
+
+    def evaluate(self, inputs, mask=1):
+        """ 
+        Returns tuple of lamps values and tuple of conflicts for 
+        sequence of switches values or mapping of switches names 
+        to values. Switches missing in mapping aren't driven (Z). 
+        """
+
+        if isinstance(inputs, dict):
+            inputs = [inputs.get(name, (0, 0)) for name in self.inputs]
+
+        return self._function(inputs, mask)
+
+    def evaluate_vector(self, inputs):
+        """ 
+        Evaluates one input vector given as string of 0, 1, X and Z 
+        (or sequence of them). Returns string of lamps values 
+        and names of nets with conflicts. 
+        """
+
+        lamps, conflicts = self.evaluate(
+            [FOUR_VALUES[value] for value in inputs]
+        )
+
+        return (
+            "".join(_decode(*planes) for planes in lamps), 
+            [name for name, conflict in zip(self.conflict_nets, conflicts) 
+             if conflict]
+        )
+
+def _decode(active, inactive, bit=0):
+    return (("Z", "0"), ("1", "X"))[active >> bit & 1][inactive >> bit & 1]
+
+# Operations of four-valued logic on pairs of expressions of planes 
+
+def _and(a, b):
+    return f"({a[0]} & {b[0]})", f"({a[1]} | {b[1]})"
+
+def _or(a, b):
+    return f"({a[0]} | {b[0]})", f"({a[1]} & {b[1]})"
+
+def _xor(a, b):
+    return (
+        f"({a[0]} & {b[1]} | {a[1]} & {b[0]})", 
+        f"({a[0]} & {b[0]} | {a[1]} & {b[1]})"
+    )
+
+def _not(a):
+    # Inversion only swaps planes. 
+    return a[1], a[0]
+
+FOUR_VALUED_OPERATIONS = {
+    "And": _and,
+    "Or": _or,
+    "Xor": _xor,
+    "Not": _not
+}
+
+def _get_four_valued_expressions(kind, inputs):
+    """
+    Returns pair of expressions of planes of gate's output for pairs 
+    of names of planes of its inputs. 
+    """
+
+    operation = FOUR_VALUED_OPERATIONS.get(kind)
+    if operation is not None:
+        return operation(*inputs)
+
+    return LIBRARY[kind].apply(
+        inputs, _and, _or, _xor, _not, ("0", "mask"), ("mask", "0")
+    )
+
+def generate_four_valued_source(netlist):
+    """
+    Returns source code of function evaluating netlist in four-valued 
+    logic. Every net has two variables: h<net> and l<net> for planes. 
+    """
+
+    order, _ = netlist.levelize()
+
+    switches = netlist.switches
+    lamps = netlist.lamps
+
+    drivers = {}   # net -> number of gates driving it 
+    for gate in netlist.gates:
+        if gate.output is not None:
+            drivers[gate.output] = drivers.get(gate.output, 0) + 1
+
+    conflict_nets = sorted(net for net, number in drivers.items() 
+                           if number > 1)
+
+    lines = [
+        "# " + "\t".join(gate.name for gate in switches), 
+        "# " + "\t".join(gate.name for gate in lamps), 
+        "# " + "\t".join(netlist.get_net_name(net) for net in conflict_nets), 
+        "def evaluate(inputs, mask):"
+    ]
+
+    # Names of planes of nets as gates see them 
+    views = {}
+
+    used_nets = {net for gate in netlist.gates for net in gate.inputs}
+
+    # Nets without drivers are Z, which gates read as X. 
+    for net in sorted(used_nets - drivers.keys()):
+        lines.append(f"    h{net} = l{net} = 0")
+        views[net] = ("mask", "mask")
+
+    assigned_nets = set()
+
+    def assign(net, planes):
+        if drivers[net] == 1:
+            lines.append(f"    h{net} = {planes[0]}")
+            lines.append(f"    l{net} = {planes[1]}")
+            return
+
+        # Drivers are resolved by OR, ones and zeros of known 
+        # values are collected to find conflicts. 
+        lines.append(f"    t0 = {planes[0]}")
+        lines.append(f"    t1 = {planes[1]}")
+
+        operator = "|=" if net in assigned_nets else "="
+        assigned_nets.add(net)
+
+        lines.append(f"    h{net} {operator} t0")
+        lines.append(f"    l{net} {operator} t1")
+        lines.append(f"    o{net} {operator} t0 & ~t1")
+        lines.append(f"    z{net} {operator} t1 & ~t0")
+
+    # Switches have no inputs, so they go first. Their values can be Z, 
+    # so gates read their nets through views turning Z into X, unless 
+    # nets are driven by other gates too. 
+    for n, gate in enumerate(switches):
+        assign(gate.output, (f"inputs[{n}][0] & mask", 
+                             f"inputs[{n}][1] & mask"))
+
+    gates_outputs = {
+        gate.output for gate in netlist.gates 
+        if gate.kind not in ("Switch", "Lamp")
+    }
+
+    for net in sorted({gate.output for gate in switches} - gates_outputs):
+        if net in used_nets:
+            lines.append(f"    u = ~(h{net} | l{net}) & mask")
+            lines.append(f"    hv{net} = h{net} | u")
+            lines.append(f"    lv{net} = l{net} | u")
+            views[net] = (f"hv{net}", f"lv{net}")
+
+    for gate in order:
+        if gate.kind in ("Switch", "Lamp"):
+            continue
+
+        inputs = [views.get(net, (f"h{net}", f"l{net}")) 
+                  for net in gate.inputs]
+        assign(gate.output, _get_four_valued_expressions(gate.kind, inputs))
+
+    lamps_planes = "".join(
+        f"(h{gate.inputs[0]}, l{gate.inputs[0]}), " for gate in lamps
+    )
+    conflicts = "".join(f"o{net} & z{net}, " for net in conflict_nets)
+    lines.append(f"    return ({lamps_planes}), ({conflicts})")
+
+    return "\n".join(lines) + "\n"
+
+def pack_four_valued(rows, width):
+    """
+    Turns vectors given as strings of 0, 1, X and Z (character n 
+    is value of switch n) into pairs of planes, one per switch, 
+    where bits k are the value of switch in k-th vector. 
+    """
+
+    values = [[0, 0] for _ in range(width)]
+
+    for k, row in enumerate(rows):
+        for planes, value in zip(values, row):
+            active, inactive = FOUR_VALUES[value.upper()]
+            planes[0] |= active << k
+            planes[1] |= inactive << k
+
+    return [tuple(planes) for planes in values]
+
+def unpack_four_valued(values, count):
+    """
+    Turns pairs of planes of lamps into count strings of 0, 1, X and Z. 
+    """
+
+    return [
+        "".join(_decode(active, inactive, k) for active, inactive in values)
+        for k in range(count)
+    ]
+
+def exhaustive_patterns(inner_number):
+    """
+    Returns packed values of the first inner_number inputs 
+    enumerating all their combinations in word of 2^inner_number 
+    vectors: bit k of input n is bit n of k. 
+    """
+
+    word_size = 1 << inner_number
+
+    # Pattern of input n: blocks of 2^n zeros and ones 
+    patterns = []
+    for n in range(inner_number):
+        block = (1 << (1 << n)) - 1
+        pattern = 0
+
+        for start in range(1 << n, word_size, 2 << n):
+            pattern |= block << start
+
+        patterns.append(pattern)
+
+    return patterns
+
+def outer_values(patterns, outer, inputs_number, mask):
+    """
+    Returns packed values of all inputs for word number outer: 
+    inner inputs have patterns and the others are constant, 
+    bit n of outer being value of input len(patterns) + n. 
+    """
+
+    values = list(patterns)
+
+    for n in range(inputs_number - len(patterns)):
+        values.append(mask if outer >> n & 1 else 0)
+
+    return values
+
+def pack_vectors(rows, width):
+    """
+    Turns vectors given as strings of 0 and 1 (character n is value 
+    of switch n) into integers, one per switch, where bit k is 
+    the value of switch in k-th vector. Raises ValueError if a row 
+    has other length than width. 
+    """
+
+    if not rows:
+        return [0] * width
+
+    lengths = set(map(len, rows))
+    if lengths != {width}:
+        raise ValueError(
+            f"Vectors have {', '.join(map(str, sorted(lengths)))} values " 
+            f"instead of {width}"
+        )
+
+    return [int("".join(column)[::-1], 2) for column in zip(*rows)]
+
+def unpack_vectors(values, count):
+    """
+    Turns integers of lamps into count strings of 0 and 1. 
+    """
+
+    if not count:
+        return []
+
+    if not values:
+        return [""] * count
+
+    columns = [format(value, f"0{count}b")[::-1] for value in values]
+
+    return ["".join(row) for row in zip(*columns)]
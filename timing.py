@@ -0,0 +1,288 @@
+"""
+Contains event-driven simulation of netlists with gate delays. 
+"""
+
+from gatelib import LIBRARY
+from netlist import GATE_FUNCTIONS
+
+# Propagation delays of gates in integer time units. 
+DEFAULT_DELAYS = {
+    "And": 2,
+    "Or": 2,
+    "Xor": 3,
+    "Not": 1,
+    **{name: definition.delay for name, definition in LIBRARY.items()}
+}
+
+class TimingWheel:
+    """
+    Calendar queue of events. Events are put in bucket of their time 
+    modulo number of buckets, so scheduling and taking events cost O(1) 
+    however many of them are waiting. Delays can't be greater 
+    than horizon. 
+    """
+
+    def __init__(self, horizon):
+        size = 1 << horizon.bit_length()
+
+        self._buckets = [[] for _ in range(size)]
+        self._mask = size - 1
+        self._size = 0
+
+        self.time = 0
+
+    def __len__(self):
+        return self._size
+
+    def schedule(self, delay, event):
+        if not 0 <= delay <= self._mask:
+            raise ValueError(f"Delay {delay} is out of timing wheel horizon")
+
+        self._buckets[(self.time + delay) & self._mask].append(event)
+        self._size += 1
+
+    def next_time(self):
+        """
+        Returns time of the nearest events or None if there are no events. 
+        """
+
+        if not self._size:
+            return None
+
+        time = self.time
+        while not self._buckets[time & self._mask]:
+            time += 1
+
+        return time
+
+    def pop(self):
+        """
+        Moves time to the nearest events and returns list of them. 
+        Events scheduled with zero delay while handling returned events 
+        are returned by next call with the same time. 
+        """
+
+        self.time = self.next_time()
+
+        index = self.time & self._mask
+        events = self._buckets[index]
+
+        self._buckets[index] = []
+        self._size -= len(events)
+
+        return events
+
+class TimedSimulator:
+    """
+    Simulates netlist with propagation delays of gates. 
+
+    Delays are inertial: if input of gate changes back before 
+    its output has changed, the scheduled change is cancelled, 
+    so pulses shorter than gate delay are filtered out. 
+    """
+
+    def __init__(self, netlist, delays=None):
+        self.netlist = netlist
+
+        delays = {**DEFAULT_DELAYS, **(delays or {})}
+
+        gates = netlist.gates
+        self._delays = [delays.get(gate.kind, 0) for gate in gates]
+
+        if any(
+            delay < 1 for gate, delay in zip(gates, self._delays)
+            if gate.kind in GATE_FUNCTIONS
+        ):
+            raise ValueError("Delays of gates must be positive")
+
+        self._wheel = TimingWheel(max(self._delays, default=0))
+
+        nets_number = len(netlist.net_names)
+
+        self._sinks = [[] for _ in range(nets_number)]
+
+        for index, gate in enumerate(gates):
+            if gate.kind in GATE_FUNCTIONS:
+                for net in gate.inputs:
+                    self._sinks[net].append(index)
+
+        self._switches = {
+            gate.name: index for index, gate in enumerate(gates)
+            if gate.kind == "Switch"
+        }
+
+        # State of simulation 
+        self.net_values = [0] * nets_number
+        self._outputs = [0] * len(gates)
+        self._pending = [None] * len(gates)   # value of scheduled change 
+        self._versions = [0] * len(gates)   # invalidates cancelled events 
+        self._active_drivers = [0] * nets_number
+
+        self._probes = {}   # net -> list of waveforms 
+
+        # ToggleCounters of nets, if switching activity is recorded 
+        self.toggle_counters = None
+
+        self.events_number = 0
+        self.cancelled_events_number = 0
+
+        self._settle()
+
+    @property
+    def time(self):
+        return self._wheel.time
+
+    def _settle(self):
+        """
+        Sets initial stable state with all switches inactive. 
+        """
+
+        try:
+            values = self.netlist.evaluate({})
+        except ValueError:
+            # Circuit with cycles settles down by simulation itself. 
+            for index, gate in enumerate(self.netlist.gates):
+                if gate.kind in GATE_FUNCTIONS:
+                    self._evaluate(index)
+
+            return
+
+        for index, gate in enumerate(self.netlist.gates):
+            if gate.output is not None and gate.kind in GATE_FUNCTIONS:
+                self._outputs[index] = GATE_FUNCTIONS[gate.kind](
+                    1, *[values[net] for net in gate.inputs]
+                )
+                self._active_drivers[gate.output] += self._outputs[index]
+
+        self.net_values = [int(value) for value in values]
+
+    def get_settling_time(self):
+        """
+        Returns delay of the longest path from switches, after which 
+        circuit is stable when switches have changed. Raises ValueError 
+        if circuit contains combinational cycle. 
+        """
+
+        order, _ = self.netlist.levelize()
+        indexes = {
+            gate: index for index, gate in enumerate(self.netlist.gates)
+        }
+
+        arrivals = [0] * len(self.net_values)   # net -> time of arrival 
+
+        for gate in order:
+            if gate.output is not None and gate.kind in GATE_FUNCTIONS:
+                arrival = self._delays[indexes[gate]] + max(
+                    (arrivals[net] for net in gate.inputs), default=0
+                )
+                arrivals[gate.output] = max(arrivals[gate.output], arrival)
+
+        return max(arrivals, default=0)
+
+    def add_probe(self, net, waveform):
+        """
+        Makes waveform record value changes of net. Waveform's recorder 
+        should use time of simulation as clock. 
+        """
+
+        self._probes.setdefault(net, []).append(waveform)
+        waveform.record(self.net_values[net])
+
+    def set_input(self, name, value):
+        """
+        Changes switch's condition at current time of simulation. 
+        """
+
+        index = self._switches[name]
+        value = int(bool(value))
+
+        self._versions[index] += 1
+        self._pending[index] = value
+        self._wheel.schedule(0, (index, self._versions[index]))
+
+    def run(self, until=None):
+        """
+        Handles events until there are no ones or until given time. 
+        Returns time of simulation. 
+        """
+
+        wheel = self._wheel
+        affected = set()
+
+        while wheel:
+            next_time = wheel.next_time()
+
+            if until is not None and next_time > until:
+                break
+
+            for index, version in wheel.pop():
+                if version == self._versions[index]:
+                    self._apply(index, affected)
+
+            for index in sorted(affected):
+                self._evaluate(index)
+
+            affected.clear()
+
+        if until is not None and wheel.time < until:
+            wheel.time = until
+
+        return wheel.time
+
+    def _apply(self, index, affected):
+        """
+        Changes output of gate to its scheduled value. 
+        """
+
+        value = self._pending[index]
+        self._pending[index] = None
+        self.events_number += 1
+
+        if value == self._outputs[index]:
+            return
+
+        self._outputs[index] = value
+
+        net = self.netlist.gates[index].output
+        self._active_drivers[net] += 1 if value else -1
+
+        net_value = int(self._active_drivers[net] > 0)
+        if net_value != self.net_values[net]:
+            self.net_values[net] = net_value
+
+            for waveform in self._probes.get(net, ()):
+                waveform.record(net_value)
+
+            if self.toggle_counters is not None:
+                self.toggle_counters.counts[net] += 1
+
+            affected.update(self._sinks[net])
+
+    def _evaluate(self, index):
+        gate = self.netlist.gates[index]
+
+        value = GATE_FUNCTIONS[gate.kind](
+            1, *[self.net_values[net] for net in gate.inputs]
+        )
+
+        pending = self._pending[index]
+        projected = self._outputs[index] if pending is None else pending
+
+        if value == projected:
+            return
+
+        if pending is not None:
+            # Input has changed back before output did: inertial delay 
+            # cancels scheduled change instead of making a pulse. 
+            self._versions[index] += 1
+            self._pending[index] = None
+            self.cancelled_events_number += 1
+
+            if value == self._outputs[index]:
+                return
+
+        self._versions[index] += 1
+        self._pending[index] = value
+        self._wheel.schedule(
+            self._delays[index], (index, self._versions[index])
+        )
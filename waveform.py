@@ -0,0 +1,119 @@
+"""
+Contains classes recording history of signal values 
+into fixed-size ring buffers. 
+"""
+
+import time
+from array import array
+
+class RingBuffer:
+    """
+    Keeps last capacity pairs of timestamp and value 
+    in typed arrays, so memory used by it never grows. 
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("B", bytes(capacity))
+
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """
+        Yields pairs of timestamp and value from oldest to newest. 
+        """
+
+        for n in range(self._size):
+            index = (self._start + n) % self.capacity
+            yield self.times[index], self.values[index]
+
+    def append(self, timestamp, value):
+        index = (self._start + self._size) % self.capacity
+
+        self.times[index] = timestamp
+        self.values[index] = value
+
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            # Oldest pair is overwritten. 
+            self._start = (self._start + 1) % self.capacity
+
+    def last(self):
+        """
+        Returns newest pair or None if buffer is empty. 
+        """
+
+        if not self._size:
+            return None
+
+        index = (self._start + self._size - 1) % self.capacity
+
+        return self.times[index], self.values[index]
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+class Waveform:
+    """
+    History of value changes of one signal. 
+    """
+
+    def __init__(self, recorder, name, value, capacity):
+        self.name = name
+
+        self.buffer = RingBuffer(capacity)
+        self._recorder = recorder
+        self._value = None
+
+        self.record(value)
+
+    def record(self, value):
+        """
+        Appends value with current time of recorder if it has changed. 
+        """
+
+        value = int(value)
+
+        if value != self._value:
+            self._value = value
+            self.buffer.append(self._recorder.get_time(), value)
+
+    @property
+    def value(self):
+        return self._value
+
+class WaveformRecorder:
+    """
+    Creates waveforms sharing one clock. 
+
+    By default clock is time in seconds since recorder creation, 
+    but any function returning time (e.g. time of simulation) 
+    can be used as clock. 
+    """
+
+    def __init__(self, capacity=4096, clock=None):
+        self.capacity = capacity
+        self.waveforms = []
+
+        if clock is None:
+            start_time = time.perf_counter()
+            clock = lambda: time.perf_counter() - start_time
+
+        self.get_time = clock
+
+    def add(self, name, value=False):
+        waveform = Waveform(self, name, value, self.capacity)
+        self.waveforms.append(waveform)
+
+        return waveform
+
+    def remove(self, waveform):
+        self.waveforms.remove(waveform)